@@ -1,10 +1,18 @@
 import os
-from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
 import clickhouse_connect
 
+from dashboard.cache import QueryCache
+from dashboard.panels import (CASE_SLA_HOURS, FILTER_OPTIONS, FastMode, Raw, dashboard_panels, fraud_panels,
+                              merchant_search, recent_transactions, run_panels)
+from dashboard.planner import SOURCES, TABLE_ROWS_SQL, choose
+
 # -----------------------
 # Config
 # -----------------------
@@ -15,17 +23,118 @@ CH_PORT = int(os.environ.get("FRI_CH_HTTP_PORT", "8123"))
 CH_USER = os.environ.get("FRI_CH_USER", "fri")
 CH_PASSWORD = os.environ.get("FRI_CH_PASSWORD", "fri")
 CH_DB = os.environ.get("FRI_CH_DB", "analytics")
+CACHE_MB = int(os.environ.get("FRI_DASH_CACHE_MB", "256"))
+QUERY_THREADS = int(os.environ.get("FRI_DASH_QUERY_THREADS", "8"))
+QUERY_TIMEOUT = float(os.environ.get("FRI_DASH_QUERY_TIMEOUT", "30"))
+# Fast mode: rows a sampled fct_transactions scan aims to read
+SAMPLE_ROWS = int(os.environ.get("FRI_DASH_SAMPLE_ROWS", "2000000"))
 
 @st.cache_resource
 def ch_client():
+    # No HTTP session id: ClickHouse rejects concurrent queries within one session,
+    # and panels run in parallel on this shared client
     return clickhouse_connect.get_client(
-        host=CH_HOST, port=CH_PORT, username=CH_USER, password=CH_PASSWORD, database=CH_DB
+        host=CH_HOST, port=CH_PORT, username=CH_USER, password=CH_PASSWORD, database=CH_DB,
+        autogenerate_session_id=False
     )
 
-def qdf(sql: str, params=None) -> pd.DataFrame:
+@st.cache_resource
+def panel_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(QUERY_THREADS, thread_name_prefix="panel-query")
+
+_HEX = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+_UUID_HEX_POS = np.array([i for i in range(36) if i not in (8, 13, 18, 23)])
+
+def uuid_strings(col) -> pa.Array:
+    # 16-byte UUIDs (compact-ID schema) -> canonical 36-char strings, vectorized
+    col = col.combine_chunks() if isinstance(col, pa.ChunkedArray) else col
+    if isinstance(col.type, pa.BaseExtensionType):
+        col = col.storage
+    raw = np.frombuffer(col.buffers()[1], dtype=np.uint8)[col.offset * 16:(col.offset + len(col)) * 16].reshape(-1, 16)
+    text = np.full((len(col), 36), ord("-"), dtype=np.uint8)
+    text[:, _UUID_HEX_POS[0::2]] = _HEX[raw >> 4]
+    text[:, _UUID_HEX_POS[1::2]] = _HEX[raw & 15]
+    offsets = np.arange(0, 36 * len(col) + 1, 36, dtype=np.int32)
+    return pa.StringArray.from_buffers(len(col), pa.py_buffer(offsets.tobytes()), pa.py_buffer(text.tobytes()))
+
+def arrow_frame(tbl: pa.Table) -> pd.DataFrame:
+    cols = []
+    for col in tbl.columns:
+        typ = col.type.storage_type if isinstance(col.type, pa.BaseExtensionType) else col.type
+        cols.append(uuid_strings(col) if pa.types.is_fixed_size_binary(typ) and typ.byte_width == 16 else col)
+    return pa.Table.from_arrays(cols, names=tbl.column_names).to_pandas(types_mapper=pd.ArrowDtype)
+
+def sync_generation(client):
+    # Bumped by warehouse/sync_to_clickhouse.py every time it publishes (or rebuilds rollups)
+    return client.query("SELECT max(synced_at) FROM _sync_state").result_rows[0][0]
+
+@st.cache_resource
+def query_cache() -> QueryCache:
+    # Shared by every session: analysts on the same filters cost one ClickHouse query per sync.
+    # The client is bound here because the generation is also checked from panel threads.
     client = ch_client()
+    return QueryCache(generation=lambda: sync_generation(client), max_bytes=CACHE_MB << 20)
+
+def fetch(cache: QueryCache, client, sql: str, params=None, settings=None) -> pd.DataFrame:
+    # Arrow end to end: ClickHouse Arrow output -> Arrow-backed pandas columns, no per-value conversion.
+    # Takes the cache and client explicitly so panel threads never touch Streamlit state.
     params = params or {}
-    return client.query_df(sql, parameters=params)
+    df = cache.get(sql, params, lambda: arrow_frame(client.query_arrow(sql, parameters=params, settings=settings, use_strings=True)))
+    # Shallow copy: callers add columns without touching the cached frame
+    return df.copy(deep=False)
+
+def qdf(sql: str, params=None) -> pd.DataFrame:
+    return fetch(query_cache(), ch_client(), sql, params)
+
+def table_rows() -> dict:
+    # Cached like any other query, so source sizes are re-read once per sync
+    res = qdf(TABLE_ROWS_SQL, {"tables": [s.table for s in SOURCES]})
+    return dict(zip(res["table"], res["rows"].astype(int)))
+
+served = {}
+results = {}
+
+def run_batch(batch: dict, fast: FastMode = None) -> None:
+    # Aggregates go to the smallest exact table (dashboard/planner.py) and panels over the same
+    # slice share one GROUPING SETS scan; every resulting query runs concurrently (dashboard/panels.py)
+    rows = table_rows()
+    for q in batch.values():
+        table = q.table if isinstance(q, Raw) else choose(q, rows).table
+        served[table] = served.get(table, 0) + 1
+    cache, client = query_cache(), ch_client()
+    run_sql = lambda sql, params, settings: fetch(cache, client, sql, params, settings)
+    results.update(run_panels(batch, rows, run_sql, panel_pool(), QUERY_TIMEOUT, fast))
+
+def fast_mode() -> FastMode:
+    cache = query_cache()
+    estimate = lambda sql, params: int(qdf(sql, params)["rows"].sum())
+    return FastMode(estimate, cached=lambda sql, params: (sql, params) in cache, target_rows=SAMPLE_ROWS)
+
+def sampled(df) -> str:
+    # Caption for panels answered from a sample in fast mode, "" when exact
+    p = df.attrs.get("sample") if df is not None else None
+    return f"≈ estimated from a {p:.2%} sample (95% CI shown where available); refining to exact…" if p else ""
+
+def panel(name: str):
+    # The panel's frame, or None after showing why it is missing (timeout, query error)
+    res = results[name]
+    if isinstance(res, Exception):
+        st.warning(f"Panel unavailable: {res}")
+        return None
+    return res
+
+def raw(q: Raw) -> pd.DataFrame:
+    return qdf(q.sql, q.params)
+
+def merchant_names(ids) -> dict:
+    # merchant_id -> name via dict_merchants; unknown IDs map to themselves
+    if not len(ids):
+        return {}
+    res = qdf("""
+        SELECT id, dictGetOrDefault('analytics.dict_merchants', 'merchant_name', tuple(id), id) AS name
+        FROM (SELECT arrayJoin({ids:Array(String)}) AS id)
+    """, {"ids": sorted(set(map(str, ids)))})
+    return dict(zip(res["id"], res["name"]))
 
 def money(x_cents: float) -> str:
     if x_cents is None:
@@ -37,6 +146,45 @@ def money(x_cents: float) -> str:
 # -----------------------
 st.title("Real-Time Fraud + Revenue Intelligence (Streamlit)")
 
+# -----------------------
+# Data freshness (newest synced transaction, last sync run from analytics.pipeline_runs)
+# -----------------------
+# The DAG syncs every 6 hours; flag the data as stale once a run has clearly been missed
+STALE_AFTER_MINUTES = int(os.environ.get("FRI_STALE_AFTER_MINUTES", "420"))
+
+def human(seconds: float) -> str:
+    seconds = max(int(seconds), 0)
+    if seconds < 3600:
+        return f"{seconds // 60}m"
+    return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+
+# Absolute times only, so the results stay cacheable; ages are computed on each rerun
+fresh = qdf("SELECT count() AS n, max(event_time) AS latest FROM fct_transactions")
+try:
+    last_sync = qdf("""
+        SELECT started_at, duration_s, status
+        FROM pipeline_runs
+        WHERE pipeline = 'sync' AND span = 'total'
+        ORDER BY started_at DESC
+        LIMIT 1
+    """)
+except Exception:
+    last_sync = pd.DataFrame()  # created by the first instrumented run
+
+now = datetime.now(timezone.utc)
+if int(fresh.iloc[0]["n"]):
+    lag = (now - fresh.iloc[0]["latest"]).total_seconds()
+    note = f"Newest transaction {fresh.iloc[0]['latest']:%Y-%m-%d %H:%M} UTC ({human(lag)} ago)"
+    if not last_sync.empty:
+        s = last_sync.iloc[0]
+        note += f" · last sync {human((now - s['started_at']).total_seconds())} ago, {s['duration_s']:.0f}s, {s['status']}"
+    if lag > STALE_AFTER_MINUTES * 60 or (not last_sync.empty and last_sync.iloc[0]["status"] != "ok"):
+        st.warning(f"Data may be stale. {note}")
+    else:
+        st.caption(note)
+else:
+    st.warning("No transactions synced to ClickHouse yet.")
+
 today = date.today()
 default_start = today - timedelta(days=14)
 
@@ -49,73 +197,71 @@ with st.sidebar:
         max_value=today
     )
 
-    # Populate filter dropdowns from ClickHouse
-    # Keep them light (LowCardinality columns -> fast)
-    countries = qdf("SELECT DISTINCT country FROM fct_transactions ORDER BY country")["country"].tolist()
-    risks = qdf("SELECT DISTINCT risk_tier FROM fct_transactions ORDER BY risk_tier")["risk_tier"].tolist()
+    # Filter options from the customer dimension: cost scales with customers, not transactions
+    countries = raw(FILTER_OPTIONS["countries"])["country"].tolist()
+    risks = raw(FILTER_OPTIONS["risks"])["risk_tier"].tolist()
 
     country = st.selectbox("Customer country", ["All"] + countries, index=0)
     risk_tier = st.selectbox("Customer risk tier", ["All"] + risks, index=0)
 
-    # Merchants can be large; show top merchants by txn volume for selection
-    top_merchants = qdf("""
-        SELECT merchant_id, count() AS txn_count
-        FROM fct_transactions
-        WHERE event_time >= {start:Date} AND event_time <= {end:Date}
-        GROUP BY merchant_id
-        ORDER BY txn_count DESC
-        LIMIT 200
-    """, {"start": d1, "end": d2})
-    merchant_options = ["All"] + top_merchants["merchant_id"].astype(str).tolist()
-    merchant_id = st.selectbox("Merchant (top 200 by volume)", merchant_options, index=0)
-
-# Build WHERE clause
-where = ["event_time >= {start:Date}", "event_time <= {end:Date}"]
-params = {"start": d1, "end": d2}
-
-if country != "All":
-    where.append("country = {country:String}")
-    params["country"] = country
-
-if risk_tier != "All":
-    where.append("risk_tier = {risk:String}")
-    params["risk"] = risk_tier
+    # Server-side type-ahead over every merchant (name substring or ID prefix)
+    search = st.text_input("Find merchant", placeholder="Name or ID prefix")
+    found = raw(merchant_search(search))
+    labels = {m: f"{n} · MCC {mcc} · {c}" for m, n, mcc, c in
+              zip(found["merchant_id"], found["merchant_name"], found["mcc"], found["country"])}
+    # Keep the current pick selectable while the search text changes
+    picked = st.session_state.get("merchant", "All")
+    if picked != "All" and picked not in labels:
+        labels[picked] = merchant_names([picked])[picked]
+    merchant_id = st.selectbox("Merchant", ["All"] + list(labels), format_func=lambda m: labels.get(m, m), key="merchant")
+
+    fast = st.toggle("Fast mode", help="Answer panels that read raw transactions from a sample first "
+                     "(estimates with 95% confidence intervals), then refine to exact numbers.")
+
+# Sidebar filters, "All" = unfiltered
+filters = {
+    "day": (d1, d2),
+    "country": None if country == "All" else country,
+    "risk_tier": None if risk_tier == "All" else risk_tier,
+    "merchant_id": None if merchant_id == "All" else merchant_id,
+}
 
+# -----------------------
+# Every panel's query, run as one batch
+# -----------------------
+active = {k: v for k, v in filters.items() if v is not None}
+batch = dashboard_panels(filters)
+batch.update(fraud_panels(filters))
 if merchant_id != "All":
-    where.append("merchant_id = {merchant:String}")
-    params["merchant"] = merchant_id
-
-where_sql = " AND ".join(where)
+    batch["recent"] = recent_transactions(filters)
+# Fast mode samples once per filter set: the rerun after refinement reads the exact cached answers
+view = repr(sorted(active.items()))
+refine = fast_mode() if fast and st.session_state.get("refined") != view else None
+run_batch(batch, refine)
 
 # -----------------------
 # KPI row
 # -----------------------
-kpi = qdf(f"""
-SELECT
-  sumIf(amount_cents, status IN ('authorized','captured')) AS gmv_cents,
-  sumIf(amount_cents, status = 'refunded') AS refund_cents,
-  sumIf(amount_cents, status = 'chargeback') AS chargeback_cents,
-  count() AS txn_count,
-  countIf(status = 'failed') AS failed_count,
-  countIf(risk_tier = 'high') AS high_risk_count
-FROM fct_transactions
-WHERE {where_sql}
-""", params)
-
-gmv = float(kpi.loc[0, "gmv_cents"] or 0)
-refund = float(kpi.loc[0, "refund_cents"] or 0)
-chargeback = float(kpi.loc[0, "chargeback_cents"] or 0)
-net = gmv - refund - chargeback
-txn_count = int(kpi.loc[0, "txn_count"] or 0)
-failed = int(kpi.loc[0, "failed_count"] or 0)
-high_risk = int(kpi.loc[0, "high_risk_count"] or 0)
-
-c1, c2, c3, c4, c5 = st.columns(5)
-c1.metric("GMV", money(gmv))
-c2.metric("Net revenue (proxy)", money(net))
-c3.metric("Chargeback loss", money(chargeback))
-c4.metric("Failed rate", f"{(failed / max(txn_count,1))*100:.2f}%")
-c5.metric("High-risk share", f"{(high_risk / max(txn_count,1))*100:.2f}%")
+kpi = panel("kpi")
+
+if kpi is not None:
+    gmv = float(kpi.loc[0, "gmv_cents"] or 0)
+    refund = float(kpi.loc[0, "refund_cents"] or 0)
+    chargeback = float(kpi.loc[0, "chargeback_cents"] or 0)
+    net = gmv - refund - chargeback
+    txn_count = int(kpi.loc[0, "txn_count"] or 0)
+    failed = int(kpi.loc[0, "failed_count"] or 0)
+    high_risk = int(kpi.loc[0, "high_risk_count"] or 0)
+
+    ci = lambda m: f"± {money(kpi.loc[0, m + '_ci'])} (95% CI)" if m + "_ci" in kpi else None
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("GMV", money(gmv), help=ci("gmv_cents"))
+    c2.metric("Net revenue (proxy)", money(net))
+    c3.metric("Chargeback loss", money(chargeback), help=ci("chargeback_cents"))
+    c4.metric("Failed rate", f"{(failed / max(txn_count,1))*100:.2f}%")
+    c5.metric("High-risk share", f"{(high_risk / max(txn_count,1))*100:.2f}%")
+    if note := sampled(kpi):
+        st.caption(note)
 
 st.divider()
 
@@ -127,20 +273,11 @@ tab1, tab2, tab3 = st.tabs(["Executive", "Fraud Monitoring", "Merchant Deep Dive
 with tab1:
     st.subheader("Daily trends")
 
-    daily = qdf(f"""
-    SELECT
-      toDate(event_time) AS day,
-      sumIf(amount_cents, status IN ('authorized','captured')) AS gmv_cents,
-      sumIf(amount_cents, status='refunded') AS refund_cents,
-      sumIf(amount_cents, status='chargeback') AS chargeback_cents,
-      count() AS txn_count
-    FROM fct_transactions
-    WHERE {where_sql}
-    GROUP BY day
-    ORDER BY day
-    """, params)
-
-    if daily.empty:
+    daily = panel("daily")
+
+    if daily is None:
+        pass
+    elif daily.empty:
         st.info("No data for selected filters.")
     else:
         daily["net_cents"] = daily["gmv_cents"] - daily["refund_cents"] - daily["chargeback_cents"]
@@ -154,76 +291,98 @@ with tab1:
 
         st.caption("Chargeback loss ($)")
         st.line_chart(daily.set_index("day")["chargeback_cents"] / 100.0)
+        if note := sampled(daily):
+            st.caption(note)
 
     st.subheader("Top merchants (by GMV)")
-    top = qdf(f"""
-    SELECT
-      merchant_id,
-      sumIf(amount_cents, status IN ('authorized','captured')) AS gmv_cents,
-      sumIf(amount_cents, status='chargeback') AS chargeback_cents,
-      count() AS txn_count
-    FROM fct_transactions
-    WHERE {where_sql}
-    GROUP BY merchant_id
-    ORDER BY gmv_cents DESC
-    LIMIT 15
-    """, params)
-
-    if not top.empty:
+    top = panel("top")
+
+    if top is not None and not top.empty:
         top_show = top.copy()
         top_show["gmv_usd"] = (top_show["gmv_cents"] / 100.0).round(0)
         top_show["chargeback_usd"] = (top_show["chargeback_cents"] / 100.0).round(0)
-        st.dataframe(top_show[["merchant_id","txn_count","gmv_usd","chargeback_usd"]], use_container_width=True)
+        top_show["merchant_name"] = top_show["merchant_id"].astype(str).map(merchant_names(top_show["merchant_id"].astype(str)))
+        cols = ["merchant_name","merchant_id","txn_count","gmv_usd","chargeback_usd"]
+        if "gmv_cents_ci" in top_show:
+            top_show["gmv_usd_ci"] = (top_show["gmv_cents_ci"] / 100.0).round(0)
+            cols.append("gmv_usd_ci")
+        st.dataframe(top_show[cols], use_container_width=True)
+        if note := sampled(top):
+            st.caption(note)
 
 with tab2:
     st.subheader("Risk & outcomes")
 
-    mix = qdf(f"""
-    SELECT
-      status,
-      count() AS txn_count
-    FROM fct_transactions
-    WHERE {where_sql}
-    GROUP BY status
-    ORDER BY txn_count DESC
-    """, params)
-
     col1, col2 = st.columns(2)
     with col1:
         st.caption("Transaction status distribution")
-        st.bar_chart(mix.set_index("status")["txn_count"])
-
-    risk_dist = qdf(f"""
-    SELECT
-      risk_tier,
-      count() AS txn_count,
-      countIf(status='chargeback') AS chargeback_count,
-      countIf(status='failed') AS failed_count
-    FROM fct_transactions
-    WHERE {where_sql}
-    GROUP BY risk_tier
-    ORDER BY txn_count DESC
-    """, params)
+        if (mix := panel("mix")) is not None:
+            st.bar_chart(mix.set_index("status")["txn_count"])
+            st.caption(sampled(mix))
 
     with col2:
         st.caption("Risk tier distribution")
-        st.bar_chart(risk_dist.set_index("risk_tier")["txn_count"])
+        if (risk_dist := panel("risk_dist")) is not None:
+            st.bar_chart(risk_dist.set_index("risk_tier")["txn_count"])
+            st.caption(sampled(risk_dist))
 
     st.subheader("Chargeback rate trend")
-    cb_trend = qdf(f"""
-    SELECT
-      toDate(event_time) AS day,
-      countIf(status='chargeback') AS cb,
-      count() AS total,
-      if(total=0, 0, cb/total) AS cb_rate
-    FROM fct_transactions
-    WHERE {where_sql}
-    GROUP BY day
-    ORDER BY day
-    """, params)
-
-    if not cb_trend.empty:
+    cb_trend = panel("cb_trend")
+
+    if cb_trend is not None and not cb_trend.empty:
+        cb_trend["cb_rate"] = cb_trend["chargeback_count"] / cb_trend["txn_count"].clip(lower=1)
         st.line_chart(cb_trend.set_index("day")["cb_rate"])
+        if note := sampled(cb_trend):
+            st.caption(note)
+
+    # Alerts and their cases from fraud_alerts (synced from Postgres with the facts)
+    st.subheader("Fraud alerts")
+    alert_kpi = panel("alert_kpi")
+
+    if alert_kpi is not None:
+        alerts = int(alert_kpi.loc[0, "alert_count"] or 0)
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Alerts", f"{alerts:,}")
+        c2.metric("High severity", f"{int(alert_kpi.loc[0, 'high_severity_count'] or 0):,}")
+        c3.metric("Open cases", f"{int(alert_kpi.loc[0, 'open_case_count'] or 0):,}",
+                  help=f"of {int(alert_kpi.loc[0, 'case_count'] or 0):,} cases opened for these alerts")
+        c4.metric("Disputed", f"{(int(alert_kpi.loc[0, 'disputed_count'] or 0) / max(alerts, 1)) * 100:.2f}%")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.caption("Alert volume by severity")
+        if (alert_daily := panel("alert_daily")) is not None and not alert_daily.empty:
+            st.bar_chart(alert_daily.pivot_table(index="day", columns="severity", values="alert_count",
+                                                 aggfunc="sum", fill_value=0))
+
+    with col2:
+        st.caption("Rule hits (an alert counts once per rule it hit)")
+        if (rule_hits := panel("rule_hits")) is not None and not rule_hits.empty:
+            st.bar_chart(rule_hits.set_index("rule")[["alert_count", "high_severity_count"]])
+
+    st.subheader("Case SLA")
+    alert_severity = panel("alert_severity")
+    backlog = panel("case_backlog")
+
+    if alert_severity is not None and not alert_severity.empty:
+        sev = alert_severity.copy()
+        sev["sla_hours"] = sev["severity"].astype(str).map(CASE_SLA_HOURS)
+        sev["close_hours_p50"] = sev["case_close_hours_p50"].astype(float).round(1)
+        st.dataframe(sev[["severity", "alert_count", "case_count", "open_case_count", "closed_case_count",
+                          "close_hours_p50", "sla_hours", "disputed_count"]], use_container_width=True)
+
+    if backlog is not None and not backlog.empty:
+        # Ages of the open cases (opened within the date range) against their severity's SLA
+        age_h = (now - pd.to_datetime(backlog["opened_hour"], utc=True)).dt.total_seconds() / 3600
+        sla = backlog["severity"].astype(str).map(CASE_SLA_HOURS).fillna(max(CASE_SLA_HOURS.values()))
+        breached = int(backlog["open_cases"][age_h > sla].sum())
+        st.metric("Open cases past SLA", f"{breached:,}",
+                  help=", ".join(f"{k} {v}h" for k, v in CASE_SLA_HOURS.items()))
+        bucket = pd.cut(age_h, [-np.inf, 4, 24, 72, 168, np.inf], labels=["<4h", "4-24h", "1-3d", "3-7d", ">7d"])
+        st.caption("Open cases by age")
+        st.bar_chart(backlog.assign(age=bucket.astype(str))
+                     .pivot_table(index="age", columns="severity", values="open_cases", aggfunc="sum", fill_value=0)
+                     .reindex(["<4h", "4-24h", "1-3d", "3-7d", ">7d"], fill_value=0))
 
 with tab3:
     st.subheader("Merchant drill-down (requires Merchant filter)")
@@ -231,52 +390,42 @@ with tab3:
     if merchant_id == "All":
         st.warning("Select a specific Merchant in the sidebar to see drill-down.")
     else:
-        m_daily = qdf(f"""
-        SELECT
-          toDate(event_time) AS day,
-          sumIf(amount_cents, status IN ('authorized','captured')) AS gmv_cents,
-          sumIf(amount_cents, status='chargeback') AS chargeback_cents,
-          count() AS txn_count,
-          countIf(risk_tier='high') AS high_risk_txn
-        FROM fct_transactions
-        WHERE {where_sql}
-        GROUP BY day
-        ORDER BY day
-        """, params)
-
-        col1, col2 = st.columns(2)
-        with col1:
-            st.caption("Merchant GMV ($)")
-            st.line_chart(m_daily.set_index("day")["gmv_cents"] / 100.0)
-        with col2:
-            st.caption("Merchant chargeback loss ($)")
-            st.line_chart(m_daily.set_index("day")["chargeback_cents"] / 100.0)
-
-        st.caption("High-risk share (merchant)")
-        m_daily["high_risk_share"] = m_daily["high_risk_txn"] / m_daily["txn_count"].clip(lower=1)
-        st.line_chart(m_daily.set_index("day")["high_risk_share"])
+        st.markdown(f"**{labels[merchant_id]}** `{merchant_id}`")
+        m_daily = panel("m_daily")
+
+        if m_daily is not None:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.caption("Merchant GMV ($)")
+                st.line_chart(m_daily.set_index("day")["gmv_cents"] / 100.0)
+            with col2:
+                st.caption("Merchant chargeback loss ($)")
+                st.line_chart(m_daily.set_index("day")["chargeback_cents"] / 100.0)
+
+            st.caption("High-risk share (merchant)")
+            m_daily["high_risk_share"] = m_daily["high_risk_count"] / m_daily["txn_count"].clip(lower=1)
+            st.line_chart(m_daily.set_index("day")["high_risk_share"])
+            if note := sampled(m_daily):
+                st.caption(note)
 
         st.subheader("Recent transactions (sample)")
-        recent = qdf(f"""
-        SELECT
-          event_time,
-          txn_id,
-          customer_id,
-          amount_cents,
-          status,
-          country,
-          risk_tier
-        FROM fct_transactions
-        WHERE {where_sql}
-        ORDER BY event_time DESC
-        LIMIT 50
-        """, params)
-
-        if not recent.empty:
+        recent = panel("recent")
+
+        if recent is not None and not recent.empty:
             recent["amount_usd"] = (recent["amount_cents"] / 100.0).round(2)
             st.dataframe(
-                recent[["event_time","txn_id","customer_id","amount_usd","status","country","risk_tier"]],
+                recent[["event_time","txn_id","customer_id","amount_usd","status","country","risk_tier","kyc_tier"]],
                 use_container_width=True
             )
 
-st.caption("Data source: ClickHouse analytics.fct_transactions / analytics.agg_daily_merchant_kpis (serving layer)")
+cache = query_cache()
+st.caption("Data source: ClickHouse analytics (" + ", ".join(f"{t} ×{n}" for t, n in sorted(served.items())) + ") · "
+           f"query cache: {len(cache)} results, {cache.bytes / 2**20:,.1f} MB, {cache.hits:,} hits / {cache.misses:,} misses")
+
+# Progressive refinement: once the exact queries behind sampled panels are cached, rerun to show them
+if refine and refine.pending:
+    with st.spinner("Refining estimates to exact numbers…"):
+        done, _ = wait(refine.pending, timeout=QUERY_TIMEOUT)
+    if len(done) == len(refine.pending) and not any(f.exception() for f in done):
+        st.session_state["refined"] = view
+        st.rerun()
@@ -0,0 +1,219 @@
+import argparse
+import os
+import statistics
+import time
+import uuid
+from datetime import date, datetime, time as dtime, timedelta, timezone
+
+import clickhouse_connect
+
+from dashboard.panels import dashboard_panels
+from dashboard.planner import FACT, fuse, plan
+
+# fct_transactions layout benchmark: runs the dashboard's panel queries, as the
+# planner renders them for the fact table, against each schema variant and
+# reports latency plus rows and bytes read.
+#   baseline        sort key only (day, txn hash)
+#   skip_indexes    + minmax on event_time, set indexes on country/risk_tier/status
+#   projections     + p_by_merchant and p_daily_segments (infra/init_clickhouse/01_olap.sql)
+#   merchant_first  the previous layout: (merchant_id, day, txn hash) key, p_by_time
+# Each variant is a fct_transactions table in its own scratch database, loaded
+# with the same generated rows (deterministic for a given --rows/--days) and
+# merged like a published partition. Per query: "panel" rows are one planner
+# query each, "fused" is the GROUPING SETS scan run_panels sends for the page,
+# "fused_1/8" the same scan on the 1/8 sample fast mode would send instead.
+# Latency is the median of --repeat runs; rows/bytes come from the server's
+# query summary, and the projection used from query_log when it is enabled.
+#   python -m dashboard.bench_schema --rows 20000000 --repeat 5
+
+COLUMNS = """
+  event_time DateTime64(3, 'UTC'),
+  txn_id String, customer_id String, merchant_id String, payment_method_id String,
+  amount_cents Int64,
+  currency LowCardinality(String), channel LowCardinality(String), status LowCardinality(String),
+  country LowCardinality(String), risk_tier LowCardinality(String),
+  _version UInt64"""
+
+# Mirror infra/init_clickhouse/01_olap.sql
+INDEXES = """,
+  INDEX idx_event_time event_time TYPE minmax GRANULARITY 1,
+  INDEX idx_country country TYPE set(256) GRANULARITY 4,
+  INDEX idx_risk_tier risk_tier TYPE set(8) GRANULARITY 4,
+  INDEX idx_status status TYPE set(8) GRANULARITY 4"""
+
+BY_MERCHANT = """,
+  PROJECTION p_by_merchant (SELECT * ORDER BY merchant_id, event_time)"""
+
+# The merchant-first layout's time-ordered copy
+BY_TIME = """,
+  PROJECTION p_by_time (SELECT * ORDER BY event_time)"""
+
+DAILY_SEGMENTS = """,
+  PROJECTION p_daily_segments (
+    SELECT toDate(event_time), country, risk_tier, status,
+      sumIf(amount_cents, status IN ('authorized','captured')),
+      sumIf(amount_cents, status = 'refunded'),
+      sumIf(amount_cents, status = 'chargeback'),
+      count(),
+      countIf(status = 'failed'),
+      countIf(status = 'chargeback'),
+      countIf(risk_tier = 'high')
+    GROUP BY toDate(event_time), country, risk_tier, status
+  )"""
+
+ENGINE = """
+ENGINE = ReplacingMergeTree(_version)
+PARTITION BY toYYYYMM(event_time)
+ORDER BY ({key})
+SAMPLE BY cityHash64(txn_id)
+SETTINGS deduplicate_merge_projection_mode = 'rebuild'"""
+
+KEY = "toDate(event_time), cityHash64(txn_id), txn_id"
+MERCHANT_FIRST_KEY = "merchant_id, toDate(event_time), cityHash64(txn_id), txn_id"
+
+# variant -> (columns, indexes and projections; sort key)
+VARIANTS = {
+    "baseline": (COLUMNS, KEY),
+    "skip_indexes": (COLUMNS + INDEXES, KEY),
+    "projections": (COLUMNS + INDEXES + BY_MERCHANT + DAILY_SEGMENTS, KEY),
+    "merchant_first": (COLUMNS + INDEXES + BY_TIME + DAILY_SEGMENTS, MERCHANT_FIRST_KEY),
+}
+
+# Fast mode's sample fraction for the "fused_1/8" rows
+SAMPLE = 0.125
+
+# Deterministic rows ending at {end}: skewed merchant volume, the generator's
+# countries, risk tiers and status mix (ingestion/generate.py)
+_UUID = "toString(reinterpretAsUUID(concat(reinterpretAsString(cityHash64({x}, {salt})), reinterpretAsString(cityHash64({x}, {salt} + 1)))))"
+LOAD_SQL = f"""SELECT
+  {{end:DateTime64(3)}} - toIntervalMillisecond(cityHash64(number, 0) % ({{days:UInt32}} * 86400000)) AS event_time,
+  {_UUID.format(x="number", salt=10)} AS txn_id,
+  {_UUID.format(x="number % {customers:UInt32}", salt=20)} AS customer_id,
+  {_UUID.format(x="toUInt64(pow(cityHash64(number, 1) % 1000000 / 1000000, 3) * {merchants:UInt32})", salt=30)} AS merchant_id,
+  {_UUID.format(x="number % ({customers:UInt32} * 2)", salt=40)} AS payment_method_id,
+  100 + cityHash64(number, 2) % 50000 AS amount_cents,
+  'USD' AS currency,
+  ['web', 'mobile'][1 + cityHash64(number, 3) % 2] AS channel,
+  multiIf(cityHash64(number, 4) % 1000 < 700, 'captured', cityHash64(number, 4) % 1000 < 900, 'authorized',
+          cityHash64(number, 4) % 1000 < 960, 'failed', cityHash64(number, 4) % 1000 < 990, 'refunded', 'chargeback') AS status,
+  ['US', 'IN', 'GB', 'DE', 'SG', 'AE'][1 + cityHash64(number % {{customers:UInt32}}, 5) % 6] AS country,
+  multiIf(cityHash64(number % {{customers:UInt32}}, 6) % 100 < 70, 'low', cityHash64(number % {{customers:UInt32}}, 6) % 100 < 95, 'medium', 'high') AS risk_tier,
+  1 AS _version
+FROM numbers({{rows:UInt64}})"""
+
+
+def ch_client(database=None):
+    return clickhouse_connect.get_client(
+        host=os.environ.get("FRI_CH_HOST", "localhost"), port=int(os.environ.get("FRI_CH_HTTP_PORT", "8123")),
+        username=os.environ.get("FRI_CH_USER", "fri"), password=os.environ.get("FRI_CH_PASSWORD", "fri"),
+        database=database or os.environ.get("FRI_CH_DB", "analytics"), autogenerate_session_id=False)
+
+
+def load(ch, db, variant, args, end):
+    ddl, key = VARIANTS[variant]
+    ch.command(f"DROP DATABASE IF EXISTS {db}")
+    ch.command(f"CREATE DATABASE {db}")
+    ch.command(f"CREATE TABLE {db}.fct_transactions ({ddl}\n){ENGINE.format(key=key)}")
+    t0 = time.perf_counter()
+    ch.command(f"INSERT INTO {db}.fct_transactions {LOAD_SQL}",
+               parameters={"end": end, "days": args.days, "rows": args.rows, "customers": args.customers, "merchants": args.merchants})
+    # Published partitions hold one version per txn_id (sync_to_clickhouse dedups each staged month)
+    ch.command(f"OPTIMIZE TABLE {db}.fct_transactions FINAL")
+    res = ch.query("SELECT sum(bytes_on_disk) FROM system.parts WHERE database = {db:String} AND active", parameters={"db": db})
+    return time.perf_counter() - t0, res.result_rows[0][0] or 0
+
+
+def scenarios(ch, db, end):
+    # Sidebar states: default range, long range, one country, one merchant, a narrow segment
+    top = ch.query(f"SELECT merchant_id FROM {db}.fct_transactions GROUP BY merchant_id ORDER BY count() DESC LIMIT 1").result_rows[0][0]
+    last = end.date()
+    recent, long = (last - timedelta(days=14), last), (last - timedelta(days=60), last)
+    return {
+        "14d": {"day": recent},
+        "60d": {"day": long},
+        "14d_country": {"day": recent, "country": "GB"},
+        "14d_merchant": {"day": recent, "merchant_id": str(top)},
+        "60d_high_risk_country": {"day": long, "country": "DE", "risk_tier": "high"},
+    }
+
+
+def queries(filters):
+    # (name, sql, params): each panel planned on its own, then the page's fused scan, exact and sampled
+    panels = dashboard_panels(filters)
+    out = []
+    for name, q in panels.items():
+        sql, params, _ = plan(q, {}, source=FACT)
+        out.append((name, sql, params))
+    for job in fuse(panels, {}):
+        out.append(("fused", job.sql, job.params))
+        if job.source.terms is not None:
+            sampled = job.sampled(SAMPLE)
+            out.append((f"fused_1/{round(1 / SAMPLE)}", sampled.sql, sampled.params))
+    return out
+
+
+def query_log(ch, tag):
+    # Projections used per query, if query_log is enabled
+    try:
+        ch.command("SYSTEM FLUSH LOGS")
+        res = ch.query("SELECT any(arrayStringConcat(projections, ',')) FROM system.query_log "
+                       "WHERE type = 'QueryFinish' AND log_comment = {tag:String}", parameters={"tag": tag})
+        return (res.result_rows[0][0] or "-").replace(f"{ch.database}.fct_transactions.", "")
+    except Exception:
+        return "?"
+
+
+def measure(ch, sql, params, repeat):
+    tag = f"bench_schema:{uuid.uuid4().hex}"
+    settings = {"log_comment": tag, "use_query_cache": 0}
+    times, summary = [], {}
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        res = ch.query(sql, parameters=params, settings=settings)
+        times.append(time.perf_counter() - t0)
+        summary = getattr(res, "summary", None) or {}
+    return {"ms": statistics.median(times) * 1000, "rows": int(summary.get("read_rows", 0)),
+            "bytes": int(summary.get("read_bytes", 0)), "projection": query_log(ch, tag)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5_000_000)
+    ap.add_argument("--days", type=int, default=60, help="days of history the rows spread over")
+    ap.add_argument("--customers", type=int, default=200_000)
+    ap.add_argument("--merchants", type=int, default=2_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    ap.add_argument("--keep", action="store_true", help="keep the scratch databases")
+    args = ap.parse_args()
+
+    end = datetime.combine(date.today(), dtime.min, tzinfo=timezone.utc)
+    ch = ch_client()
+    totals = {}
+    for variant in args.variants:
+        db = f"_bench_schema_{variant}"
+        load_s, disk = load(ch, db, variant, args, end)
+        print(f"\n== {variant}: {args.rows:,} rows loaded in {load_s:.1f}s, {disk / 2**20:,.1f} MiB on disk")
+        vch = ch_client(db)
+        print(f"{'scenario':<22} {'query':<10} {'ms':>9} {'rows read':>13} {'MiB read':>9}  projection")
+        total = totals[variant] = {"ms": 0.0, "rows": 0, "bytes": 0, "disk": disk}
+        try:
+            for scenario, filters in scenarios(vch, db, end).items():
+                for name, sql, params in queries(filters):
+                    r = measure(vch, sql, params, args.repeat)
+                    print(f"{scenario:<22} {name:<10} {r['ms']:>9.1f} {r['rows']:>13,} {r['bytes'] / 2**20:>9.1f}  {r['projection']}")
+                    for k in ("ms", "rows", "bytes"):
+                        total[k] += r[k]
+        finally:
+            if not args.keep:
+                ch.command(f"DROP DATABASE IF EXISTS {db}")
+
+    base = totals.get("baseline")
+    print(f"\n{'variant':<15} {'total ms':>10} {'rows read':>14} {'MiB read':>10} {'MiB disk':>9}")
+    for variant, t in totals.items():
+        vs = f"  {base['ms'] / max(t['ms'], 1e-9):.1f}x faster, {base['rows'] / max(t['rows'], 1):.1f}x fewer rows" if base and t is not base else ""
+        print(f"{variant:<15} {t['ms']:>10.1f} {t['rows']:>14,} {t['bytes'] / 2**20:>10.1f} {t['disk'] / 2**20:>9.1f}{vs}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Shared query result cache for the dashboard (one instance per server process,
+# held by st.cache_resource):
+#
+#   cache = QueryCache(generation=lambda: ..., max_bytes=256 << 20)
+#   df = cache.get(sql, params, lambda: run_query(sql, params))
+#
+# Entries are keyed by whitespace-normalized SQL plus parameters and evicted
+# least-recently-used once their total size passes max_bytes. Nothing expires
+# on a timer: the whole cache is dropped when the generation changes, which the
+# sync bumps (analytics._sync_state.synced_at) whenever it publishes new data.
+# Concurrent misses on the same key run the query once; other callers wait.
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_sql(sql):
+    return _WS.sub(" ", sql).strip()
+
+
+def cache_key(sql, params=None):
+    return normalize_sql(sql), tuple(sorted((k, repr(v)) for k, v in (params or {}).items()))
+
+
+def frame_bytes(df):
+    try:
+        return int(df.memory_usage(deep=True).sum())
+    except Exception:
+        return 0
+
+
+class QueryCache:
+    def __init__(self, generation, max_bytes=256 << 20, poll_seconds=2.0, sizeof=frame_bytes):
+        self._generation_fn = generation
+        self.max_bytes = max_bytes
+        self.poll_seconds = poll_seconds
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (value, size)
+        self._inflight = {}             # key -> threading.Event
+        self._generation = None
+        self._checked_at = float("-inf")
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def generation(self):
+        # Re-read at most every poll_seconds; a change drops every cached result
+        now = time.monotonic()
+        if now - self._checked_at >= self.poll_seconds:
+            gen = self._generation_fn()
+            with self._lock:
+                self._checked_at = now
+                if gen != self._generation:
+                    self._generation = gen
+                    self._entries.clear()
+                    self.bytes = 0
+        return self._generation
+
+    def get(self, sql, params, compute):
+        key = (self.generation, cache_key(sql, params))
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key][0]
+                pending = self._inflight.get(key)
+                if pending is None:
+                    pending = self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Someone else is running this query; use their result (or retry if it failed)
+            pending.wait()
+        try:
+            value = compute()
+            self._put(key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            pending.set()
+
+    def _put(self, key, value):
+        size = self._sizeof(value)
+        with self._lock:
+            if key[0] != self._generation or size > self.max_bytes:
+                return  # a sync landed while the query ran, or too big to keep
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def __contains__(self, sql_params):
+        sql, params = sql_params
+        with self._lock:
+            return (self._generation, cache_key(sql, params)) in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
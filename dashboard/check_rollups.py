@@ -0,0 +1,94 @@
+import argparse
+import os
+import random
+import sys
+from datetime import timedelta
+
+import clickhouse_connect
+
+from dashboard.planner import FACT, ROLLUPS, Query, plan
+
+# Rollup correctness check: answers every randomized panel-shaped query from
+# each rollup that can serve it and from fct_transactions, and compares them.
+# Day ranges stay inside the fact table's window (rollups also keep older days,
+# and the first day of the window is only partly in the fact table).
+# Exits non-zero on any mismatch.
+#   python -m dashboard.check_rollups --trials 200
+
+
+def ch_client():
+    return clickhouse_connect.get_client(
+        host=os.environ.get("FRI_CH_HOST", "localhost"), port=int(os.environ.get("FRI_CH_HTTP_PORT", "8123")),
+        username=os.environ.get("FRI_CH_USER", "fri"), password=os.environ.get("FRI_CH_PASSWORD", "fri"),
+        database=os.environ.get("FRI_CH_DB", "analytics"))
+
+
+def rows(ch, sql, params):
+    return ch.query(sql, parameters=params).result_rows
+
+
+def answer(ch, query, source):
+    sql, params, _ = plan(query, {}, source=source)
+    # Key by the group-by values; compare measures as ints (count() is UInt64, rollup sums Int64)
+    nby = len(query.by)
+    return {tuple(str(v) for v in r[:nby]): tuple(int(v) for v in r[nby:]) for r in rows(ch, sql, params)}
+
+
+def random_query(rng, domain, measures):
+    lo, hi = domain["days"]
+    span = (hi - lo).days
+    a = lo + timedelta(days=rng.randint(0, span))
+    b = a + timedelta(days=rng.randint(0, (hi - a).days))
+    filters = {"day": (a, b)}
+    for dim in ("country", "risk_tier", "merchant_id"):
+        if rng.random() < 0.35:
+            filters[dim] = rng.choice(domain[dim])
+    by = rng.sample(["day", "merchant_id", "country", "risk_tier", "status"], rng.choice([0, 1, 1, 2]))
+    return Query(rng.sample(measures, rng.randint(1, 3)), by=by, filters=filters)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trials", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    ch = ch_client()
+    first, last = rows(ch, "SELECT min(toDate(event_time)) + 1, max(toDate(event_time)) FROM fct_transactions", {})[0]
+    if first > last:
+        raise SystemExit("fct_transactions holds less than two days of data; nothing to compare")
+    domain = {"days": (first, last)}
+    for dim in ("country", "risk_tier", "merchant_id"):
+        # Values with no rows are worth testing too: every source must agree on an empty answer
+        domain[dim] = [str(r[0]) for r in rows(ch, f"SELECT DISTINCT {dim} FROM fct_transactions LIMIT 50", {})] + ["none"]
+    domain["merchant_id"][-1] = "00000000-0000-0000-0000-000000000000"
+
+    rng = random.Random(args.seed)
+    measures = list(FACT.measures)
+    checked = bad = 0
+    per_source = {s.table: 0 for s in ROLLUPS}
+    for _ in range(args.trials):
+        q = random_query(rng, domain, measures)
+        sources = [s for s in ROLLUPS if s.can_answer(q)]
+        if not sources:
+            continue
+        expected = answer(ch, q, FACT)
+        for source in sources:
+            got = answer(ch, q, source)
+            checked += 1
+            per_source[source.table] += 1
+            # Rollups may hold all-zero groups (fully cancelled by later changes) that raw has no row for
+            got = {k: v for k, v in got.items() if k in expected or any(v)}
+            if got != expected:
+                bad += 1
+                diff = sorted(set(got.items()) ^ set(expected.items()))[:5]
+                print(f"MISMATCH {source.table}: measures={q.measures} by={q.by} filters={q.filters} diff={diff}")
+
+    print(f"checked {checked} rollup answers against fct_transactions ("
+          + ", ".join(f"{t}={n}" for t, n in per_source.items()) + f"), mismatches={bad}")
+    if bad:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
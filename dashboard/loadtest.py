@@ -0,0 +1,245 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import clickhouse_connect
+
+from dashboard.cache import QueryCache
+from dashboard.panels import (FILTER_OPTIONS, Raw, dashboard_panels, fraud_panels, merchant_search, recent_transactions,
+                              run_panels)
+from dashboard.planner import SOURCES, TABLE_ROWS_SQL
+
+# Concurrent-user load test for the dashboard's serving layer.
+#
+# --users virtual analysts replay dashboard sessions for --duration seconds.
+# Each session opens the page: the sidebar lookups, then every panel. After
+# that the analyst changes one filter at a time (date range, country, risk
+# tier, merchant search and pick, or reset) with exponential think time
+# between changes, and each change reloads the page. The queries come from
+# dashboard/panels.py and the planner, so they are exactly what app.py sends,
+# including rollup routing and GROUPING SETS fusion.
+#
+# Like one dashboard server process, all users share a single --threads query
+# pool and one ClickHouse client. --cache-mb > 0 puts the app's QueryCache in
+# front of ClickHouse, so repeated filter sets are served from memory.
+# Filter values are drawn from the data (day range, dims), and every user's
+# choices follow from --seed.
+#
+# Reports throughput and p50/p95/p99 latency per panel (query time on the
+# server plus transfer) and per page view (wall time including pool queueing).
+# In CI, --max-page-p95-ms and --max-error-rate turn regressions into a
+# non-zero exit and --json keeps the report as an artifact.
+#   python -m dashboard.loadtest --users 20 --duration 60 --think 2
+
+DATA_BOUNDS_SQL = "SELECT min(day) AS first, max(day) AS last FROM agg_daily_segment_cube WHERE txn_count != 0"
+MERCHANTS_SQL = "SELECT toString(merchant_id) AS merchant_id, merchant_name FROM dim_merchants ORDER BY merchant_id LIMIT 20000"
+RANGE_DAYS = [1, 7, 14, 30, 60]
+
+
+def ch_client():
+    return clickhouse_connect.get_client(
+        host=os.environ.get("FRI_CH_HOST", "localhost"), port=int(os.environ.get("FRI_CH_HTTP_PORT", "8123")),
+        username=os.environ.get("FRI_CH_USER", "fri"), password=os.environ.get("FRI_CH_PASSWORD", "fri"),
+        database=os.environ.get("FRI_CH_DB", "analytics"), autogenerate_session_id=False)
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}   # name -> [seconds]
+        self.errors = {}    # name -> count
+        self.samples = {}   # name -> first error message
+
+    def record(self, name, seconds=None, error=None):
+        with self._lock:
+            if error is None:
+                self.latency.setdefault(name, []).append(seconds)
+            else:
+                self.errors[name] = self.errors.get(name, 0) + 1
+                self.samples.setdefault(name, str(error).splitlines()[0][:200])
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(int(p / 100 * len(ordered)), len(ordered) - 1)] if ordered else float("nan")
+
+
+class Dashboard:
+    """What one dashboard server process does per page view, minus Streamlit."""
+
+    def __init__(self, client, pool, cache, table_rows, timeout, stats):
+        self.client = client
+        self.pool = pool
+        self.cache = cache
+        self.table_rows = table_rows
+        self.timeout = timeout
+        self.stats = stats
+
+    def run_sql(self, sql, params, settings=None):
+        compute = lambda: self.client.query_arrow(sql, parameters=params, settings=settings, use_strings=True).to_pandas()
+        return self.cache.get(sql, params, compute) if self.cache else compute()
+
+    def lookup(self, name, raw):
+        # Sidebar queries run inline on the session's thread, as in app.py
+        t0 = time.perf_counter()
+        try:
+            df = self.run_sql(raw.sql, raw.params)
+        except Exception as e:
+            self.stats.record(name, error=e)
+            return None
+        self.stats.record(name, time.perf_counter() - t0)
+        return df
+
+    def page(self, filters):
+        panels = dashboard_panels(filters)
+        panels.update(fraud_panels(filters))
+        if filters.get("merchant_id") is not None:
+            panels["recent"] = recent_transactions(filters)
+        timings = {}
+        t0 = time.perf_counter()
+        results = run_panels(panels, self.table_rows, self.run_sql, self.pool, self.timeout, timings=timings)
+        wall = time.perf_counter() - t0
+        failed = False
+        for name, res in results.items():
+            if isinstance(res, Exception):
+                self.stats.record(name, error=res)
+                failed = True
+            else:
+                self.stats.record(name, timings[name])
+        if failed:
+            self.stats.record("page", error="a panel failed")
+        else:
+            self.stats.record("page", wall)
+
+
+def session(dash, space, rng, deadline, think):
+    # One analyst: open the dashboard, then change one filter per page view until the deadline
+    first, last = space["days"]
+    filters = {"day": (last - timedelta(days=14), last), "country": None, "risk_tier": None, "merchant_id": None}
+    for name, raw in FILTER_OPTIONS.items():
+        dash.lookup(name, raw)
+    dash.lookup("merchant_search", merchant_search(""))
+    while True:
+        dash.page(filters)
+        pause = rng.expovariate(1 / think) if think > 0 else 0
+        if time.monotonic() + pause >= deadline:
+            return
+        time.sleep(pause)
+        action = rng.choices(["range", "country", "risk", "merchant", "reset"], weights=[40, 20, 15, 15, 10])[0]
+        if action == "range":
+            days = rng.choice(RANGE_DAYS)
+            end = last - timedelta(days=rng.randint(0, max((last - first).days - days, 0)))
+            filters["day"] = (max(end - timedelta(days=days - 1), first), end)
+        elif action == "country":
+            filters["country"] = rng.choice(space["countries"] + [None])
+        elif action == "risk":
+            filters["risk_tier"] = rng.choice(space["risks"] + [None])
+        elif action == "merchant" and space["merchants"]:
+            # Type a few characters of a name, then pick that merchant from the results
+            merchant_id, name = rng.choice(space["merchants"])
+            dash.lookup("merchant_search", merchant_search(name[:rng.randint(2, 4)]))
+            filters["merchant_id"] = merchant_id
+        else:
+            filters.update(country=None, risk_tier=None, merchant_id=None)
+
+
+def parameter_space(client):
+    bounds = client.query(DATA_BOUNDS_SQL).result_rows[0]
+    if bounds[0] is None:
+        raise SystemExit("agg_daily_segment_cube is empty: seed, sync and rebuild rollups first")
+    q = lambda raw: client.query(raw.sql, parameters=raw.params).result_rows
+    return {
+        "days": bounds,
+        "countries": [r[0] for r in q(FILTER_OPTIONS["countries"])],
+        "risks": [r[0] for r in q(FILTER_OPTIONS["risks"])],
+        "merchants": [tuple(r) for r in q(Raw(MERCHANTS_SQL))],
+    }
+
+
+def report(stats, elapsed, args):
+    names = ["page"] + sorted(n for n in set(stats.latency) | set(stats.errors) if n != "page")
+    rows = {}
+    for name in names:
+        lat = stats.latency.get(name, [])
+        err = stats.errors.get(name, 0)
+        rows[name] = {"count": len(lat) + err, "errors": err, "per_s": (len(lat) + err) / elapsed,
+                      **{f"p{p}_ms": percentile(lat, p) * 1000 for p in (50, 95, 99)},
+                      "max_ms": max(lat) * 1000 if lat else float("nan")}
+    queries = sum(r["count"] for n, r in rows.items() if n != "page")
+    summary = {"users": args.users, "duration_s": elapsed, "threads": args.threads, "cache_mb": args.cache_mb,
+               "seed": args.seed, "queries": queries, "queries_per_s": queries / elapsed,
+               "page_views": rows["page"]["count"], "page_views_per_s": rows["page"]["per_s"],
+               "error_rate": sum(r["errors"] for n, r in rows.items() if n != "page") / max(queries, 1),
+               "panels": rows, "error_samples": stats.samples}
+
+    print(f"{args.users} users for {elapsed:.0f}s on {args.threads} query threads"
+          f"{f', {args.cache_mb} MB cache' if args.cache_mb else ''}: {summary['page_views']:,} page views "
+          f"({summary['page_views_per_s']:.2f}/s), {queries:,} queries ({summary['queries_per_s']:.1f}/s), "
+          f"error rate {summary['error_rate']:.2%}")
+    print(f"{'panel':<16} {'count':>7} {'errors':>6} {'per s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, r in rows.items():
+        print(f"{name:<16} {r['count']:>7,} {r['errors']:>6,} {r['per_s']:>7.2f} {r['p50_ms']:>8.1f} "
+              f"{r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+    for name, msg in stats.samples.items():
+        print(f"  {name}: {msg}")
+    return summary
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--users", type=int, default=10, help="concurrent analyst sessions")
+    ap.add_argument("--duration", type=float, default=60.0, help="seconds to keep sessions running")
+    ap.add_argument("--think", type=float, default=3.0, help="mean seconds between filter changes (exponential)")
+    ap.add_argument("--threads", type=int, default=8, help="shared query pool size (FRI_DASH_QUERY_THREADS)")
+    ap.add_argument("--timeout", type=float, default=30.0, help="per-page query timeout (FRI_DASH_QUERY_TIMEOUT)")
+    ap.add_argument("--cache-mb", type=int, default=0, help="QueryCache in front of ClickHouse; 0 sends every query")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", default=None, help="write the report here")
+    ap.add_argument("--max-page-p95-ms", type=float, default=None, help="fail if page view p95 exceeds this")
+    ap.add_argument("--max-error-rate", type=float, default=None, help="fail if more than this fraction of queries fail")
+    args = ap.parse_args()
+
+    client = ch_client()
+    space = parameter_space(client)
+    res = client.query(TABLE_ROWS_SQL, parameters={"tables": [s.table for s in SOURCES]})
+    table_rows = {t: int(n) for t, n in res.result_rows}
+    # The data does not change during a run, so the cache generation is constant
+    cache = QueryCache(generation=lambda: 0, max_bytes=args.cache_mb << 20) if args.cache_mb else None
+    stats = Stats()
+    print(f"Days {space['days'][0]}..{space['days'][1]}, {len(space['countries'])} countries, "
+          f"{len(space['risks'])} risk tiers, {len(space['merchants']):,} merchants")
+
+    started = time.monotonic()
+    deadline = started + args.duration
+    with ThreadPoolExecutor(args.threads, thread_name_prefix="panel-query") as pool:
+        dash = Dashboard(client, pool, cache, table_rows, args.timeout, stats)
+        users = [threading.Thread(target=session, name=f"user-{i}", daemon=True,
+                                  args=(dash, space, random.Random(args.seed * 100003 + i), deadline, args.think))
+                 for i in range(args.users)]
+        for u in users:
+            u.start()
+        for u in users:
+            u.join()
+    summary = report(stats, time.monotonic() - started, args)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2, default=str)
+    failures = []
+    if args.max_page_p95_ms is not None and not summary["panels"]["page"]["p95_ms"] <= args.max_page_p95_ms:
+        failures.append(f"page p95 {summary['panels']['page']['p95_ms']:.1f} ms > {args.max_page_p95_ms:.0f} ms")
+    if args.max_error_rate is not None and summary["error_rate"] > args.max_error_rate:
+        failures.append(f"error rate {summary['error_rate']:.2%} > {args.max_error_rate:.2%}")
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import math
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from dashboard.planner import ALERTS, FACT, Query, estimate_sql, fuse, where_clause
+
+# Concurrent panel execution for one dashboard rerun:
+#
+#   results = run_panels({"kpi": Query(...), "daily": Query(...), "recent": Raw(sql, params)},
+#                        table_rows, run_sql, pool, timeout=30)
+#   results["daily"]  -> DataFrame, or the exception that query raised / PanelTimeout
+#
+# Aggregate queries are fused (planner.fuse) so panels over the same slice
+# share one scan; the remaining jobs run at once on the shared thread pool, so
+# a rerun takes about as long as its slowest query. Each job gets `timeout`
+# seconds from submission, enforced server-side with max_execution_time too.
+#
+# Fast mode (fast=FastMode(...)) is progressive: a job that would read more
+# than ~2 * target_rows of fct_transactions, and whose exact answer is not
+# cached yet, runs on a sample sized to about target_rows instead. The exact
+# job is queued behind it on the pool (fast.pending) so it lands in the cache;
+# the app reruns once those finish and the same panels come back exact.
+
+
+class Raw:
+    # Row-level SQL that bypasses the planner (e.g. recent transactions); one job per panel.
+    # table names the serving table it reads, for the app's source counts.
+    def __init__(self, sql, params=None, table=None):
+        self.sql = sql
+        self.params = params or {}
+        self.table = table
+
+
+def dashboard_panels(filters):
+    # The main page's aggregate panels for the sidebar filters (also what bench_schema measures)
+    panels = {
+        "kpi": Query(["gmv_cents", "refund_cents", "chargeback_cents", "txn_count", "failed_count", "high_risk_count"],
+                     filters=filters),
+        "daily": Query(["gmv_cents", "refund_cents", "chargeback_cents", "txn_count"], by=["day"], filters=filters,
+                       order_by="day"),
+        "top": Query(["gmv_cents", "chargeback_cents", "txn_count"], by=["merchant_id"], filters=filters,
+                     order_by="gmv_cents DESC", limit=15),
+        "mix": Query(["txn_count"], by=["status"], filters=filters, order_by="txn_count DESC"),
+        "risk_dist": Query(["txn_count", "chargeback_count", "failed_count"], by=["risk_tier"], filters=filters,
+                           order_by="txn_count DESC"),
+        "cb_trend": Query(["chargeback_count", "txn_count"], by=["day"], filters=filters, order_by="day"),
+    }
+    if filters.get("merchant_id") is not None:
+        panels["m_daily"] = Query(["gmv_cents", "chargeback_cents", "txn_count", "high_risk_count"], by=["day"],
+                                  filters=filters, order_by="day")
+    return panels
+
+
+# Case SLA per alert severity: an open case older than this has breached it
+CASE_SLA_HOURS = {"high": 4, "medium": 24, "low": 72}
+
+
+def fraud_panels(filters):
+    # The Fraud Monitoring tab's panels, all over fraud_alerts (never Postgres). Separate
+    # from dashboard_panels: bench_schema's scratch databases hold no fraud_alerts.
+    panels = {
+        "alert_kpi": Query(["alert_count", "high_severity_count", "case_count", "open_case_count", "disputed_count"],
+                           filters=filters),
+        "alert_daily": Query(["alert_count"], by=["day", "severity"], filters=filters, order_by="day"),
+        "alert_severity": Query(["alert_count", "case_count", "open_case_count", "closed_case_count",
+                                 "case_close_hours_p50", "disputed_count"], by=["severity"], filters=filters,
+                                order_by="alert_count DESC"),
+    }
+    where_sql, params = where_clause(ALERTS, {k: v for k, v in filters.items() if v is not None})
+    panels["rule_hits"] = Raw(f"""
+    SELECT rule, count() AS alert_count, countIf(severity = 'high') AS high_severity_count
+    FROM fraud_alerts
+    ARRAY JOIN rule_hits AS rule
+    WHERE {where_sql}
+    GROUP BY rule
+    ORDER BY alert_count DESC
+    """, params, ALERTS.table)
+    # Open cases by the hour they were opened: absolute times keep the result cacheable,
+    # the app ages them against CASE_SLA_HOURS on each rerun
+    panels["case_backlog"] = Raw(f"""
+    SELECT toStartOfHour(case_opened_at) AS opened_hour, severity, count() AS open_cases
+    FROM fraud_alerts
+    WHERE {where_sql} AND case_id != '' AND case_closed_at IS NULL
+    GROUP BY opened_hour, severity
+    ORDER BY opened_hour
+    """, params, ALERTS.table)
+    return panels
+
+
+# Sidebar lookups: options come from the synced dims and their dictionaries
+# (infra/init_clickhouse/01_olap.sql), never from a fact scan
+FILTER_OPTIONS = {
+    "countries": Raw("SELECT DISTINCT country FROM dim_customers ORDER BY country"),
+    "risks": Raw("SELECT DISTINCT risk_tier FROM dim_customers ORDER BY risk_tier"),
+}
+
+MERCHANT_SEARCH_SQL = """
+    SELECT toString(merchant_id) AS merchant_id, merchant_name, mcc, country
+    FROM dim_merchants
+    WHERE lower(merchant_name) LIKE {pattern:String} OR startsWith(toString(merchant_id), {prefix:String})
+    ORDER BY merchant_name
+    LIMIT 200
+"""
+
+
+def like_pattern(text):
+    # Substring match on a user-typed string, with LIKE wildcards taken literally
+    escaped = text.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def merchant_search(text):
+    # Type-ahead over every merchant: name substring or ID prefix
+    text = text.strip()
+    return Raw(MERCHANT_SEARCH_SQL, {"pattern": like_pattern(text), "prefix": text.lower()})
+
+
+def recent_transactions(filters):
+    # Row-level: always the fact table
+    where_sql, params = where_clause(FACT, {k: v for k, v in filters.items() if v is not None})
+    return Raw(f"""
+    SELECT
+      event_time,
+      txn_id,
+      customer_id,
+      dictGetOrDefault('analytics.dict_customers', 'kyc_tier', tuple(toString(customer_id)), '') AS kyc_tier,
+      amount_cents,
+      status,
+      country,
+      risk_tier
+    FROM fct_transactions
+    WHERE {where_sql}
+    ORDER BY event_time DESC
+    LIMIT 50
+    """, params, FACT.table)
+
+
+class PanelTimeout(Exception):
+    pass
+
+
+class _RawJob:
+    def __init__(self, name, raw):
+        self.queries = {name: raw}
+        self.sql = raw.sql
+        self.params = raw.params
+
+    def split(self, df):
+        return dict.fromkeys(self.queries, df)
+
+
+class FastMode:
+    """estimate_rows(sql, params) -> rows the EXPLAIN ESTIMATE sql selects;
+    cached(sql, params) -> whether the exact answer is already cached."""
+
+    def __init__(self, estimate_rows, cached, target_rows=2_000_000):
+        self.estimate_rows = estimate_rows
+        self.cached = cached
+        self.target_rows = target_rows
+        self.pending = []   # futures of exact jobs refining sampled panels
+
+    def fraction(self, job):
+        # Power-of-two sample fraction leaving about target_rows to read; None when not worth sampling
+        filters = next(iter(job.queries.values())).filters
+        if job.source.terms is None or self.cached(job.sql, job.params):
+            return None
+        # One merchant's rows are read exactly from p_by_merchant; a SAMPLE reads
+        # the day-first key instead and would scan more (dashboard/bench_schema.py)
+        if filters.get("merchant_id") is not None:
+            return None
+        rows = self.estimate_rows(*estimate_sql(job.source, filters))
+        if rows <= 2 * self.target_rows:
+            return None
+        return 2.0 ** -math.ceil(math.log2(rows / self.target_rows))
+
+
+def _timed(run_sql, sql, params, settings):
+    t0 = time.perf_counter()
+    df = run_sql(sql, params, settings)
+    return df, time.perf_counter() - t0
+
+
+def run_panels(panels, table_rows, run_sql, pool, timeout=30.0, fast=None, timings=None):
+    """run_sql(sql, params, settings) -> DataFrame; called from pool threads.
+
+    If given, timings is filled with panel name -> seconds its query ran (not
+    counting time queued for a pool thread), for the panels that answered.
+    """
+    planned = {name: q for name, q in panels.items() if not isinstance(q, Raw)}
+    jobs = fuse(planned, table_rows)
+    settings = {"max_execution_time": max(int(timeout), 1)}
+    exact = []
+    if fast is not None:
+        for i, job in enumerate(jobs):
+            fraction = fast.fraction(job)
+            if fraction:
+                exact.append(job)
+                jobs[i] = job.sampled(fraction)
+    jobs += [_RawJob(name, q) for name, q in panels.items() if isinstance(q, Raw)]
+    started = time.monotonic()
+    futures = [(pool.submit(_timed, run_sql, job.sql, job.params, settings), job) for job in jobs]
+    # Refinements queue behind every panel's first answer
+    for job in exact:
+        fast.pending.append(pool.submit(run_sql, job.sql, job.params, settings))
+    results = {}
+    for fut, job in futures:
+        try:
+            df, seconds = fut.result(timeout=max(started + timeout - time.monotonic(), 0))
+            results.update(job.split(df))
+            if timings is not None:
+                timings.update(dict.fromkeys(job.queries, seconds))
+        except FutureTimeout:
+            err = PanelTimeout(f"query did not finish within {timeout:.0f}s")
+            results.update(dict.fromkeys(job.queries, err))
+        except Exception as e:
+            results.update(dict.fromkeys(job.queries, e))
+    return results
@@ -0,0 +1,264 @@
+# Rollup-aware query planner for the dashboard panels.
+#
+#   q = Query(["gmv_cents", "txn_count"], by=["day"], filters=filters, order_by="day")
+#   sql, params, source = plan(q, table_rows)
+#
+# A panel names the measures it needs, the dimensions to group by and the
+# sidebar filters (day range, country, risk_tier, merchant_id). plan() sends
+# it to the smallest source that holds every one of them: the daily rollups
+# are exact for these measures, so the raw fact table is only read when no
+# rollup qualifies. Row-level panels (recent transactions) query
+# fct_transactions directly, with where_clause(FACT, filters) for the filters.
+# Alert and case measures come from fraud_alerts (alert -> case -> transaction
+# -> dispute rows synced by warehouse/sync_to_clickhouse.py), which takes the
+# same filters.
+#
+# Rollups keep days that have aged out of fct_transactions' window, so a range
+# reaching past the window returns more history from a rollup than from raw.
+#
+# Queries that must read fct_transactions can instead be estimated from a
+# sample (fct_transactions is SAMPLE BY cityHash64(txn_id), the key column right
+# after the day, so a sample skips granules): Job(..., sample=p)
+# scales each measure by 1/p and adds a <measure>_ci column, the 95% confidence
+# half-width.
+
+class Source:
+    def __init__(self, table, dims, measures, terms=None):
+        self.table = table
+        self.dims = dims            # dimension -> column expression
+        self.measures = measures    # measure -> aggregate expression
+        self.terms = terms          # measure -> (value, condition) summed by the measure; set when the table has a SAMPLE BY key
+
+    def can_answer(self, query):
+        return (set(query.by) | set(query.filters)) <= set(self.dims) and set(query.measures) <= set(self.measures)
+
+    def __repr__(self):
+        return f"Source({self.table!r})"
+
+
+_PAID = "status IN ('authorized','captured')"
+
+FACT = Source("fct_transactions", {
+    "day": "toDate(event_time)", "merchant_id": "merchant_id", "country": "country",
+    "risk_tier": "risk_tier", "status": "status",
+}, {
+    "gmv_cents": f"sumIf(amount_cents, {_PAID})",
+    "refund_cents": "sumIf(amount_cents, status = 'refunded')",
+    "chargeback_cents": "sumIf(amount_cents, status = 'chargeback')",
+    "txn_count": "count()",
+    "failed_count": "countIf(status = 'failed')",
+    "chargeback_count": "countIf(status = 'chargeback')",
+    "high_risk_count": "countIf(risk_tier = 'high')",
+}, terms={
+    "gmv_cents": ("amount_cents", _PAID),
+    "refund_cents": ("amount_cents", "status = 'refunded'"),
+    "chargeback_cents": ("amount_cents", "status = 'chargeback'"),
+    "txn_count": ("1", "1"),
+    "failed_count": ("1", "status = 'failed'"),
+    "chargeback_count": ("1", "status = 'chargeback'"),
+    "high_risk_count": ("1", "risk_tier = 'high'"),
+})
+
+# agg_daily_txn_cube / agg_daily_segment_cube rows carry txn_count and amount_cents per status.
+# Columns are qualified (render() reads FROM <table> AS t) so the txn_count output
+# alias does not shadow the column inside the other measures.
+_CUBE_MEASURES = {
+    "gmv_cents": f"sumIf(t.amount_cents, {_PAID})",
+    "refund_cents": "sumIf(t.amount_cents, status = 'refunded')",
+    "chargeback_cents": "sumIf(t.amount_cents, status = 'chargeback')",
+    "txn_count": "sum(t.txn_count)",
+    "failed_count": "sumIf(t.txn_count, status = 'failed')",
+    "chargeback_count": "sumIf(t.txn_count, status = 'chargeback')",
+    "high_risk_count": "sumIf(t.txn_count, risk_tier = 'high')",
+}
+
+ROLLUPS = [
+    Source("agg_daily_merchant_kpis", {"day": "day", "merchant_id": "merchant_id"}, {
+        "gmv_cents": "sum(gmv_cents)",
+        "refund_cents": "sum(refund_cents)",
+        "chargeback_cents": "sum(chargeback_cents)",
+        "txn_count": "sum(txn_count)",
+        "failed_count": "sum(failed_count)",
+        "high_risk_count": "sum(high_risk_txn_count)",
+    }),
+    Source("agg_daily_segment_cube", {d: d for d in ("day", "country", "risk_tier", "status")}, _CUBE_MEASURES),
+    Source("agg_daily_txn_cube", {d: d for d in ("day", "merchant_id", "country", "risk_tier", "status")}, _CUBE_MEASURES),
+]
+
+# One row per alert with its latest case and dispute; day is the alert's day, and the
+# customer and merchant columns are the alerted transaction's
+_CASE_OPEN = "case_id != '' AND case_closed_at IS NULL"
+
+ALERTS = Source("fraud_alerts", {
+    "day": "toDate(alert_time)", "merchant_id": "merchant_id", "country": "country",
+    "risk_tier": "risk_tier", "severity": "severity",
+}, {
+    "alert_count": "count()",
+    "high_severity_count": "countIf(severity = 'high')",
+    "alert_amount_cents": "sum(amount_cents)",
+    "case_count": "countIf(case_id != '')",
+    "open_case_count": f"countIf({_CASE_OPEN})",
+    "closed_case_count": "countIf(case_closed_at IS NOT NULL)",
+    "case_close_hours_p50": "quantileIf(0.5)(dateDiff('second', case_opened_at, case_closed_at), "
+                            "case_closed_at IS NOT NULL) / 3600",
+    "disputed_count": "countIf(dispute_id != '')",
+})
+
+# Tables the raw queries fall back to, in order, when no rollup answers
+BASES = [FACT, ALERTS]
+
+SOURCES = ROLLUPS + BASES
+
+# Filter -> query parameter name and ClickHouse type
+FILTER_PARAMS = {"country": ("country", "String"), "risk_tier": ("risk", "String"), "merchant_id": ("merchant", "String")}
+
+
+class Query:
+    def __init__(self, measures, by=(), filters=None, order_by=None, limit=None):
+        self.measures = list(measures)
+        self.by = list(by)
+        # {"day": (start, end)} (inclusive dates) plus equality filters; None values are dropped
+        self.filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        self.order_by = order_by
+        self.limit = limit
+
+
+def where_clause(source, filters):
+    where, params = [], {}
+    for dim, value in filters.items():
+        col = source.dims[dim]
+        if dim == "day":
+            where.append(f"{col} BETWEEN {{start:Date}} AND {{end:Date}}")
+            params["start"], params["end"] = value
+        else:
+            name, typ = FILTER_PARAMS[dim]
+            where.append(f"{col} = {{{name}:{typ}}}")
+            params[name] = value
+    return " AND ".join(where) or "1", params
+
+
+def render(query, source):
+    select = [f"{source.dims[d]} AS {d}" for d in query.by] + [f"{source.measures[m]} AS {m}" for m in query.measures]
+    where_sql, params = where_clause(source, query.filters)
+    sql = f"SELECT {', '.join(select)}\nFROM {source.table} AS t\nWHERE {where_sql}"
+    if query.by:
+        sql += f"\nGROUP BY {', '.join(query.by)}"
+    if query.order_by:
+        sql += f"\nORDER BY {query.order_by}"
+    if query.limit:
+        sql += f"\nLIMIT {int(query.limit)}"
+    return sql, params
+
+
+def choose(query, table_rows):
+    # Smallest qualifying source by row count. Rollups missing from table_rows or empty
+    # (created but not yet backfilled with --rebuild-rollups) are skipped.
+    candidates = [s for s in ROLLUPS if s.can_answer(query) and table_rows.get(s.table)]
+    if not candidates:
+        return next((s for s in BASES if s.can_answer(query)), FACT)
+    return min(candidates, key=lambda s: table_rows[s.table])
+
+
+def plan(query, table_rows, source=None):
+    source = source or choose(query, table_rows)
+    if not source.can_answer(query):
+        raise ValueError(f"{source.table} cannot answer {query.measures} by {query.by} filtered on {list(query.filters)}")
+    return (*render(query, source), source)
+
+
+def estimate_sql(source, filters):
+    # Rows the filters select, estimated from primary key marks (no data read)
+    where_sql, params = where_clause(source, filters)
+    return f"EXPLAIN ESTIMATE SELECT 1 FROM {source.table} AS t WHERE {where_sql}", params
+
+
+def sampled_measure(source, name, fraction):
+    # Horvitz-Thompson total over a Bernoulli sample of rate p: sum(x)/p, variance (1-p)/p^2 * sum(x^2)
+    value, cond = source.terms[name]
+    x = f"toFloat64({value})"
+    return [f"sumIf({x}, {cond}) / {fraction!r} AS {name}",
+            f"1.96 * sqrt({1 - fraction!r} * sumIf({x} * {x}, {cond})) / {fraction!r} AS {name}_ci"]
+
+
+# Active rows per table, the size plan() compares sources by
+TABLE_ROWS_SQL = """SELECT table, sum(rows) AS rows
+FROM system.parts
+WHERE database = currentDatabase() AND active AND table IN {tables:Array(String)}
+GROUP BY table"""
+
+
+# -----------------------
+# Fusing: one scan for several panels
+# -----------------------
+class Job:
+    """One ClickHouse query answering one or more named panel queries.
+
+    Queries sent to the same source with the same filters are fused: a single
+    GROUP BY GROUPING SETS computes every measure any of them needs, one
+    grouping set per distinct group-by, and split() cuts the result back into
+    per-panel frames (grouping() tells the sets apart). Ordering and limits are
+    applied per panel after the split. With sample=p the scan reads a p sample
+    and the frames carry estimates, <measure>_ci columns and attrs["sample"].
+    """
+
+    def __init__(self, source, queries, sample=None):
+        self.source = source
+        self.queries = queries
+        self.sample = sample
+        self.sets = list(dict.fromkeys(tuple(q.by) for q in queries.values()))
+        if len(queries) == 1 and not sample:
+            self.sql, self.params = render(next(iter(queries.values())), source)
+            return
+        dims = [d for d in source.dims if any(d in s for s in self.sets)]
+        measures = list(dict.fromkeys(m for q in queries.values() for m in q.measures))
+        select = [f"{source.dims[d]} AS {d}" for d in dims]
+        if sample:
+            select += [expr for m in measures for expr in sampled_measure(source, m, sample)]
+        else:
+            select += [f"{source.measures[m]} AS {m}" for m in measures]
+        where_sql, self.params = where_clause(source, next(iter(queries.values())).filters)
+        if len(self.sets) > 1:
+            # Standard GROUPING(): bit set (first argument highest) when that column is not in the row's set
+            select.append(f"grouping({', '.join(dims)}) AS _grouping")
+            self.masks = {s: sum(1 << (len(dims) - 1 - i) for i, d in enumerate(dims) if d not in s) for s in self.sets}
+            group_by = "GROUPING SETS (" + ", ".join(f"({', '.join(s)})" for s in self.sets) + ")"
+        else:
+            group_by = ", ".join(dims)
+        sample_sql = f" SAMPLE {sample!r}" if sample else ""
+        self.sql = f"SELECT {', '.join(select)}\nFROM {source.table} AS t{sample_sql}\nWHERE {where_sql}"
+        if dims:
+            self.sql += f"\nGROUP BY {group_by}"
+
+    def sampled(self, fraction):
+        return Job(self.source, self.queries, sample=fraction)
+
+    def split(self, df):
+        if len(self.queries) == 1 and not self.sample:
+            return dict.fromkeys(self.queries, df)
+        out = {}
+        for name, q in self.queries.items():
+            part = df[df["_grouping"] == self.masks[tuple(q.by)]] if len(self.sets) > 1 else df
+            part = part[q.by + q.measures + ([f"{m}_ci" for m in q.measures] if self.sample else [])]
+            if not q.by and part.empty:
+                # Grand total over no rows: the measures are sums and counts
+                part = part.reindex([0]).fillna(0)
+            if q.order_by:
+                keys = [k.split() for k in q.order_by.split(",")]
+                part = part.sort_values([k[0] for k in keys], ascending=[k[1:] != ["DESC"] for k in keys])
+            if q.limit:
+                part = part.head(int(q.limit))
+            out[name] = part.reset_index(drop=True)
+            if self.sample:
+                out[name].attrs["sample"] = self.sample
+        return out
+
+
+def fuse(queries, table_rows):
+    # Named queries -> Jobs: each query goes to the source plan() would pick, and
+    # queries sharing a source and filters share a scan
+    groups = {}
+    for name, q in queries.items():
+        source = choose(q, table_rows)
+        key = (source.table, tuple(sorted((k, repr(v)) for k, v in q.filters.items())))
+        groups.setdefault(key, (source, {}))[1][name] = q
+    return [Job(source, named) for source, named in groups.values()]
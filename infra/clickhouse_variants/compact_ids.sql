@@ -0,0 +1,200 @@
+-- Schema variant: compact IDs. txn/customer/merchant/payment-method IDs as
+-- native UUID (16 bytes) instead of their 36-char String form: smaller on
+-- disk, on the wire (the sync sends them as 16-byte Arrow fixed binary) and
+-- in memory. A missing payment method is stored as the nil UUID.
+--
+-- Drops and recreates the fact, changelog, rollup and dimension tables, then reload:
+--   make ch-variant VARIANT=compact_ids && make sync-full
+-- Re-run infra/init_clickhouse/01_olap.sql after dropping these tables to go back.
+DROP VIEW IF EXISTS analytics.mv_agg_daily_merchant_kpis;
+DROP VIEW IF EXISTS analytics.mv_agg_daily_txn_cube;
+DROP VIEW IF EXISTS analytics.mv_agg_daily_segment_cube;
+DROP TABLE IF EXISTS analytics.agg_daily_merchant_kpis;
+DROP TABLE IF EXISTS analytics.agg_daily_txn_cube;
+DROP TABLE IF EXISTS analytics.agg_daily_segment_cube;
+DROP TABLE IF EXISTS analytics.fct_transactions_changes;
+DROP TABLE IF EXISTS analytics.fct_transactions;
+DROP TABLE IF EXISTS analytics._shadow_fct_transactions;
+DROP TABLE IF EXISTS analytics.dim_merchants;
+DROP TABLE IF EXISTS analytics.dim_customers;
+
+CREATE TABLE analytics.fct_transactions (
+  event_time DateTime64(3, 'UTC'),
+  txn_id UUID,
+  customer_id UUID,
+  merchant_id UUID,
+  payment_method_id UUID,
+  amount_cents Int64,
+  currency LowCardinality(String),
+  channel LowCardinality(String),
+  status LowCardinality(String),
+  country LowCardinality(String),
+  risk_tier LowCardinality(String),
+  -- Source updated_at in µs: the highest version of a txn_id survives merges
+  _version UInt64,
+  -- Reads filter on time first (the key), then on segment columns the key
+  -- cannot prune on
+  INDEX idx_event_time event_time TYPE minmax GRANULARITY 1,
+  INDEX idx_country country TYPE set(256) GRANULARITY 4,
+  INDEX idx_risk_tier risk_tier TYPE set(8) GRANULARITY 4,
+  INDEX idx_status status TYPE set(8) GRANULARITY 4,
+  -- Merchant-ordered copy for panels filtered on one merchant
+  PROJECTION p_by_merchant (SELECT * ORDER BY merchant_id, event_time),
+  -- Daily segment totals with the aggregates dashboard/planner.py's FACT source
+  -- renders, so planner fallbacks to the fact table read pre-aggregated rows
+  PROJECTION p_daily_segments (
+    SELECT toDate(event_time), country, risk_tier, status,
+      sumIf(amount_cents, status IN ('authorized','captured')),
+      sumIf(amount_cents, status = 'refunded'),
+      sumIf(amount_cents, status = 'chargeback'),
+      count(),
+      countIf(status = 'failed'),
+      countIf(status = 'chargeback'),
+      countIf(risk_tier = 'high')
+    GROUP BY toDate(event_time), country, risk_tier, status
+  )
+)
+-- Dedup key is still per txn_id (a txn never changes merchant or day). The
+-- txn_id hash in the key lets the dashboard's fast mode read a SAMPLE of it.
+-- Changing the key needs a recreate: DROP TABLE analytics.fct_transactions and
+-- analytics._pending_fct_transactions (the sync's parked copy, created AS this
+-- table), re-run this file, then `make sync-full && make rollups`.
+-- Projections are skipped by FINAL reads; nothing reads the table with FINAL
+-- except --rebuild-rollups, since published partitions are already merged.
+-- Compare layouts with `make bench-schema` (dashboard/bench_schema.py).
+ENGINE = ReplacingMergeTree(_version)
+PARTITION BY toYYYYMM(event_time)
+ORDER BY (toDate(event_time), cityHash64(txn_id), txn_id)
+SAMPLE BY cityHash64(txn_id)
+-- Merges that drop superseded versions rebuild the projections to match
+SETTINGS deduplicate_merge_projection_mode = 'rebuild';
+
+-- Every fact change the sync publishes, as signed rows: +1 for a new or changed
+-- version, -1 for the version it supersedes. Null engine: nothing is stored,
+-- the materialized views below consume the inserts.
+CREATE TABLE analytics.fct_transactions_changes (
+  event_time DateTime64(3, 'UTC'),
+  txn_id UUID,
+  customer_id UUID,
+  merchant_id UUID,
+  payment_method_id UUID,
+  amount_cents Int64,
+  currency LowCardinality(String),
+  channel LowCardinality(String),
+  status LowCardinality(String),
+  country LowCardinality(String),
+  risk_tier LowCardinality(String),
+  _version UInt64,
+  sign Int8
+)
+ENGINE = Null;
+
+-- Maintained by mv_agg_daily_merchant_kpis: parts hold partial sums until merged,
+-- so read with sum(...) GROUP BY day, merchant_id
+CREATE TABLE analytics.agg_daily_merchant_kpis (
+  day Date,
+  merchant_id UUID,
+  gmv_cents Int64,
+  net_revenue_cents Int64,
+  refund_cents Int64,
+  chargeback_cents Int64,
+  txn_count Int64,
+  failed_count Int64,
+  high_risk_txn_count Int64
+)
+ENGINE = SummingMergeTree
+PARTITION BY toYYYYMM(day)
+ORDER BY (day, merchant_id);
+
+CREATE MATERIALIZED VIEW analytics.mv_agg_daily_merchant_kpis
+TO analytics.agg_daily_merchant_kpis AS
+SELECT
+  toDate(event_time) AS day,
+  merchant_id,
+  sum(if(status IN ('authorized','captured'), amount_cents, 0) * sign) AS gmv_cents,
+  sum(multiIf(status IN ('authorized','captured'), amount_cents, status IN ('refunded','chargeback'), -amount_cents, 0) * sign) AS net_revenue_cents,
+  sum(if(status = 'refunded', amount_cents, 0) * sign) AS refund_cents,
+  sum(if(status = 'chargeback', amount_cents, 0) * sign) AS chargeback_cents,
+  sum(toInt64(sign)) AS txn_count,
+  sum((status = 'failed') * sign) AS failed_count,
+  sum((risk_tier = 'high') * sign) AS high_risk_txn_count
+FROM analytics.fct_transactions_changes
+GROUP BY day, merchant_id;
+
+-- Status-level daily cubes for the dashboard's query planner (dashboard/planner.py),
+-- maintained from the changes table like agg_daily_merchant_kpis. Every measure
+-- the panels show is a sum over status/risk_tier of txn_count or amount_cents.
+CREATE TABLE analytics.agg_daily_txn_cube (
+  day Date,
+  merchant_id UUID,
+  country LowCardinality(String),
+  risk_tier LowCardinality(String),
+  status LowCardinality(String),
+  txn_count Int64,
+  amount_cents Int64
+)
+ENGINE = SummingMergeTree
+PARTITION BY toYYYYMM(day)
+ORDER BY (day, merchant_id, country, risk_tier, status);
+
+CREATE MATERIALIZED VIEW analytics.mv_agg_daily_txn_cube
+TO analytics.agg_daily_txn_cube AS
+SELECT
+  toDate(event_time) AS day,
+  merchant_id,
+  country,
+  risk_tier,
+  status,
+  sum(toInt64(sign)) AS txn_count,
+  sum(amount_cents * sign) AS amount_cents
+FROM analytics.fct_transactions_changes
+GROUP BY day, merchant_id, country, risk_tier, status;
+
+-- Same cube without merchant_id: answers every panel not filtered or grouped by merchant
+CREATE TABLE analytics.agg_daily_segment_cube (
+  day Date,
+  country LowCardinality(String),
+  risk_tier LowCardinality(String),
+  status LowCardinality(String),
+  txn_count Int64,
+  amount_cents Int64
+)
+ENGINE = SummingMergeTree
+PARTITION BY toYYYYMM(day)
+ORDER BY (day, country, risk_tier, status);
+
+CREATE MATERIALIZED VIEW analytics.mv_agg_daily_segment_cube
+TO analytics.agg_daily_segment_cube AS
+SELECT
+  toDate(event_time) AS day,
+  country,
+  risk_tier,
+  status,
+  sum(toInt64(sign)) AS txn_count,
+  sum(amount_cents * sign) AS amount_cents
+FROM analytics.fct_transactions_changes
+GROUP BY day, country, risk_tier, status;
+
+-- Dimension snapshots (dict_merchants / dict_customers read them by toString(id), unchanged)
+CREATE TABLE analytics.dim_merchants (
+  merchant_id UUID,
+  merchant_name String,
+  mcc LowCardinality(String),
+  country LowCardinality(String),
+  risk_tier LowCardinality(String),
+  created_at DateTime64(3, 'UTC'),
+  INDEX idx_merchant_name lower(merchant_name) TYPE ngrambf_v1(3, 4096, 2, 0) GRANULARITY 1
+)
+ENGINE = MergeTree
+ORDER BY merchant_id
+SETTINGS index_granularity = 1024;
+
+CREATE TABLE analytics.dim_customers (
+  customer_id UUID,
+  country LowCardinality(String),
+  risk_tier LowCardinality(String),
+  kyc_tier LowCardinality(String),
+  created_at DateTime64(3, 'UTC')
+)
+ENGINE = MergeTree
+ORDER BY customer_id;
@@ -12,12 +12,68 @@ CREATE TABLE IF NOT EXISTS analytics.fct_transactions (
   channel LowCardinality(String),
   status LowCardinality(String),
   country LowCardinality(String),
-  risk_tier LowCardinality(String)
+  risk_tier LowCardinality(String),
+  -- Source updated_at in µs: the highest version of a txn_id survives merges
+  _version UInt64,
+  -- Reads filter on time first (the key), then on segment columns the key
+  -- cannot prune on
+  INDEX idx_event_time event_time TYPE minmax GRANULARITY 1,
+  INDEX idx_country country TYPE set(256) GRANULARITY 4,
+  INDEX idx_risk_tier risk_tier TYPE set(8) GRANULARITY 4,
+  INDEX idx_status status TYPE set(8) GRANULARITY 4,
+  -- Merchant-ordered copy for panels filtered on one merchant
+  PROJECTION p_by_merchant (SELECT * ORDER BY merchant_id, event_time),
+  -- Daily segment totals with the aggregates dashboard/planner.py's FACT source
+  -- renders, so planner fallbacks to the fact table read pre-aggregated rows
+  PROJECTION p_daily_segments (
+    SELECT toDate(event_time), country, risk_tier, status,
+      sumIf(amount_cents, status IN ('authorized','captured')),
+      sumIf(amount_cents, status = 'refunded'),
+      sumIf(amount_cents, status = 'chargeback'),
+      count(),
+      countIf(status = 'failed'),
+      countIf(status = 'chargeback'),
+      countIf(risk_tier = 'high')
+    GROUP BY toDate(event_time), country, risk_tier, status
+  )
 )
-ENGINE = MergeTree
+-- Dedup key is still per txn_id (a txn never changes merchant or day). The
+-- txn_id hash in the key lets the dashboard's fast mode read a SAMPLE of it.
+-- Changing the key needs a recreate: DROP TABLE analytics.fct_transactions and
+-- analytics._pending_fct_transactions (the sync's parked copy, created AS this
+-- table), re-run this file, then `make sync-full && make rollups`.
+-- Projections are skipped by FINAL reads; nothing reads the table with FINAL
+-- except --rebuild-rollups, since published partitions are already merged.
+-- Compare layouts with `make bench-schema` (dashboard/bench_schema.py).
+ENGINE = ReplacingMergeTree(_version)
 PARTITION BY toYYYYMM(event_time)
-ORDER BY (merchant_id, event_time, txn_id);
+ORDER BY (toDate(event_time), cityHash64(txn_id), txn_id)
+SAMPLE BY cityHash64(txn_id)
+-- Merges that drop superseded versions rebuild the projections to match
+SETTINGS deduplicate_merge_projection_mode = 'rebuild';
 
+-- Every fact change the sync publishes, as signed rows: +1 for a new or changed
+-- version, -1 for the version it supersedes. Null engine: nothing is stored,
+-- the materialized views below consume the inserts.
+CREATE TABLE IF NOT EXISTS analytics.fct_transactions_changes (
+  event_time DateTime64(3, 'UTC'),
+  txn_id String,
+  customer_id String,
+  merchant_id String,
+  payment_method_id String,
+  amount_cents Int64,
+  currency LowCardinality(String),
+  channel LowCardinality(String),
+  status LowCardinality(String),
+  country LowCardinality(String),
+  risk_tier LowCardinality(String),
+  _version UInt64,
+  sign Int8
+)
+ENGINE = Null;
+
+-- Maintained by mv_agg_daily_merchant_kpis: parts hold partial sums until merged,
+-- so read with sum(...) GROUP BY day, merchant_id
 CREATE TABLE IF NOT EXISTS analytics.agg_daily_merchant_kpis (
   day Date,
   merchant_id String,
@@ -25,10 +81,230 @@ CREATE TABLE IF NOT EXISTS analytics.agg_daily_merchant_kpis (
   net_revenue_cents Int64,
   refund_cents Int64,
   chargeback_cents Int64,
-  txn_count UInt64,
-  failed_count UInt64,
-  high_risk_txn_count UInt64
+  txn_count Int64,
+  failed_count Int64,
+  high_risk_txn_count Int64
 )
-ENGINE = MergeTree
+ENGINE = SummingMergeTree
 PARTITION BY toYYYYMM(day)
 ORDER BY (day, merchant_id);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS analytics.mv_agg_daily_merchant_kpis
+TO analytics.agg_daily_merchant_kpis AS
+SELECT
+  toDate(event_time) AS day,
+  merchant_id,
+  sum(if(status IN ('authorized','captured'), amount_cents, 0) * sign) AS gmv_cents,
+  sum(multiIf(status IN ('authorized','captured'), amount_cents, status IN ('refunded','chargeback'), -amount_cents, 0) * sign) AS net_revenue_cents,
+  sum(if(status = 'refunded', amount_cents, 0) * sign) AS refund_cents,
+  sum(if(status = 'chargeback', amount_cents, 0) * sign) AS chargeback_cents,
+  sum(toInt64(sign)) AS txn_count,
+  sum((status = 'failed') * sign) AS failed_count,
+  sum((risk_tier = 'high') * sign) AS high_risk_txn_count
+FROM analytics.fct_transactions_changes
+GROUP BY day, merchant_id;
+
+-- Status-level daily cubes for the dashboard's query planner (dashboard/planner.py),
+-- maintained from the changes table like agg_daily_merchant_kpis. Every measure
+-- the panels show is a sum over status/risk_tier of txn_count or amount_cents.
+CREATE TABLE IF NOT EXISTS analytics.agg_daily_txn_cube (
+  day Date,
+  merchant_id String,
+  country LowCardinality(String),
+  risk_tier LowCardinality(String),
+  status LowCardinality(String),
+  txn_count Int64,
+  amount_cents Int64
+)
+ENGINE = SummingMergeTree
+PARTITION BY toYYYYMM(day)
+ORDER BY (day, merchant_id, country, risk_tier, status);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS analytics.mv_agg_daily_txn_cube
+TO analytics.agg_daily_txn_cube AS
+SELECT
+  toDate(event_time) AS day,
+  merchant_id,
+  country,
+  risk_tier,
+  status,
+  sum(toInt64(sign)) AS txn_count,
+  sum(amount_cents * sign) AS amount_cents
+FROM analytics.fct_transactions_changes
+GROUP BY day, merchant_id, country, risk_tier, status;
+
+-- Same cube without merchant_id: answers every panel not filtered or grouped by merchant
+CREATE TABLE IF NOT EXISTS analytics.agg_daily_segment_cube (
+  day Date,
+  country LowCardinality(String),
+  risk_tier LowCardinality(String),
+  status LowCardinality(String),
+  txn_count Int64,
+  amount_cents Int64
+)
+ENGINE = SummingMergeTree
+PARTITION BY toYYYYMM(day)
+ORDER BY (day, country, risk_tier, status);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS analytics.mv_agg_daily_segment_cube
+TO analytics.agg_daily_segment_cube AS
+SELECT
+  toDate(event_time) AS day,
+  country,
+  risk_tier,
+  status,
+  sum(toInt64(sign)) AS txn_count,
+  sum(amount_cents * sign) AS amount_cents
+FROM analytics.fct_transactions_changes
+GROUP BY day, country, risk_tier, status;
+
+-- Dimension snapshots, reloaded whole by every sync (small next to the facts)
+CREATE TABLE IF NOT EXISTS analytics.dim_merchants (
+  merchant_id String,
+  merchant_name String,
+  mcc LowCardinality(String),
+  country LowCardinality(String),
+  risk_tier LowCardinality(String),
+  created_at DateTime64(3, 'UTC'),
+  -- Type-ahead search: lower(merchant_name) LIKE '%...%' skips granules without the n-grams
+  INDEX idx_merchant_name lower(merchant_name) TYPE ngrambf_v1(3, 4096, 2, 0) GRANULARITY 1
+)
+ENGINE = MergeTree
+ORDER BY merchant_id
+SETTINGS index_granularity = 1024;
+
+-- Customer attributes only; contact details (email, phone) stay in Postgres
+CREATE TABLE IF NOT EXISTS analytics.dim_customers (
+  customer_id String,
+  country LowCardinality(String),
+  risk_tier LowCardinality(String),
+  kyc_tier LowCardinality(String),
+  created_at DateTime64(3, 'UTC')
+)
+ENGINE = MergeTree
+ORDER BY customer_id;
+
+-- In-memory lookups for names and attributes: dictGet('analytics.dict_merchants',
+-- 'merchant_name', tuple(toString(merchant_id))) instead of a join. Keyed on the
+-- ID's text form so the same lookups work with the compact_ids variant. The sync
+-- reloads them after refreshing the dims. They connect through the dict_source named
+-- collection (infra/clickhouse_config/named_collections.xml), so no password is stored
+-- here; dictionaries created before it existed are replaced with DROP DICTIONARY and
+-- these two statements.
+CREATE DICTIONARY IF NOT EXISTS analytics.dict_merchants (
+  merchant_id String,
+  merchant_name String,
+  mcc String,
+  country String,
+  risk_tier String
+)
+PRIMARY KEY merchant_id
+SOURCE(CLICKHOUSE(QUERY 'SELECT toString(merchant_id) AS merchant_id, merchant_name, mcc, country, risk_tier FROM analytics.dim_merchants' NAME dict_source))
+LAYOUT(COMPLEX_KEY_HASHED())
+LIFETIME(MIN 300 MAX 600);
+
+CREATE DICTIONARY IF NOT EXISTS analytics.dict_customers (
+  customer_id String,
+  country String,
+  risk_tier String,
+  kyc_tier String
+)
+PRIMARY KEY customer_id
+SOURCE(CLICKHOUSE(QUERY 'SELECT toString(customer_id) AS customer_id, country, risk_tier, kyc_tier FROM analytics.dim_customers' NAME dict_source))
+LAYOUT(COMPLEX_KEY_HASHED())
+LIFETIME(MIN 300 MAX 600);
+
+-- Fraud operations serving table: one wide row per alert with its case, transaction
+-- and latest dispute, for the dashboard's Fraud Monitoring tab. Synced a month at
+-- a time like fct_transactions (each month rebuilt whole and swapped in with
+-- REPLACE PARTITION), so rows are never duplicated and need no FINAL. Missing
+-- links are '' / 0 / NULL. rule_hits comes from alerts.details.rules.
+CREATE TABLE IF NOT EXISTS analytics.fraud_alerts (
+  alert_time DateTime64(3, 'UTC'),
+  alert_id String,
+  customer_id String,
+  country LowCardinality(String),
+  risk_tier LowCardinality(String),
+  rule_name LowCardinality(String),
+  rule_hits Array(LowCardinality(String)),
+  severity LowCardinality(String),
+  score Float32,
+  txn_id String,
+  merchant_id String,
+  amount_cents Int64,
+  channel LowCardinality(String),
+  txn_status LowCardinality(String),
+  case_id String,
+  case_status LowCardinality(String),
+  investigator LowCardinality(String),
+  case_opened_at Nullable(DateTime64(3, 'UTC')),
+  case_closed_at Nullable(DateTime64(3, 'UTC')),
+  dispute_id String,
+  dispute_reason LowCardinality(String),
+  dispute_outcome LowCardinality(String),
+  dispute_amount_cents Int64,
+  disputed_at Nullable(DateTime64(3, 'UTC')),
+  INDEX idx_merchant merchant_id TYPE bloom_filter GRANULARITY 4,
+  INDEX idx_case_status case_status TYPE set(8) GRANULARITY 4
+)
+ENGINE = MergeTree
+PARTITION BY toYYYYMM(alert_time)
+ORDER BY (toDate(alert_time), severity, alert_id);
+
+-- Incremental sync high-watermarks (warehouse/sync_to_clickhouse.py), latest synced_at per table wins
+CREATE TABLE IF NOT EXISTS analytics._sync_state (
+  table_name LowCardinality(String),
+  watermark DateTime64(6, 'UTC'),
+  rows UInt64,
+  full_refresh UInt8,
+  synced_at DateTime64(3, 'UTC') DEFAULT now64(3)
+)
+ENGINE = ReplacingMergeTree(synced_at)
+ORDER BY table_name;
+
+-- Fact months whose rollup changes the sync has emitted but may not have published
+-- yet, latest updated_at per part wins. While pending = 1 the rollups reflect the
+-- month's copy parked in analytics._pending_fct_transactions (created by the sync),
+-- and the next sync publishes that copy instead of emitting the changes again.
+CREATE TABLE IF NOT EXISTS analytics._publish_pending (
+  part String,
+  rows UInt64,
+  pending UInt8,
+  updated_at DateTime64(6, 'UTC') DEFAULT now64(6)
+)
+ENGINE = ReplacingMergeTree(updated_at)
+ORDER BY part;
+
+-- Pipeline run telemetry (warehouse/telemetry.py): one row per phase plus a "total" row per run
+CREATE TABLE IF NOT EXISTS analytics.pipeline_runs (
+  run_id String,
+  pipeline LowCardinality(String),
+  span LowCardinality(String),
+  started_at DateTime64(3, 'UTC'),
+  duration_s Float64,
+  calls UInt32,
+  rows UInt64,
+  bytes UInt64,
+  peak_rss_bytes UInt64,
+  status LowCardinality(String),
+  freshness_lag_s Nullable(Float64),
+  host LowCardinality(String)
+)
+ENGINE = MergeTree
+PARTITION BY toYYYYMM(started_at)
+ORDER BY (pipeline, started_at, run_id, span);
+
+-- Velocity feature snapshots (ingestion/features.py), long format and sparse: a
+-- row per (entity, feature) that is non-zero or just returned to zero, so the
+-- value at time T is the latest row at or before T (argMax(value, snapshot_at))
+CREATE TABLE IF NOT EXISTS analytics.feature_snapshots (
+  snapshot_at DateTime64(3, 'UTC'),
+  entity_type LowCardinality(String),
+  entity_id String,
+  feature LowCardinality(String),
+  value Float64
+)
+ENGINE = MergeTree
+PARTITION BY toYYYYMMDD(snapshot_at)
+ORDER BY (entity_type, feature, entity_id, snapshot_at)
+TTL toDateTime(snapshot_at) + INTERVAL 30 DAY;
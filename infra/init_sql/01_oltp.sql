@@ -50,9 +50,16 @@ CREATE TABLE IF NOT EXISTS sessions (
   started_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
+-- transactions and events are range-partitioned by UTC month on their time
+-- column (the months the ClickHouse sync extracts one by one), so time-window
+-- reads touch only the months they need and retention drops whole months.
+-- Unique keys must include the partition column (idempotency keys are unique
+-- on their own in transaction_idempotency below); rows outside every month
+-- partition land in the DEFAULT partition until partitions are created for
+-- them (ensure_month_partitions below, run by python -m ingestion.partitions).
 CREATE TABLE IF NOT EXISTS transactions (
-  txn_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-  idempotency_key TEXT NOT NULL UNIQUE,
+  txn_id UUID NOT NULL DEFAULT gen_random_uuid(),
+  idempotency_key TEXT NOT NULL,
   created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
   customer_id UUID NOT NULL REFERENCES customers(customer_id),
   merchant_id UUID NOT NULL REFERENCES merchants(merchant_id),
@@ -63,32 +70,69 @@ CREATE TABLE IF NOT EXISTS transactions (
   channel TEXT NOT NULL CHECK (channel IN ('web','mobile')),
   status TEXT NOT NULL CHECK (status IN ('authorized','captured','failed','refunded','chargeback')),
   auth_code TEXT,
-  failure_reason TEXT
+  failure_reason TEXT,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (txn_id, created_at),
+  UNIQUE (idempotency_key, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS transactions_default PARTITION OF transactions DEFAULT;
+
+-- Bumped on every UPDATE; drives the incremental ClickHouse sync watermark
+CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+BEGIN NEW.updated_at := now(); RETURN NEW; END $$ LANGUAGE plpgsql;
+CREATE OR REPLACE TRIGGER trg_transactions_updated_at BEFORE UPDATE ON transactions
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+-- One row per idempotency key across every month: UNIQUE (idempotency_key,
+-- created_at) above only rejects a retry that repeats the original created_at.
+-- The statement trigger claims the keys in the inserting transaction, so a key
+-- reused under another created_at fails the insert; bulk loaders skip claimed
+-- keys first (ingestion/db.py load_transactions). Retention deletes the claims
+-- of dropped months (python -m ingestion.partitions).
+CREATE TABLE IF NOT EXISTS transaction_idempotency (
+  idempotency_key TEXT PRIMARY KEY,
+  txn_id UUID NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL
 );
+CREATE INDEX IF NOT EXISTS idx_txn_idempotency_created ON transaction_idempotency(created_at);
+CREATE OR REPLACE FUNCTION claim_idempotency_keys() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO transaction_idempotency (idempotency_key, txn_id, created_at)
+  SELECT idempotency_key, txn_id, created_at FROM inserted;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+CREATE OR REPLACE TRIGGER trg_transactions_idempotency AFTER INSERT ON transactions
+  REFERENCING NEW TABLE AS inserted FOR EACH STATEMENT EXECUTE FUNCTION claim_idempotency_keys();
 
 CREATE TABLE IF NOT EXISTS events (
-  event_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  event_id UUID NOT NULL DEFAULT gen_random_uuid(),
   event_time TIMESTAMPTZ NOT NULL DEFAULT now(),
   customer_id UUID REFERENCES customers(customer_id),
   session_id UUID REFERENCES sessions(session_id),
   event_type TEXT NOT NULL CHECK (event_type IN ('signup','login','password_reset','kyc_started','kyc_verified','pm_added','address_change')),
-  metadata JSONB NOT NULL DEFAULT '{}'::jsonb
-);
+  metadata JSONB NOT NULL DEFAULT '{}'::jsonb,
+  PRIMARY KEY (event_id, event_time)
+) PARTITION BY RANGE (event_time);
+CREATE TABLE IF NOT EXISTS events_default PARTITION OF events DEFAULT;
+
+-- disputes.txn_id and alerts.txn_id carry no foreign key: txn_id alone is not
+-- unique on the partitioned table, and retention drops old transaction months.
 
 CREATE TABLE IF NOT EXISTS disputes (
   dispute_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
   created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-  txn_id UUID NOT NULL REFERENCES transactions(txn_id),
+  txn_id UUID NOT NULL,
   dispute_reason TEXT NOT NULL,
   outcome TEXT NOT NULL CHECK (outcome IN ('open','won','lost')),
-  amount_cents BIGINT NOT NULL CHECK (amount_cents > 0)
+  amount_cents BIGINT NOT NULL CHECK (amount_cents > 0),
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
 );
 
 CREATE TABLE IF NOT EXISTS alerts (
   alert_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
   created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
   customer_id UUID REFERENCES customers(customer_id),
-  txn_id UUID REFERENCES transactions(txn_id),
+  txn_id UUID,
   rule_name TEXT NOT NULL,
   severity TEXT NOT NULL CHECK (severity IN ('low','medium','high')),
   score NUMERIC(6,3) NOT NULL,
@@ -101,11 +145,140 @@ CREATE TABLE IF NOT EXISTS cases (
   alert_id UUID REFERENCES alerts(alert_id),
   status TEXT NOT NULL CHECK (status IN ('open','in_review','closed_legit','closed_fraud')),
   investigator TEXT,
-  closed_at TIMESTAMPTZ
+  closed_at TIMESTAMPTZ,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Dispute outcomes and case status changes reach the ClickHouse fraud_alerts sync the same way
+CREATE OR REPLACE TRIGGER trg_disputes_updated_at BEFORE UPDATE ON disputes
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+CREATE OR REPLACE TRIGGER trg_cases_updated_at BEFORE UPDATE ON cases
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+-- Generator bookkeeping: one row per committed chunk so `generate --run-id` can resume
+CREATE TABLE IF NOT EXISTS ingestion_runs (
+  run_id TEXT PRIMARY KEY,
+  started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  total_rows BIGINT NOT NULL,
+  chunk_size BIGINT NOT NULL,
+  seed BIGINT NOT NULL,
+  as_of TIMESTAMPTZ NOT NULL,
+  sample_existing BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS ingestion_run_chunks (
+  run_id TEXT NOT NULL REFERENCES ingestion_runs(run_id),
+  chunk_no INT NOT NULL,
+  txn_rows BIGINT NOT NULL,
+  committed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (run_id, chunk_no)
 );
 
 -- Helpful indexes (baseline)
 CREATE INDEX IF NOT EXISTS idx_txn_customer_time ON transactions(customer_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_txn_merchant_time ON transactions(merchant_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_txn_updated_at ON transactions(updated_at);
 CREATE INDEX IF NOT EXISTS idx_events_customer_time ON events(customer_id, event_time DESC);
+-- Time-range scans within a month: rows arrive roughly in time order, so a
+-- few-KB BRIN per partition narrows them to the matching block ranges
+CREATE INDEX IF NOT EXISTS idx_txn_created_brin ON transactions USING brin (created_at) WITH (pages_per_range = 32);
+CREATE INDEX IF NOT EXISTS idx_events_time_brin ON events USING brin (event_time) WITH (pages_per_range = 32);
 CREATE INDEX IF NOT EXISTS idx_alerts_time ON alerts(created_at DESC);
+-- alert -> case / transaction -> dispute joins of the fraud_alerts sync, and its change scans
+CREATE INDEX IF NOT EXISTS idx_alerts_txn ON alerts(txn_id);
+CREATE INDEX IF NOT EXISTS idx_cases_alert ON cases(alert_id);
+CREATE INDEX IF NOT EXISTS idx_disputes_txn ON disputes(txn_id);
+CREATE INDEX IF NOT EXISTS idx_cases_updated_at ON cases(updated_at);
+CREATE INDEX IF NOT EXISTS idx_disputes_updated_at ON disputes(updated_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_customer ON sessions(customer_id);
+CREATE INDEX IF NOT EXISTS idx_pm_customer ON payment_methods(customer_id) WHERE is_active;
+
+-- Month partitions <table>_pYYYYMM for every UTC month overlapping
+-- [first_ts, last_ts] that does not exist yet. Rows of a new month already in
+-- the DEFAULT partition move into it; the partition is filled standalone and
+-- then attached, which locks the parent only against DDL, not against writers.
+-- DEFAULT itself is locked against writes from before the move until commit:
+-- a row of the month inserted between the move and the ATTACH would land in
+-- DEFAULT and fail the ATTACH. Writers to other months are not blocked.
+-- Returns the partitions created.
+CREATE OR REPLACE FUNCTION ensure_month_partitions(parent regclass, first_ts timestamptz, last_ts timestamptz)
+RETURNS SETOF text AS $$
+DECLARE
+  nsp text;
+  rel text;
+  key text;
+  def regclass;
+  m timestamp := date_trunc('month', first_ts AT TIME ZONE 'UTC');
+  lo timestamptz;
+  hi timestamptz;
+  part text;
+BEGIN
+  SELECT n.nspname, c.relname, a.attname INTO nsp, rel, key
+  FROM pg_partitioned_table p
+  JOIN pg_class c ON c.oid = p.partrelid
+  JOIN pg_namespace n ON n.oid = c.relnamespace
+  JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+  WHERE p.partrelid = parent;
+  IF key IS NULL THEN
+    RAISE EXCEPTION '% is not a partitioned table', parent;
+  END IF;
+  SELECT i.inhrelid::regclass INTO def
+  FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+  WHERE i.inhparent = parent AND pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT';
+
+  WHILE m <= last_ts AT TIME ZONE 'UTC' LOOP
+    lo := m AT TIME ZONE 'UTC';
+    hi := (m + interval '1 month') AT TIME ZONE 'UTC';
+    part := format('%I.%I', nsp, rel || '_p' || to_char(m, 'YYYYMM'));
+    IF to_regclass(part) IS NULL THEN
+      EXECUTE format('CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part, parent);
+      -- Lets ATTACH skip re-validating the rows
+      EXECUTE format('ALTER TABLE %s ADD CONSTRAINT %I CHECK (%I >= %L AND %I < %L)',
+                     part, rel || '_bounds', key, lo, key, hi);
+      IF def IS NOT NULL THEN
+        EXECUTE format('LOCK TABLE %s IN SHARE ROW EXCLUSIVE MODE', def);
+        EXECUTE format('WITH moved AS (DELETE FROM %s WHERE %I >= $1 AND %I < $2 RETURNING *) INSERT INTO %s SELECT * FROM moved',
+                       def, key, key, part) USING lo, hi;
+      END IF;
+      EXECUTE format('ALTER TABLE %s ATTACH PARTITION %s FOR VALUES FROM (%L) TO (%L)', parent, part, lo, hi);
+      EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', part, rel || '_bounds');
+      RETURN NEXT part::regclass::text;
+    END IF;
+    m := m + interval '1 month';
+  END LOOP;
+END $$ LANGUAGE plpgsql;
+
+-- Retention: drops the month partitions that end at or before cutoff, and
+-- deletes DEFAULT-partition rows older than it. Returns the partitions dropped.
+CREATE OR REPLACE FUNCTION drop_month_partitions(parent regclass, cutoff timestamptz)
+RETURNS SETOF text AS $$
+DECLARE
+  key text;
+  part regclass;
+  bound text;
+BEGIN
+  SELECT a.attname INTO key
+  FROM pg_partitioned_table p
+  JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0]
+  WHERE p.partrelid = parent;
+  IF key IS NULL THEN
+    RAISE EXCEPTION '% is not a partitioned table', parent;
+  END IF;
+  FOR part, bound IN
+    SELECT i.inhrelid::regclass, pg_get_expr(c.relpartbound, c.oid)
+    FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = parent
+    ORDER BY 1
+  LOOP
+    IF bound = 'DEFAULT' THEN
+      EXECUTE format('DELETE FROM %s WHERE %I < $1', part, key) USING cutoff;
+    ELSIF (regexp_match(bound, 'TO \(''([^'']+)''\)'))[1]::timestamptz <= cutoff THEN
+      RETURN NEXT part::text;
+      EXECUTE format('DROP TABLE %s', part);
+    END IF;
+  END LOOP;
+END $$ LANGUAGE plpgsql;
+
+-- Months around initialisation; python -m ingestion.partitions keeps them rolling
+SELECT ensure_month_partitions('transactions', now() - interval '2 months', now() + interval '2 months');
+SELECT ensure_month_partitions('events', now() - interval '2 months', now() + interval '2 months');
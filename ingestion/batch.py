@@ -0,0 +1,233 @@
+import json
+from string import ascii_letters
+
+import numpy as np
+
+from ingestion.rules import DEFAULT_RULES
+
+# Vocabularies mirror ingestion.generate; codes below index into these arrays.
+STATUS = np.array(["authorized", "captured", "failed", "refunded", "chargeback"])
+ST_AUTHORIZED, ST_CAPTURED, ST_FAILED, ST_REFUNDED, ST_CHARGEBACK = range(5)
+CHANNEL = np.array(["web", "mobile"])
+FAILURE_REASON = np.array(["insufficient_funds", "stolen_card", "3ds_failed", "suspected_fraud"])
+DISPUTE_REASON = np.array(["fraud", "service_not_received", "duplicate"])
+DISPUTE_OUTCOME = np.array(["open", "lost", "won"])
+
+RULE_NAMES = [r.name for r in DEFAULT_RULES.rules]
+RISK_NAMES = ["low", "medium", "high"]
+RISK = np.array(RISK_NAMES)
+
+_HEX = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+_UUID_POS = np.array([i for i in range(36) if i not in (8, 13, 18, 23)])
+_LETTERS = np.frombuffer(ascii_letters.encode(), dtype=np.uint8)
+# First octets that never fall in private/loopback/link-local/CGNAT space
+_PUBLIC_OCTETS = np.array([o for o in range(1, 224) if o not in (10, 100, 127, 169, 172, 192)])
+
+
+def _rule_details():
+    # details JSON keyed by (mask, cust_risk, merch_risk); matches json.dumps output of the row path
+    out = []
+    for m in range(1 << len(RULE_NAMES)):
+        rules = [r for i, r in enumerate(RULE_NAMES) if m & (1 << i)]
+        for cr in RISK_NAMES:
+            for mr in RISK_NAMES:
+                out.append(json.dumps({"rules": rules, "cust_risk": cr, "merch_risk": mr}))
+    return np.array(out, dtype=object)
+
+
+RULE_DETAILS = _rule_details()
+
+
+class EntityIndex:
+    """Array-backed view of customers/merchants and their sessions/payment methods."""
+
+    def __init__(self, customer_rows, merchant_rows, sessions_by_customer, pms_by_customer):
+        self.cust_ids = np.array([str(r[0]) for r in customer_rows])
+        self.cust_risk = np.array([RISK_NAMES.index(r[1]) for r in customer_rows], dtype=np.int8)
+        self.merch_ids = np.array([str(r[0]) for r in merchant_rows])
+        self.merch_risk = np.array([RISK_NAMES.index(r[1]) for r in merchant_rows], dtype=np.int8)
+        self.sess_off, self.sess_cnt, self.sess_ids = self._csr(customer_rows, sessions_by_customer)
+        self.pm_off, self.pm_cnt, self.pm_ids = self._csr(customer_rows, pms_by_customer)
+
+    @staticmethod
+    def _csr(customer_rows, by_customer):
+        counts = np.array([len(by_customer.get(r[0], ())) for r in customer_rows], dtype=np.int64)
+        offsets = np.zeros(len(counts), dtype=np.int64)
+        np.cumsum(counts[:-1], out=offsets[1:])
+        ids = [str(x) for r in customer_rows for x in by_customer.get(r[0], ())]
+        return offsets, counts, np.array(ids, dtype=object)
+
+    def pick(self, rng, ci, offsets, counts, ids):
+        # Uniform pick among a customer's children, None when the customer has none
+        cnt = counts[ci]
+        has = cnt > 0
+        out = np.full(len(ci), None, dtype=object)
+        pos = offsets[ci[has]] + (rng.random(int(has.sum())) * cnt[has]).astype(np.int64)
+        out[has] = ids[pos]
+        return out
+
+
+def uuid4_str(rng, n):
+    raw = np.frombuffer(rng.bytes(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hexed = np.empty((n, 32), dtype=np.uint8)
+    hexed[:, 0::2] = _HEX[raw >> 4]
+    hexed[:, 1::2] = _HEX[raw & 0x0F]
+    out = np.full((n, 36), ord("-"), dtype=np.uint8)
+    out[:, _UUID_POS] = hexed
+    return out.view("S36").ravel().astype("U36"), hexed.view("S32").ravel().astype("U32")
+
+
+def iso_times(ts):
+    return np.datetime_as_string(ts, unit="us", timezone="UTC")
+
+
+def random_times(rng, as_of, n, days):
+    secs = rng.integers(0, days * 24 * 3600, n, endpoint=True)
+    return as_of - secs.astype("timedelta64[s]")
+
+
+def ipv4_public(rng, n):
+    octets = rng.integers(0, 256, (n, 4))
+    octets[:, 0] = _PUBLIC_OCTETS[rng.integers(0, len(_PUBLIC_OCTETS), n)]
+    s = octets.astype("U3")
+    out = s[:, 0]
+    for i in range(1, 4):
+        out = np.char.add(np.char.add(out, "."), s[:, i])
+    return out
+
+
+def auth_codes(rng, n):
+    # Same shape as fake.bothify("??#####"): two ASCII letters, five digits
+    out = np.empty((n, 7), dtype=np.uint8)
+    out[:, :2] = _LETTERS[rng.integers(0, len(_LETTERS), (n, 2))]
+    out[:, 2:] = rng.integers(ord("0"), ord("9") + 1, (n, 5))
+    return out.view("S7").ravel().astype("U7")
+
+
+def _nullable(values, mask):
+    out = np.full(len(mask), None, dtype=object)
+    out[mask] = values
+    return out
+
+
+def gen_txns_batch(rng, n, idx, as_of, days=30):
+    """Build one chunk of transactions plus the events, disputes, alerts and cases
+    that depend on it, column-wise. Returns {table: {column: ndarray}} in insert order."""
+    ci = rng.integers(0, len(idx.cust_ids), n)
+    mi = rng.integers(0, len(idx.merch_ids), n)
+    cust_high = idx.cust_risk[ci] == 2
+    merch_high = idx.merch_risk[mi] == 2
+    session_id = idx.pick(rng, ci, idx.sess_off, idx.sess_cnt, idx.sess_ids)
+    pm_id = idx.pick(rng, ci, idx.pm_off, idx.pm_cnt, idx.pm_ids)
+
+    # Amount distribution: most small, 3% big outliers
+    amount = rng.integers(200, 20000, n, endpoint=True)
+    outlier = rng.random(n) < 0.03
+    amount[outlier] *= rng.integers(20, 80, int(outlier.sum()), endpoint=True)
+
+    channel = CHANNEL[rng.integers(0, len(CHANNEL), n)]
+    t = random_times(rng, as_of, n, days)
+
+    # Status influenced by risk
+    fail_p = 0.03 + 0.05 * cust_high + 0.03 * merch_high
+    cb_p = 0.004 + 0.02 * cust_high
+    refund_p = 0.01
+    r = rng.random(n)
+    status = np.where(rng.random(n) < 0.2, ST_AUTHORIZED, ST_CAPTURED)
+    status[r < fail_p + cb_p + refund_p] = ST_REFUNDED
+    status[r < fail_p + cb_p] = ST_CHARGEBACK
+    status[r < fail_p] = ST_FAILED
+
+    txn_id, txn_hex = uuid4_str(rng, n)
+    approved = status <= ST_CAPTURED
+    failed = status == ST_FAILED
+
+    cust_id = idx.cust_ids[ci]
+    txn_time = iso_times(t)
+    txns = {
+        "txn_id": txn_id,
+        "idempotency_key": np.char.add("idem_", txn_hex),
+        "created_at": txn_time,
+        "customer_id": cust_id,
+        "merchant_id": idx.merch_ids[mi],
+        "payment_method_id": pm_id,
+        "session_id": session_id,
+        "amount_cents": amount,
+        "currency": np.full(n, "USD"),
+        "channel": channel,
+        "status": STATUS[status],
+        "auth_code": _nullable(auth_codes(rng, int(approved.sum())), approved),
+        "failure_reason": _nullable(FAILURE_REASON[rng.integers(0, len(FAILURE_REASON), int(failed.sum()))], failed),
+    }
+
+    # Emit a few events per txn
+    login = rng.random(n) < 0.25
+    reset = rng.random(n) < 0.06
+    nl, nr = int(login.sum()), int(reset.sum())
+    ips = ipv4_public(rng, nl)
+    events = {
+        "event_id": uuid4_str(rng, nl + nr)[0],
+        "event_time": iso_times(np.concatenate([random_times(rng, as_of, nl, days), random_times(rng, as_of, nr, days)])),
+        "customer_id": np.concatenate([cust_id[login], cust_id[reset]]),
+        "session_id": np.concatenate([session_id[login], session_id[reset]]),
+        "event_type": np.repeat(np.array(["login", "password_reset"]), [nl, nr]),
+        "metadata": np.concatenate([np.char.add(np.char.add('{"ip": "', ips), '"}').astype(object),
+                                    np.full(nr, '{"method": "email"}', dtype=object)]),
+    }
+
+    # Disputes for chargebacks
+    cb = status == ST_CHARGEBACK
+    ncb = int(cb.sum())
+    disputes = {
+        "dispute_id": uuid4_str(rng, ncb)[0],
+        "created_at": iso_times(t[cb] + rng.integers(1, 10, ncb, endpoint=True).astype("timedelta64[D]")),
+        "txn_id": txn_id[cb],
+        "dispute_reason": DISPUTE_REASON[rng.integers(0, len(DISPUTE_REASON), ncb)],
+        "outcome": DISPUTE_OUTCOME[rng.integers(0, len(DISPUTE_OUTCOME), ncb)],
+        "amount_cents": amount[cb],
+    }
+
+    # Fraud alerts: ingestion.rules scores the whole chunk in one pass
+    scored = DEFAULT_RULES.evaluate({"cust_risk": RISK[idx.cust_risk[ci]], "merch_risk": RISK[idx.merch_risk[mi]],
+                                     "amount_cents": amount, "status": STATUS[status]})
+    fire = scored.fired
+    na = int(fire.sum())
+    sev = scored.severity[fire]
+    mask = scored.mask[fire].astype(np.int64)
+    alert_id = uuid4_str(rng, na)[0]
+    alert_time = txn_time[fire]
+    alerts = {
+        "alert_id": alert_id,
+        "created_at": alert_time,
+        "customer_id": cust_id[fire],
+        "txn_id": txn_id[fire],
+        "rule_name": scored.rule_names(mask),
+        "severity": DEFAULT_RULES.severities[sev],
+        "score": np.round(scored.score[fire], 3),
+        "details": RULE_DETAILS[mask * 9 + idx.cust_risk[ci][fire] * 3 + idx.merch_risk[mi][fire]],
+    }
+
+    # Create case for higher severity
+    case = (sev >= 1) & (rng.random(na) < 0.7)
+    nc = int(case.sum())
+    cases = {
+        "case_id": uuid4_str(rng, nc)[0],
+        "created_at": alert_time[case],
+        "alert_id": alert_id[case],
+        "status": np.full(nc, "open"),
+        "investigator": np.full(nc, None, dtype=object),
+        "closed_at": np.full(nc, None, dtype=object),
+    }
+
+    return {"transactions": txns, "events": events, "disputes": disputes, "alerts": alerts, "cases": cases}
+
+
+def iter_rows(cols):
+    # Lazily yield row tuples from a column dict (same shape the per-row path produces)
+    return zip(*(c.tolist() for c in cols.values()))
+
+
+def batch_rows(cols):
+    return list(iter_rows(cols))
@@ -0,0 +1,212 @@
+import argparse
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from ingestion.batch import uuid4_str
+from ingestion.features import HOUR, FeatureStore
+
+# Velocity feature store benchmark and parity check (no Postgres).
+# Streams --txns synthetic transactions over --hours (plus sessions, login
+# events and disputes, in time order) through ingestion.features in batches of
+# --batch, for --customers customers, then measures:
+#   update   rows/s per stream, including id -> slot mapping
+#   lookup   txn_features() point lookups (customer, merchant, payment method,
+#            device: 17 features), per-call latency percentiles
+#   batch    vectorized lookup() of every customer feature, rows/s
+# Features of --parity random entities are recomputed from the raw stream with
+# the same bucket boundaries; exits non-zero on any difference.
+#   python -m ingestion.bench_features --customers 1000000 --txns 5000000
+
+
+def synthetic(rng, args):
+    # Entity ids, then time-ordered streams indexing into them
+    ids = {
+        "customer": uuid4_str(rng, args.customers)[0],
+        "merchant": uuid4_str(rng, args.merchants)[0],
+        "payment_method": uuid4_str(rng, 2 * args.customers)[0],
+        "device": uuid4_str(rng, args.devices)[0],
+    }
+    start = 1_760_000_000
+
+    def times(n):
+        return np.sort(start + rng.integers(0, args.hours * HOUR, n))
+
+    n = args.txns
+    # Skewed activity: a few customers and merchants are much busier than the rest
+    cust = (rng.pareto(1.5, n) * args.customers / 20).astype(np.int64) % args.customers
+    txns = {
+        "t": times(n),
+        "customer": cust,
+        "merchant": (rng.pareto(1.2, n) * args.merchants / 50).astype(np.int64) % args.merchants,
+        "payment_method": 2 * cust + rng.integers(0, 2, n),
+        "amount": rng.integers(200, 20000, n),
+        "failed": rng.random(n) < 0.05,
+    }
+    ns = n // 4
+    scust = rng.integers(0, args.customers, ns)
+    sessions = {"t": times(ns), "customer": scust,
+                # Mostly a customer's own device, sometimes a shared one
+                "device": np.where(rng.random(ns) < 0.9, scust % args.devices, rng.integers(0, args.devices, ns))}
+    ne = n // 4
+    events = {"t": times(ne), "customer": rng.integers(0, args.customers, ne), "reset": rng.random(ne) < 0.2}
+    nd = n // 200
+    disputes = {"t": times(nd), "merchant": rng.integers(0, args.merchants, nd)}
+    return ids, {"transactions": txns, "sessions": sessions, "events": events, "disputes": disputes}
+
+
+def feed(store, ids, streams, batch):
+    # Interleave the streams in time order, one txn batch's time span at a time
+    txns = streams["transactions"]
+    seconds = {k: 0.0 for k in streams}
+    rows = {k: 0 for k in streams}
+    cursors = {k: 0 for k in streams}
+    status = np.where(txns["failed"], "failed", "captured")
+    for lo in range(0, len(txns["t"]), batch):
+        hi = min(lo + batch, len(txns["t"]))
+        until = txns["t"][hi - 1] if hi < len(txns["t"]) else np.iinfo(np.int64).max
+        for name, s in streams.items():
+            a = cursors[name]
+            b = hi if name == "transactions" else int(np.searchsorted(s["t"], until, side="right"))
+            if a == b:
+                continue
+            sl = slice(a, b)
+            t0 = time.perf_counter()
+            if name == "transactions":
+                store.update_transactions(s["t"][sl], ids["customer"][s["customer"][sl]], ids["merchant"][s["merchant"][sl]],
+                                          ids["payment_method"][s["payment_method"][sl]], s["amount"][sl], status[sl])
+            elif name == "sessions":
+                store.update_sessions(s["t"][sl], ids["customer"][s["customer"][sl]], ids["device"][s["device"][sl]])
+            elif name == "events":
+                store.update_events(s["t"][sl], ids["customer"][s["customer"][sl]],
+                                    np.where(s["reset"][sl], "password_reset", "login"))
+            else:
+                store.update_disputes(s["t"][sl], ids["merchant"][s["merchant"][sl]])
+            seconds[name] += time.perf_counter() - t0
+            rows[name] += b - a
+            cursors[name] = b
+    return seconds, rows
+
+
+def live(t, now, width, buckets):
+    # Rows inside a window of `buckets` buckets of `width` seconds ending at now's bucket
+    return (t // width > now // width - buckets) & (t <= now)
+
+
+def expected(kind, i, streams, now):
+    # Brute-force features of entity i from the raw streams
+    tx, se, ev, di = (streams[k] for k in ("transactions", "sessions", "events", "disputes"))
+    if kind == "customer":
+        mine = tx["customer"] == i
+        h1, d1 = live(tx["t"], now, 300, 12) & mine, live(tx["t"], now, 3600, 24) & mine
+        e = live(ev["t"], now, 3600, 24) & (ev["customer"] == i)
+        s = live(se["t"], now, 60, 1440) & (se["customer"] == i)
+        return {"txn_count_1h": h1.sum(), "txn_count_24h": d1.sum(), "amount_24h_cents": tx["amount"][d1].sum(),
+                "logins_24h": (e & ~ev["reset"]).sum(), "password_resets_24h": (e & ev["reset"]).sum(),
+                "distinct_devices_24h": min(len(np.unique(se["device"][s])), 8)}
+    if kind == "merchant":
+        mine = tx["merchant"] == i
+        d1, d30 = live(tx["t"], now, 3600, 24) & mine, live(tx["t"], now, 86400, 30) & mine
+        cb = (live(di["t"], now, 86400, 30) & (di["merchant"] == i)).sum()
+        return {"txn_count_24h": d1.sum(), "amount_24h_cents": tx["amount"][d1].sum(), "txn_count_30d": d30.sum(),
+                "chargebacks_30d": cb, "chargeback_rate_30d": cb / d30.sum() if d30.sum() else 0.0}
+    if kind == "payment_method":
+        mine = tx["payment_method"] == i
+        h1, d1 = live(tx["t"], now, 300, 12) & mine, live(tx["t"], now, 3600, 24) & mine
+        return {"attempts_1h": h1.sum(), "failed_1h": (h1 & tx["failed"]).sum(),
+                "attempts_24h": d1.sum(), "failed_24h": (d1 & tx["failed"]).sum()}
+    s = se["device"] == i
+    return {"sessions_1h": (live(se["t"], now, 300, 12) & s).sum(),
+            "distinct_customers_24h": min(len(np.unique(se["customer"][live(se["t"], now, 60, 1440) & s])), 8)}
+
+
+def parity(store, ids, streams, rng, n):
+    # Sample entities that appear in the streams, so most features are non-zero
+    picks = {
+        "customer": streams["transactions"]["customer"][rng.integers(0, len(streams["transactions"]["t"]), n)],
+        "merchant": streams["transactions"]["merchant"][rng.integers(0, len(streams["transactions"]["t"]), max(n // 10, 1))],
+        "payment_method": streams["transactions"]["payment_method"][rng.integers(0, len(streams["transactions"]["t"]), n)],
+        "device": streams["sessions"]["device"][rng.integers(0, len(streams["sessions"]["t"]), n)],
+    }
+    bad = 0
+    for kind, entities in picks.items():
+        for i in np.unique(entities).tolist():
+            got = store.features(kind, ids[kind][i])
+            want = expected(kind, i, streams, store.clock)
+            diff = {k: (got[k], v) for k, v in want.items() if not np.isclose(got[k], v)}
+            if diff:
+                bad += 1
+                if bad <= 5:
+                    print(f"  MISMATCH {kind} {ids[kind][i]}: {diff}")
+    return bad
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--customers", type=int, default=1_000_000)
+    ap.add_argument("--merchants", type=int, default=20_000)
+    ap.add_argument("--devices", type=int, default=800_000)
+    ap.add_argument("--txns", type=int, default=5_000_000)
+    ap.add_argument("--hours", type=int, default=48, help="time span of the streams")
+    ap.add_argument("--batch", type=int, default=10_000, help="transactions per update call")
+    ap.add_argument("--lookups", type=int, default=200_000)
+    ap.add_argument("--parity", type=int, default=300, help="entities per kind to check (0 skips)")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    t0 = time.perf_counter()
+    ids, streams = synthetic(rng, args)
+    print(f"Synthetic streams in {time.perf_counter() - t0:.1f}s: "
+          + ", ".join(f"{k}={len(s['t']):,}" for k, s in streams.items()))
+
+    store = FeatureStore()
+    seconds, rows = feed(store, ids, streams, args.batch)
+    print(f"\n{'update':<14} {'rows':>11} {'seconds':>8} {'rows/s':>12}")
+    for name in streams:
+        print(f"{name:<14} {rows[name]:>11,} {seconds[name]:>8.2f} {rows[name] / max(seconds[name], 1e-9):>12,.0f}")
+    total = sum(seconds.values())
+    print(f"{'all':<14} {sum(rows.values()):>11,} {total:>8.2f} {sum(rows.values()) / total:>12,.0f}")
+    entities = {k: len(v) for k, v in store.ids.items()}
+    print(f"Entities: " + ", ".join(f"{k}={v:,}" for k, v in entities.items())
+          + f"; window arrays {store.nbytes() / 2**20:,.0f} MiB ({store.nbytes() / max(sum(entities.values()), 1):,.0f} B/entity)")
+
+    # Point lookups for transactions drawn from the stream, like an inline scoring call
+    tx = streams["transactions"]
+    pick = rng.integers(0, len(tx["t"]), args.lookups)
+    calls = list(zip(ids["customer"][tx["customer"][pick]].tolist(), ids["merchant"][tx["merchant"][pick]].tolist(),
+                     ids["payment_method"][tx["payment_method"][pick]].tolist(),
+                     ids["device"][tx["customer"][pick] % args.devices].tolist()))
+    lat = []
+    started = time.perf_counter()
+    for c, m, p, d in calls:
+        t0 = time.perf_counter()
+        store.txn_features(c, m, p, d)
+        lat.append(time.perf_counter() - t0)
+    wall = time.perf_counter() - started
+    lat.sort()
+    us = lambda q: lat[min(int(q * len(lat)), len(lat) - 1)] * 1e6
+    print(f"\ntxn_features  {len(calls):,} calls, {len(calls) / wall:,.0f}/s: p50 {us(0.5):.1f} us, "
+          f"p99 {us(0.99):.1f} us, mean {statistics.fmean(lat) * 1e6:.1f} us")
+    one = ids["customer"][tx["customer"][pick[0]]]
+    t0 = time.perf_counter()
+    for _ in range(args.lookups):
+        store.features("customer", one)
+    print(f"features      customer only: {(time.perf_counter() - t0) / args.lookups * 1e6:.1f} us/call")
+    t0 = time.perf_counter()
+    out = store.lookup("customer")
+    n = len(out["txn_count_1h"])
+    print(f"lookup()      all {n:,} customers in {time.perf_counter() - t0:.2f}s "
+          f"({n / (time.perf_counter() - t0):,.0f} rows/s)")
+
+    if args.parity:
+        bad = parity(store, ids, streams, rng, args.parity)
+        print(f"\nParity: {'OK' if not bad else f'{bad} entities differ'}")
+        if bad:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
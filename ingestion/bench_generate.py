@@ -0,0 +1,71 @@
+import argparse
+import random
+import time
+import uuid
+
+import numpy as np
+
+from ingestion.batch import EntityIndex, batch_rows, gen_txns_batch
+from ingestion.generate import RISK, TABLES, gen_txns, utcnow
+
+# Generation-only benchmark (no Postgres): per-row loop vs NumPy batch engine.
+#   python -m ingestion.bench_generate --rows 200000
+
+
+def synthetic_entities(n_customers, n_merchants, n_sessions, n_pms):
+    customer_rows = [(str(uuid.uuid4()), random.choices(RISK, weights=[0.7,0.25,0.05])[0], "US") for _ in range(n_customers)]
+    merchant_rows = [(str(uuid.uuid4()), random.choices(RISK, weights=[0.75,0.2,0.05])[0], "US") for _ in range(n_merchants)]
+    sessions_by_customer = {}
+    for _ in range(n_sessions):
+        sessions_by_customer.setdefault(random.choice(customer_rows)[0], []).append(str(uuid.uuid4()))
+    pms_by_customer = {}
+    for _ in range(n_pms):
+        pms_by_customer.setdefault(random.choice(customer_rows)[0], []).append(str(uuid.uuid4()))
+    return customer_rows, merchant_rows, sessions_by_customer, pms_by_customer
+
+
+def bench_row(rows, entities):
+    t0 = time.perf_counter()
+    out = gen_txns(rows, *entities)
+    return time.perf_counter() - t0, out
+
+
+def bench_batch(rows, entities, chunk, materialize):
+    idx = EntityIndex(*entities)
+    rng = np.random.default_rng()
+    as_of = np.datetime64(utcnow().replace(tzinfo=None), "us")
+    counts = dict.fromkeys(TABLES, 0)
+    t0 = time.perf_counter()
+    for start in range(0, rows, chunk):
+        batch = gen_txns_batch(rng, min(chunk, rows - start), idx, as_of)
+        for t in TABLES:
+            counts[t] += len(batch_rows(batch[t])) if materialize else len(next(iter(batch[t].values())))
+    return time.perf_counter() - t0, counts
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--row-rows", type=int, default=None, help="rows for the per-row path (default: --rows)")
+    ap.add_argument("--chunk", type=int, default=100_000)
+    ap.add_argument("--customers", type=int, default=800)
+    ap.add_argument("--merchants", type=int, default=120)
+    args = ap.parse_args()
+
+    entities = synthetic_entities(args.customers, args.merchants, max(1200, args.rows // 2), args.customers * 2)
+
+    row_rows = args.row_rows or args.rows
+    secs, out = bench_row(row_rows, entities)
+    row_rps = row_rows / secs
+    print(f"row        rows={row_rows:>10,}  {secs:8.2f}s  {row_rps:>12,.0f} rows/s  "
+          + " ".join(f"{t}={len(x)}" for t, x in zip(TABLES, out)))
+
+    for label, materialize in (("batch", False), ("batch+rows", True)):
+        secs, counts = bench_batch(args.rows, entities, args.chunk, materialize)
+        rps = args.rows / secs
+        print(f"{label:<10} rows={args.rows:>10,}  {secs:8.2f}s  {rps:>12,.0f} rows/s  "
+              + " ".join(f"{t}={counts[t]}" for t in TABLES) + f"  speedup={rps / row_rps:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import time
+
+import numpy as np
+
+from ingestion.batch import EntityIndex, batch_rows, gen_txns_batch
+from ingestion.db import load, load_transactions, pg_conn
+from ingestion.generate import ALERT_COLUMNS, EVENT_COLUMNS, TXN_COLUMNS, utcnow
+
+# Load benchmark against a seeded Postgres: execute_values vs COPY for the
+# transactions (staged, then merged past claimed idempotency keys), events and
+# alerts inserts of generate.main.
+# Every method runs inside a transaction that is rolled back, so the database
+# is left untouched.
+#   python -m ingestion.bench_load --rows 200000
+
+TARGETS = (
+    ("transactions", TXN_COLUMNS),
+    ("events", EVENT_COLUMNS),
+    ("alerts", ALERT_COLUMNS),
+)
+
+
+def entity_index(cur, limit):
+    cur.execute("SELECT customer_id, risk_tier, country FROM customers LIMIT %s", (limit,))
+    customer_rows = cur.fetchall()
+    cur.execute("SELECT merchant_id, risk_tier, country FROM merchants LIMIT %s", (limit,))
+    merchant_rows = cur.fetchall()
+    if not customer_rows or not merchant_rows:
+        raise SystemExit("No customers/merchants found; run `make seed` first.")
+    return EntityIndex(customer_rows, merchant_rows, {}, {})
+
+
+def run(conn, method, batch):
+    cur = conn.cursor()
+    timings = {}
+    try:
+        for table, columns in TARGETS:
+            rows = batch_rows(batch[table])
+            t0 = time.perf_counter()
+            if table == "transactions":
+                load_transactions(cur, columns, rows, method=method)
+            else:
+                load(cur, table, columns, rows, method=method)
+            timings[table] = (len(rows), time.perf_counter() - t0)
+    finally:
+        conn.rollback()
+        cur.close()
+    return timings
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    conn = pg_conn()
+    conn.autocommit = False
+    cur = conn.cursor()
+    idx = entity_index(cur, 10_000)
+    conn.rollback()
+    cur.close()
+
+    batch = gen_txns_batch(np.random.default_rng(0), args.rows, idx, np.datetime64(utcnow().replace(tzinfo=None), "us"))
+
+    best = {}
+    for _ in range(args.repeat):
+        for method in ("values", "copy"):
+            for table, (n, secs) in run(conn, method, batch).items():
+                key = (method, table)
+                best[key] = min(best.get(key, (n, secs)), (n, secs), key=lambda x: x[1])
+    conn.close()
+
+    for table, _ in TARGETS:
+        n, v = best[("values", table)]
+        _, c = best[("copy", table)]
+        print(f"{table:<13} rows={n:>9,}  execute_values {n / v:>11,.0f} rows/s  "
+              f"copy {n / c:>11,.0f} rows/s  gain={v / c:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
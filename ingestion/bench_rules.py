@@ -0,0 +1,115 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from ingestion.batch import RISK, STATUS
+from ingestion.rules import DEFAULT_RULES
+
+# Rules-engine micro-benchmark and parity check (no Postgres).
+# Scores a synthetic batch with ingestion.rules (dict-of-arrays and, when
+# pyarrow is installed, an Arrow RecordBatch) against the per-row if-chain the
+# generator used before the rules moved into ingestion.rules. Exits non-zero
+# if any score, severity or rule_name differs.
+#   python -m ingestion.bench_rules --rows 1000000
+
+
+def legacy_score(cust_risk, merch_risk, amount, status):
+    score = 0.0
+    rules_hit = []
+    if cust_risk == "high":
+        score += 0.35; rules_hit.append("high_risk_customer")
+    if merch_risk == "high":
+        score += 0.25; rules_hit.append("high_risk_merchant")
+    if amount > 150000:
+        score += 0.30; rules_hit.append("large_amount")
+    if status in ("failed","chargeback"):
+        score += 0.20; rules_hit.append("bad_outcome")
+    if score < 0.45:
+        return None
+    sev = "high" if score >= 0.75 else ("medium" if score >= 0.55 else "low")
+    return round(score, 3), sev, " | ".join(rules_hit)
+
+
+def synthetic_batch(rng, n):
+    return {
+        "cust_risk": RISK[rng.choice(3, n, p=[0.7, 0.25, 0.05])],
+        "merch_risk": RISK[rng.choice(3, n, p=[0.75, 0.2, 0.05])],
+        "amount_cents": np.round(rng.lognormal(10.2, 0.8, n)).astype(np.int64),
+        "status": STATUS[rng.choice(5, n, p=[0.25, 0.60, 0.10, 0.04, 0.01])],
+    }
+
+
+def vector_results(batch):
+    scored = DEFAULT_RULES.evaluate(batch)
+    fire = scored.fired
+    out = [None] * len(fire)
+    for i, score, sev, name in zip(np.flatnonzero(fire).tolist(), np.round(scored.score[fire], 3).tolist(),
+                                   DEFAULT_RULES.severities[scored.severity[fire]].tolist(),
+                                   scored.rule_names(scored.mask[fire].astype(np.int64)).tolist()):
+        out[i] = (score, sev, name)
+    return out
+
+
+def parity(batch, n):
+    expected = [legacy_score(*r) for r in zip(*(batch[k][:n].tolist() for k in ("cust_risk", "merch_risk", "amount_cents", "status")))]
+    got = vector_results({k: v[:n] for k, v in batch.items()})
+    # evaluate_row is what the per-row generator path calls
+    for i, row in enumerate(zip(*(batch[k][:n].tolist() for k in ("cust_risk", "merch_risk", "amount_cents", "status")))):
+        score, sev, hits = DEFAULT_RULES.evaluate_row(dict(zip(("cust_risk", "merch_risk", "amount_cents", "status"), row)))
+        if (None if sev is None else (round(score, 3), sev, " | ".join(hits))) != got[i]:
+            got[i] = ("evaluate_row", score, sev, hits)
+    bad = [(i, e, g) for i, (e, g) in enumerate(zip(expected, got)) if e != g]
+    for i, e, g in bad[:10]:
+        print(f"mismatch row={i} legacy={e} rules={g}")
+    return len(expected), sum(e is not None for e in expected), len(bad)
+
+
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--parity-rows", type=int, default=200_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    batch = synthetic_batch(np.random.default_rng(args.seed), args.rows)
+
+    checked, fired, bad = parity(batch, min(args.parity_rows, args.rows))
+    print(f"parity     rows={checked:>10,}  alerts={fired:,}  mismatches={bad}")
+
+    n = min(args.parity_rows, args.rows)
+    rows = list(zip(*(batch[k][:n].tolist() for k in ("cust_risk", "merch_risk", "amount_cents", "status"))))
+    secs = timeit(lambda: [legacy_score(*r) for r in rows], args.repeat)
+    row_rps = n / secs
+    print(f"row        rows={n:>10,}  {secs:8.3f}s  {row_rps:>12,.0f} rows/s")
+
+    secs = timeit(lambda: DEFAULT_RULES.evaluate(batch), args.repeat)
+    print(f"numpy      rows={args.rows:>10,}  {secs:8.3f}s  {args.rows / secs:>12,.0f} rows/s  speedup={args.rows / secs / row_rps:.1f}x")
+
+    try:
+        import pyarrow as pa
+    except ImportError:
+        print("arrow      skipped (pyarrow not installed)")
+    else:
+        rb = pa.RecordBatch.from_pydict({k: pa.array(v).dictionary_encode() if v.dtype.kind == "U" else pa.array(v)
+                                         for k, v in batch.items()})
+        secs = timeit(lambda: DEFAULT_RULES.evaluate(rb), args.repeat)
+        print(f"arrow      rows={args.rows:>10,}  {secs:8.3f}s  {args.rows / secs:>12,.0f} rows/s  speedup={args.rows / secs / row_rps:.1f}x")
+
+    if bad:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,528 @@
+import argparse
+import time
+from collections import deque
+from datetime import timedelta
+
+import numpy as np
+
+from ingestion.db import pg_conn
+
+# Online velocity features: sliding-window aggregates per customer, merchant,
+# payment method and device, maintained incrementally from the transaction,
+# session, event and dispute streams.
+#
+#   store = FeatureStore()
+#   store.update_transactions(t, customer_id, merchant_id, payment_method_id, amount_cents, status)
+#   store.update_sessions(t, customer_id, device_id)
+#   store.features("customer", customer_id)            # {"txn_count_1h": 3, ...}, a few microseconds
+#   row = store.txn_features(customer_id, merchant_id, payment_method_id)
+#   RuleSet([Rule("card_testing", 0.4, col("pm_failed_1h") >= 3), ...]).evaluate_row(row)
+#   store.snapshot(ch)                                 # analytics.feature_snapshots, for offline use
+#
+# Times are epoch seconds. Each window is a ring of fixed-width time buckets
+# per entity (Counters): a ring position stores the bucket number it holds
+# next to its sums, so stale buckets are ignored on read and zeroed when the
+# position is reused, and the window slides one bucket at a time. Distinct
+# counts keep the k most recently seen keys per entity (RecentKeys), so they
+# are exact up to k. Entities get dense slots on first sight and every
+# structure is a preallocated NumPy array, so memory is fixed per entity.
+#
+# python -m ingestion.features replays --days of Postgres history into a store,
+# then (--follow) polls for new rows and snapshots to ClickHouse periodically.
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+ENTITIES = ("customer", "merchant", "payment_method", "device")
+# Column prefixes in txn_features() rows
+PREFIX = {"customer": "cust_", "merchant": "merch_", "payment_method": "pm_", "device": "device_"}
+
+
+class Counters:
+    """Per-slot sums of `fields` over the last `buckets` buckets of window_s / buckets seconds."""
+
+    def __init__(self, window_s, buckets, fields, dtype=np.int64):
+        self.width = window_s // buckets
+        self.buckets = buckets
+        self.fields = tuple(fields)
+        self.sums = np.zeros((0, buckets, len(self.fields)), dtype)
+        self.stamp = np.zeros((0, buckets), np.int32)   # bucket number held by each ring position, -1 = empty
+
+    def resize(self, capacity):
+        extra = capacity - len(self.stamp)
+        self.sums = np.concatenate([self.sums, np.zeros((extra,) + self.sums.shape[1:], self.sums.dtype)])
+        self.stamp = np.concatenate([self.stamp, np.full((extra, self.buckets), -1, np.int32)])
+
+    def nbytes(self):
+        return self.sums.nbytes + self.stamp.nbytes
+
+    def add(self, slots, t, values, clock):
+        # values is (n, len(fields)); rows already outside the window at `clock` are dropped
+        b = t // self.width
+        keep = b > clock // self.width - self.buckets
+        b, flat, values = b[keep], slots[keep] * self.buckets + b[keep] % self.buckets, values[keep]
+        sums = self.sums.reshape(-1, len(self.fields))
+        stamp = self.stamp.reshape(-1)
+        # A ring position still holding an older bucket is evicted before reuse
+        stale = stamp[flat] != b
+        sums[flat[stale]] = 0
+        stamp[flat[stale]] = b[stale]
+        uniq, inv = np.unique(flat, return_inverse=True)
+        for f in range(len(self.fields)):
+            sums[uniq, f] += np.bincount(inv, weights=values[:, f], minlength=len(uniq)).astype(sums.dtype)
+
+    def total(self, slot, now):
+        # One matmul: a masked sum costs about twice as much per call
+        return (self.stamp[slot] > now // self.width - self.buckets) @ self.sums[slot]
+
+    def totals(self, slots, now):
+        live = self.stamp[slots] > now // self.width - self.buckets
+        return (self.sums[slots] * live[:, :, None]).sum(axis=1)
+
+
+class RecentKeys:
+    """Per-slot count of distinct keys seen in the last window_s, exact up to k.
+
+    Keeps the k most recently seen keys with their last-seen time (at
+    resolution_s); a new key replaces the least recently seen one.
+    """
+
+    def __init__(self, window_s, k=8, resolution_s=60):
+        self.resolution = resolution_s
+        self.span = window_s // resolution_s
+        self.k = k
+        self.keys = np.zeros((0, k), np.int32)
+        self.seen = np.zeros((0, k), np.int32)
+
+    def resize(self, capacity):
+        extra = capacity - len(self.keys)
+        self.keys = np.concatenate([self.keys, np.full((extra, self.k), -1, np.int32)])
+        self.seen = np.concatenate([self.seen, np.full((extra, self.k), -1, np.int32)])
+
+    def nbytes(self):
+        return self.keys.nbytes + self.seen.nbytes
+
+    def add(self, slots, keys, t, clock):
+        b = t // self.resolution
+        keep = b > clock // self.resolution - self.span
+        slots, keys, b = slots[keep], keys[keep], b[keep]
+        if not len(slots):
+            return
+        # Only the latest sighting of a (slot, key) pair and the k latest keys per slot can survive
+        pair = slots << 32 | keys
+        order = np.lexsort((b, pair))
+        order = order[np.append(pair[order][1:] != pair[order][:-1], True)]
+        order = order[np.lexsort((b[order], slots[order]))]
+        s = slots[order]
+        ends = np.flatnonzero(np.append(s[1:] != s[:-1], True))
+        rank = np.repeat(ends, np.diff(np.append(-1, ends))) - np.arange(len(s))
+        order = order[rank < self.k]
+        slots, keys, b = slots[order], keys[order], b[order]
+        # One write per slot per round, oldest first, so a slot's later keys see its earlier ones
+        while len(slots):
+            _, first = np.unique(slots, return_index=True)
+            s, k, bb = slots[first], keys[first], b[first]
+            row_keys, row_seen = self.keys[s], self.seen[s]
+            match = row_keys == k[:, None]
+            hit = match.any(axis=1)
+            pos = np.where(hit, match.argmax(axis=1), row_seen.argmin(axis=1))
+            self.keys[s, pos] = k
+            self.seen[s, pos] = np.where(hit, np.maximum(row_seen[np.arange(len(s)), pos], bb), bb)
+            rest = np.ones(len(slots), bool)
+            rest[first] = False
+            slots, keys, b = slots[rest], keys[rest], b[rest]
+
+    def total(self, slot, now):
+        return (self.seen[slot] > now // self.resolution - self.span).sum()
+
+    def totals(self, slots, now):
+        return (self.seen[slots] > now // self.resolution - self.span).sum(axis=1)
+
+
+def _windows():
+    # entity -> {window: structure}; counts fit int32 per bucket, amount sums need int64
+    return {
+        "customer": {
+            "txn_1h": Counters(HOUR, 12, ("txns",), np.int32),
+            "txn_24h": Counters(DAY, 24, ("txns", "amount_cents")),
+            "events_24h": Counters(DAY, 24, ("logins", "password_resets"), np.int32),
+            "devices_24h": RecentKeys(DAY),
+        },
+        "merchant": {
+            "txn_24h": Counters(DAY, 24, ("txns", "amount_cents")),
+            "txn_30d": Counters(30 * DAY, 30, ("txns", "chargebacks"), np.int32),
+        },
+        "payment_method": {
+            "attempts_1h": Counters(HOUR, 12, ("attempts", "failed"), np.int32),
+            "attempts_24h": Counters(DAY, 24, ("attempts", "failed"), np.int32),
+        },
+        "device": {
+            "sessions_1h": Counters(HOUR, 12, ("sessions",), np.int32),
+            "customers_24h": RecentKeys(DAY),
+        },
+    }
+
+
+# entity -> [(feature, window, field)]; field None for RecentKeys counts
+FEATURES = {
+    "customer": [("txn_count_1h", "txn_1h", "txns"), ("txn_count_24h", "txn_24h", "txns"),
+                 ("amount_24h_cents", "txn_24h", "amount_cents"), ("logins_24h", "events_24h", "logins"),
+                 ("password_resets_24h", "events_24h", "password_resets"), ("distinct_devices_24h", "devices_24h", None)],
+    "merchant": [("txn_count_24h", "txn_24h", "txns"), ("amount_24h_cents", "txn_24h", "amount_cents"),
+                 ("txn_count_30d", "txn_30d", "txns"), ("chargebacks_30d", "txn_30d", "chargebacks")],
+    "payment_method": [("attempts_1h", "attempts_1h", "attempts"), ("failed_1h", "attempts_1h", "failed"),
+                       ("attempts_24h", "attempts_24h", "attempts"), ("failed_24h", "attempts_24h", "failed")],
+    "device": [("sessions_1h", "sessions_1h", "sessions"), ("distinct_customers_24h", "customers_24h", None)],
+}
+# entity -> [(feature, numerator, denominator)]
+RATIOS = {"merchant": [("chargeback_rate_30d", "chargebacks_30d", "txn_count_30d")]}
+
+
+class FeatureStore:
+    def __init__(self):
+        self.clock = 0                                       # latest event time seen
+        self.slots = {kind: {} for kind in ENTITIES}         # entity id -> slot
+        self.ids = {kind: [] for kind in ENTITIES}           # slot -> entity id
+        self.capacity = dict.fromkeys(ENTITIES, 0)           # slots allocated in every window of the entity
+        self.windows = _windows()
+        self._written = {}                                   # (kind, feature) -> non-zero mask of the last snapshot
+        # Point-lookup plans: each window read once, then split into its features
+        self._plans = {}
+        for kind, features in FEATURES.items():
+            plan = {}
+            for name, window, field in features:
+                w = self.windows[kind][window]
+                plan.setdefault(window, (w, []))[1].append((name, None if field is None else w.fields.index(field)))
+            self._plans[kind] = list(plan.values())
+        self._zeros = {kind: dict.fromkeys(self.feature_names(kind), 0) for kind in ENTITIES}
+
+    @staticmethod
+    def feature_names(kind):
+        return [f[0] for f in FEATURES[kind]] + [r[0] for r in RATIOS.get(kind, [])]
+
+    def nbytes(self):
+        # Window arrays only; the id -> slot dicts come on top
+        return sum(w.nbytes() for ws in self.windows.values() for w in ws.values())
+
+    def _slots(self, kind, ids):
+        index, names = self.slots[kind], self.ids[kind]
+        out = []
+        for i in ids:
+            s = index.get(i)
+            if s is None:
+                s = index[i] = len(names)
+                names.append(i)
+            out.append(s)
+        if len(names) > self.capacity[kind]:
+            self.capacity[kind] = max(2 * self.capacity[kind], len(names), 1024)
+            for w in self.windows[kind].values():
+                w.resize(self.capacity[kind])
+        return np.array(out, np.int64)
+
+    def _tick(self, t):
+        t = np.asarray(t, np.int64)
+        if len(t):
+            self.clock = max(self.clock, int(t.max()))
+        return t
+
+    def update_transactions(self, t, customer_id, merchant_id, payment_method_id, amount_cents, status):
+        t = self._tick(t)
+        n = len(t)
+        if not n:
+            return
+        amount = np.asarray(amount_cents, np.int64)
+        failed = (np.asarray(status) == "failed").astype(np.int64)
+        ones = np.ones(n, np.int64)
+        c = self._slots("customer", customer_id)
+        w = self.windows["customer"]
+        w["txn_1h"].add(c, t, ones[:, None], self.clock)
+        w["txn_24h"].add(c, t, np.column_stack([ones, amount]), self.clock)
+        m = self._slots("merchant", merchant_id)
+        w = self.windows["merchant"]
+        w["txn_24h"].add(m, t, np.column_stack([ones, amount]), self.clock)
+        w["txn_30d"].add(m, t, np.column_stack([ones, np.zeros(n, np.int64)]), self.clock)
+        # Transactions without a payment method only count towards customer and merchant
+        pm_ids = np.asarray(payment_method_id, dtype=object)
+        has = np.array([bool(p) for p in pm_ids], bool)
+        if has.any():
+            p = self._slots("payment_method", pm_ids[has])
+            w = self.windows["payment_method"]
+            values = np.column_stack([ones[has], failed[has]])
+            w["attempts_1h"].add(p, t[has], values, self.clock)
+            w["attempts_24h"].add(p, t[has], values, self.clock)
+
+    def update_sessions(self, t, customer_id, device_id):
+        t = self._tick(t)
+        dev = np.asarray(device_id, dtype=object)
+        has = np.array([bool(d) for d in dev], bool)
+        if not has.any():
+            return
+        t = t[has]
+        c = self._slots("customer", np.asarray(customer_id, dtype=object)[has])
+        d = self._slots("device", dev[has])
+        self.windows["customer"]["devices_24h"].add(c, d, t, self.clock)
+        self.windows["device"]["sessions_1h"].add(d, t, np.ones((len(t), 1), np.int64), self.clock)
+        self.windows["device"]["customers_24h"].add(d, c, t, self.clock)
+
+    def update_events(self, t, customer_id, event_type):
+        t = self._tick(t)
+        kind = np.asarray(event_type)
+        cust = np.asarray(customer_id, dtype=object)
+        use = ((kind == "login") | (kind == "password_reset")) & np.array([bool(c) for c in cust], bool)
+        if not use.any():
+            return
+        c = self._slots("customer", cust[use])
+        values = np.column_stack([kind[use] == "login", kind[use] == "password_reset"]).astype(np.int64)
+        self.windows["customer"]["events_24h"].add(c, t[use], values, self.clock)
+
+    def update_disputes(self, t, merchant_id):
+        # A dispute is the chargeback signal, counted when it arrives
+        t = self._tick(t)
+        if not len(t):
+            return
+        m = self._slots("merchant", merchant_id)
+        values = np.column_stack([np.zeros(len(t), np.int64), np.ones(len(t), np.int64)])
+        self.windows["merchant"]["txn_30d"].add(m, t, values, self.clock)
+
+    def features(self, kind, entity_id, now=None):
+        """Point lookup: {feature: value} for one entity, zeros if it was never seen."""
+        slot = self.slots[kind].get(entity_id)
+        if slot is None:
+            return dict(self._zeros[kind])
+        now = self.clock if now is None else now
+        out = {}
+        for w, names in self._plans[kind]:
+            total = w.total(slot, now).tolist()
+            for name, field in names:
+                out[name] = total if field is None else total[field]
+        for name, num, den in RATIOS.get(kind, ()):
+            out[name] = out[num] / out[den] if out[den] else 0.0
+        return out
+
+    def txn_features(self, customer_id, merchant_id, payment_method_id=None, device_id=None, now=None):
+        """One flat row for scoring a transaction inline, columns prefixed per entity (PREFIX)."""
+        row = {}
+        for kind, entity_id in (("customer", customer_id), ("merchant", merchant_id),
+                                ("payment_method", payment_method_id), ("device", device_id)):
+            prefix = PREFIX[kind]
+            for name, value in self.features(kind, entity_id, now).items():
+                row[prefix + name] = value
+        return row
+
+    def lookup(self, kind, ids=None, now=None):
+        """Vectorized lookup: {feature: array} for ids (default: every entity seen, in slot order)."""
+        now = self.clock if now is None else now
+        if ids is None:
+            slots = np.arange(len(self.ids[kind]))
+            known = np.ones(len(slots), bool)
+        else:
+            index = self.slots[kind]
+            slots = np.array([index.get(i, -1) for i in ids], np.int64)
+            known = slots >= 0
+            slots = np.where(known, slots, 0)
+        out = {}
+        for w, names in self._plans[kind]:
+            total = w.totals(slots, now) if len(self.ids[kind]) else np.zeros((len(slots), 1), np.int64)
+            for name, field in names:
+                out[name] = np.where(known, total if field is None else total[:, field], 0)
+        for name, num, den in RATIOS.get(kind, ()):
+            out[name] = np.divide(out[num], out[den], out=np.zeros(len(slots)), where=out[den] > 0)
+        return out
+
+    def snapshot(self, ch, at=None):
+        """Write the current features to analytics.feature_snapshots; returns rows written.
+
+        Sparse: a (entity, feature) row is written when the value is non-zero,
+        or was non-zero in this store's previous snapshot, so the latest row at
+        or before a time is the value then.
+        """
+        import pyarrow as pa
+
+        at = self.clock if at is None else at
+        ch.command(SNAPSHOT_DDL)
+        rows = 0
+        for kind in ENTITIES:
+            if not self.ids[kind]:
+                continue
+            ids = np.array(self.ids[kind], dtype=object)
+            parts = []
+            for name, values in self.lookup(kind, now=at).items():
+                nonzero = values != 0
+                write = nonzero.copy()
+                prev = self._written.get((kind, name))
+                if prev is not None:
+                    write[:len(prev)] |= prev
+                self._written[kind, name] = nonzero
+                idx = np.flatnonzero(write)
+                parts.append(pa.table({
+                    "snapshot_at": pa.array(np.full(len(idx), at * 1_000_000, np.int64)).cast(pa.timestamp("us", tz="UTC")),
+                    "entity_type": pa.array(np.full(len(idx), kind, dtype=object), pa.string()),
+                    "entity_id": pa.array(ids[idx], pa.string()),
+                    "feature": pa.array(np.full(len(idx), name, dtype=object), pa.string()),
+                    "value": pa.array(values[idx].astype(np.float64)),
+                }))
+            table = pa.concat_tables(parts)
+            if table.num_rows:
+                ch.insert_arrow(SNAPSHOT_TABLE, table)
+            rows += table.num_rows
+        return rows
+
+
+SNAPSHOT_TABLE = "analytics.feature_snapshots"
+# Mirrors infra/init_clickhouse/01_olap.sql
+SNAPSHOT_DDL = """CREATE TABLE IF NOT EXISTS analytics.feature_snapshots (
+  snapshot_at DateTime64(3, 'UTC'),
+  entity_type LowCardinality(String),
+  entity_id String,
+  feature LowCardinality(String),
+  value Float64
+)
+ENGINE = MergeTree
+PARTITION BY toYYYYMMDD(snapshot_at)
+ORDER BY (entity_type, feature, entity_id, snapshot_at)
+TTL toDateTime(snapshot_at) + INTERVAL 30 DAY
+"""
+
+# -----------------------
+# Postgres feeds: (id, epoch seconds, columns..., watermark) in watermark order, for rows
+# whose watermark is in (lo, hi]. Transactions and disputes are read by updated_at
+# (set on insert, bumped by trigger on every UPDATE, indexed), so rows committed with
+# an older created_at, as backfills are, are still picked up. Sessions and events
+# carry no such column and are read by their own time.
+# -----------------------
+FEEDS = {
+    "transactions": """SELECT txn_id::text, extract(epoch from created_at)::bigint, customer_id::text, merchant_id::text,
+  COALESCE(payment_method_id::text, ''), amount_cents, status, extract(epoch from updated_at)::float8
+FROM transactions WHERE updated_at > %(lo)s AND updated_at <= %(hi)s ORDER BY updated_at""",
+    "sessions": """SELECT session_id::text, extract(epoch from started_at)::bigint, customer_id::text, COALESCE(device_id::text, ''),
+  extract(epoch from started_at)::float8
+FROM sessions WHERE started_at > %(lo)s AND started_at <= %(hi)s ORDER BY started_at""",
+    "events": """SELECT event_id::text, extract(epoch from event_time)::bigint, COALESCE(customer_id::text, ''), event_type,
+  extract(epoch from event_time)::float8
+FROM events WHERE event_time > %(lo)s AND event_time <= %(hi)s AND event_type IN ('login', 'password_reset')
+ORDER BY event_time""",
+    "disputes": """SELECT d.dispute_id::text, extract(epoch from d.created_at)::bigint, t.merchant_id::text,
+  extract(epoch from d.updated_at)::float8
+FROM disputes d JOIN transactions t ON t.txn_id = d.txn_id
+WHERE d.updated_at > %(lo)s AND d.updated_at <= %(hi)s ORDER BY d.updated_at""",
+}
+
+
+class Feed:
+    # Rows re-read within the lookback (commits that land with an earlier watermark, as
+    # now() is the writer's transaction start) are applied once: ids are remembered while
+    # a later poll can still read them again. A row updated after that is read again
+    # and counts as a new observation.
+    def __init__(self, name):
+        self.name = name
+        self.seen = set()
+        self.order = deque()
+
+    def fresh(self, rows, cutoff, horizon):
+        # cutoff: no poll reads watermarks at or before it any more; horizon: the next poll's cutoff
+        while self.order and self.order[0][0] <= cutoff:
+            self.seen.discard(self.order.popleft()[1])
+        out = []
+        for r in rows:
+            if r[0] in self.seen:
+                continue
+            if r[-1] > horizon:
+                self.seen.add(r[0])
+                self.order.append((r[-1], r[0]))
+            out.append(r)
+        return out
+
+
+def apply(store, feed, rows):
+    if not rows:
+        return
+    cols = list(zip(*rows))
+    t = np.array(cols[1], np.int64)
+    if feed == "transactions":
+        store.update_transactions(t, cols[2], cols[3], cols[4], np.array(cols[5], np.int64), np.array(cols[6]))
+    elif feed == "sessions":
+        store.update_sessions(t, cols[2], cols[3])
+    elif feed == "events":
+        store.update_events(t, cols[2], np.array(cols[3]))
+    else:
+        store.update_disputes(t, cols[2])
+
+
+def poll(store, pg, feeds, lo, hi, lookback, batch_rows):
+    # Apply every feed's rows with a watermark in (lo - lookback, hi]; returns rows applied per feed
+    counts = {}
+    for feed in feeds.values():
+        cur = pg.cursor(name=f"features_{feed.name}")
+        cur.itersize = batch_rows
+        cur.execute(FEEDS[feed.name], {"lo": lo - lookback, "hi": hi})
+        n = 0
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                break
+            rows = feed.fresh(rows, (lo - lookback).timestamp(), (hi - lookback).timestamp())
+            apply(store, feed.name, rows)
+            n += len(rows)
+        cur.close()
+        pg.commit()
+        counts[feed.name] = n
+    return counts
+
+
+def main(days=30, follow=False, interval=5.0, lookback_minutes=10, snapshot_every=300.0, batch_rows=50_000):
+    from warehouse.sync_to_clickhouse import ch_client
+
+    pg = pg_conn()
+    cur = pg.cursor()
+    cur.execute("SELECT clock_timestamp()")
+    hi = cur.fetchone()[0]
+    cur.close()
+    pg.commit()
+    store = FeatureStore()
+    feeds = {name: Feed(name) for name in FEEDS}
+    lookback = timedelta(minutes=lookback_minutes)
+    ch = ch_client() if snapshot_every else None
+
+    t0 = time.perf_counter()
+    counts = poll(store, pg, feeds, hi - timedelta(days=days) + lookback, hi, lookback, batch_rows)
+    print(f"[features] replayed {days}d in {time.perf_counter() - t0:.1f}s: "
+          + ", ".join(f"{k}={v:,}" for k, v in counts.items())
+          + f"; {sum(len(v) for v in store.ids.values()):,} entities, {store.nbytes() / 2**20:,.1f} MiB", flush=True)
+    last_snapshot = 0.0
+    try:
+        while True:
+            if ch is not None and time.monotonic() - last_snapshot >= snapshot_every:
+                t0 = time.perf_counter()
+                n = store.snapshot(ch)
+                last_snapshot = time.monotonic()
+                print(f"[features] snapshot: {n:,} rows in {time.perf_counter() - t0:.1f}s", flush=True)
+            if not follow:
+                break
+            time.sleep(interval)
+            lo = hi
+            cur = pg.cursor()
+            cur.execute("SELECT clock_timestamp()")
+            hi = cur.fetchone()[0]
+            cur.close()
+            pg.commit()
+            counts = poll(store, pg, feeds, lo, hi, lookback, batch_rows)
+            if any(counts.values()):
+                print("[features] " + ", ".join(f"{k}={v:,}" for k, v in counts.items()), flush=True)
+    except KeyboardInterrupt:
+        if ch is not None:
+            print(f"[features] final snapshot: {store.snapshot(ch):,} rows", flush=True)
+    finally:
+        pg.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--days", type=int, default=30, help="history to replay on start (the longest window is 30 days)")
+    ap.add_argument("--follow", action="store_true", help="keep polling Postgres for new rows (Ctrl-C to stop)")
+    ap.add_argument("--interval", type=float, default=5.0, help="--follow: seconds between polls")
+    ap.add_argument("--lookback-minutes", type=int, default=10,
+                    help="re-read rows this much older than the last poll, for late commits")
+    ap.add_argument("--snapshot-every", type=float, default=300.0, help="seconds between ClickHouse snapshots (0 disables)")
+    ap.add_argument("--batch-rows", type=int, default=50_000)
+    args = ap.parse_args()
+    main(args.days, args.follow, args.interval, args.lookback_minutes, args.snapshot_every, args.batch_rows)
@@ -2,13 +2,20 @@ import argparse
 import json
 import os
 import random
+import secrets
+import time
 import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
-from psycopg2.extras import Json
 
+import numpy as np
 from faker import Faker
 
-from ingestion.db import pg_conn, insert_many
+from ingestion.batch import EntityIndex, gen_txns_batch, iter_rows
+from ingestion.rules import DEFAULT_RULES
+from ingestion.db import (commit_chunk, committed_chunks, ensure_idempotency, ensure_run_state, get_run, load,
+                          load_transactions, pg_conn, seed_used, start_run)
+from warehouse.telemetry import PipelineRun
 
 fake = Faker()
 
@@ -21,8 +28,32 @@ CHANNELS = ["web","mobile"]
 STATUSES = ["authorized","captured","failed","refunded","chargeback"]
 EVENT_TYPES = ["signup","login","password_reset","kyc_started","kyc_verified","pm_added","address_change"]
 
+# Insert column order for each generated table (matches the tuples built below)
+TXN_COLUMNS = ("txn_id", "idempotency_key", "created_at", "customer_id", "merchant_id", "payment_method_id", "session_id",
+               "amount_cents", "currency", "channel", "status", "auth_code", "failure_reason")
+EVENT_COLUMNS = ("event_id", "event_time", "customer_id", "session_id", "event_type", "metadata")
+DISPUTE_COLUMNS = ("dispute_id", "created_at", "txn_id", "dispute_reason", "outcome", "amount_cents")
+ALERT_COLUMNS = ("alert_id", "created_at", "customer_id", "txn_id", "rule_name", "severity", "score", "details")
+CASE_COLUMNS = ("case_id", "created_at", "alert_id", "status", "investigator", "closed_at")
+TABLES = ("transactions", "events", "disputes", "alerts", "cases")
+# Keys of the transactions' dependents, skipped on conflict when a run replays another run's seed
+DEPENDENT_KEYS = {"events": "(event_id, event_time)", "disputes": "(dispute_id)", "alerts": "(alert_id)",
+                  "cases": "(case_id)"}
+
+# Pinned by main() (--as-of) so a seeded run is reproducible; None means wall clock
+_clock = None
+
 def utcnow():
-    return datetime.now(timezone.utc)
+    return _clock or datetime.now(timezone.utc)
+
+def new_uuid():
+    # Drawn from the (seedable) module RNG instead of os.urandom
+    return uuid.UUID(int=random.getrandbits(128), version=4)
+
+def seed_all(seed):
+    random.seed(seed)
+    fake.seed_instance(seed)
+    fake.unique.clear()
 
 def random_time_within(days=30):
     return utcnow() - timedelta(seconds=random.randint(0, days*24*3600))
@@ -31,76 +62,14 @@ def gen_seed_entities(n_customers=800, n_merchants=120):
     customers = []
     for _ in range(n_customers):
         email = fake.unique.email()
-        customers.append((email, fake.phone_number(), random.choice(COUNTRIES), random.choices(RISK, weights=[0.7,0.25,0.05])[0], random.choices(KYC, weights=[0.25,0.5,0.25])[0]))
+        customers.append((new_uuid(), utcnow(), email, fake.phone_number(), random.choice(COUNTRIES), random.choices(RISK, weights=[0.7,0.25,0.05])[0], random.choices(KYC, weights=[0.25,0.5,0.25])[0]))
     merchants = []
     for _ in range(n_merchants):
-        merchants.append((fake.company(), random.choice(MCCS), random.choice(COUNTRIES), random.choices(RISK, weights=[0.75,0.2,0.05])[0]))
+        merchants.append((new_uuid(), utcnow(), fake.company(), random.choice(MCCS), random.choice(COUNTRIES), random.choices(RISK, weights=[0.75,0.2,0.05])[0]))
     return customers, merchants
 
-def main(rows: int, seed_customers: int, seed_merchants: int):
-    conn = pg_conn()
-    conn.autocommit = False
-    cur = conn.cursor()
-
-    # Seed customers and merchants
-    customers, merchants = gen_seed_entities(seed_customers, seed_merchants)
-    insert_many(cur,
-        "INSERT INTO customers (email, phone, country, risk_tier, kyc_tier) VALUES %s ON CONFLICT (email) DO NOTHING",
-        customers
-    )
-    insert_many(cur,
-        "INSERT INTO merchants (merchant_name, mcc, country, risk_tier) VALUES %s",
-        merchants
-    )
-
-    # Fetch ids
-    cur.execute("SELECT customer_id, risk_tier, country FROM customers")
-    customer_rows = cur.fetchall()
-    cur.execute("SELECT merchant_id, risk_tier, country FROM merchants")
-    merchant_rows = cur.fetchall()
-
-    # Seed devices
-    devices = []
-    for _ in range(max(400, seed_customers//2)):
-        devices.append((fake.sha1(), random.choice(DEVICE_TYPES), fake.numerify("##.##"), fake.user_agent()))
-    insert_many(cur,
-        "INSERT INTO devices (device_fingerprint, device_type, os_version, browser) VALUES %s ON CONFLICT (device_fingerprint) DO NOTHING",
-        devices
-    )
-    cur.execute("SELECT device_id FROM devices")
-    device_ids = [r[0] for r in cur.fetchall()]
-
-    # Seed sessions
-    sessions = []
-    for _ in range(max(1200, rows//2)):
-        cust_id, _, ctry = random.choice(customer_rows)
-        sessions.append((cust_id, random.choice(device_ids), fake.ipv4_public(), str(random.randint(1000,99999)), ctry, random_time_within(14)))
-    insert_many(cur,
-        "INSERT INTO sessions (customer_id, device_id, ip, asn, country, started_at) VALUES %s",
-        sessions
-    )
-    cur.execute("SELECT session_id, customer_id FROM sessions")
-    session_rows = cur.fetchall()
-    sessions_by_customer = {}
-    for sid, cid in session_rows:
-        sessions_by_customer.setdefault(cid, []).append(sid)
-
-    # Seed payment methods
-    pms = []
-    for _ in range(seed_customers * 2):
-        cust_id, _, _ = random.choice(customer_rows)
-        pms.append((cust_id, random.choice(["card","bank","wallet"]), fake.sha1(), True))
-    insert_many(cur,
-        "INSERT INTO payment_methods (customer_id, method_type, fingerprint, is_active) VALUES %s",
-        pms
-    )
-    cur.execute("SELECT payment_method_id, customer_id FROM payment_methods WHERE is_active")
-    pm_rows = cur.fetchall()
-    pms_by_customer = {}
-    for pmid, cid in pm_rows:
-        pms_by_customer.setdefault(cid, []).append(pmid)
-
-    # Generate events + transactions
+def gen_txns(rows, customer_rows, merchant_rows, sessions_by_customer, pms_by_customer):
+    # Per-row reference path; ingestion.batch.gen_txns_batch is the vectorized equivalent
     events = []
     txns = []
     disputes = []
@@ -140,7 +109,7 @@ def main(rows: int, seed_customers: int, seed_merchants: int):
         else:
             status = random.choices(["authorized","captured"], weights=[0.2,0.8])[0]
 
-        txn_id = uuid.uuid4()
+        txn_id = new_uuid()
         idem = f"idem_{txn_id.hex}"
 
         auth_code = fake.bothify(text="??#####") if status in ("authorized","captured") else None
@@ -153,76 +122,314 @@ def main(rows: int, seed_customers: int, seed_merchants: int):
 
         # Emit a few events per txn
         if random.random() < 0.25:
-            events.append((random_time_within(30), str(cust_id), str(session_id) if session_id else None, "login", json.dumps({"ip": fake.ipv4_public()})))
+            events.append((str(new_uuid()), random_time_within(30), str(cust_id), str(session_id) if session_id else None, "login", json.dumps({"ip": fake.ipv4_public()})))
         if random.random() < 0.06:
-            events.append((random_time_within(30), str(cust_id), str(session_id) if session_id else None, "password_reset", json.dumps({"method":"email"})))
+            events.append((str(new_uuid()), random_time_within(30), str(cust_id), str(session_id) if session_id else None, "password_reset", json.dumps({"method":"email"})))
 
         # Disputes for chargebacks
         if status == "chargeback":
-            disp_id = uuid.uuid4()
+            disp_id = new_uuid()
             disputes.append((str(disp_id), t + timedelta(days=random.randint(1,10)), str(txn_id), random.choice(["fraud","service_not_received","duplicate"]), random.choice(["open","lost","won"]), amount))
 
-        # Fraud alerts (simple rules)
-        score = 0.0
-        rules_hit = []
-        if cust_risk == "high":
-            score += 0.35; rules_hit.append("high_risk_customer")
-        if merch_risk == "high":
-            score += 0.25; rules_hit.append("high_risk_merchant")
-        if amount > 150000:
-            score += 0.30; rules_hit.append("large_amount")
-        if status in ("failed","chargeback"):
-            score += 0.20; rules_hit.append("bad_outcome")
-
-        if score >= 0.45:
-            alert_id = uuid.uuid4()
-            sev = "high" if score >= 0.75 else ("medium" if score >= 0.55 else "low")
+        # Fraud alerts (ingestion.rules)
+        score, sev, rules_hit = DEFAULT_RULES.evaluate_row({"cust_risk": cust_risk, "merch_risk": merch_risk, "amount_cents": amount, "status": status})
+        if sev is not None:
+            alert_id = new_uuid()
             alerts.append((
                 str(alert_id), t, str(cust_id), str(txn_id), " | ".join(rules_hit), sev, round(score,3),
                 json.dumps({"rules": rules_hit, "cust_risk": cust_risk, "merch_risk": merch_risk})
             ))
             # Create case for higher severity
             if sev in ("medium","high") and random.random() < 0.7:
-                case_id = uuid.uuid4()
+                case_id = new_uuid()
                 cases.append((str(case_id), t, str(alert_id), "open", None, None))
 
-    # Bulk insert transactions (as text → cast in SQL)
-    insert_many(cur, """        INSERT INTO transactions
-        (txn_id, idempotency_key, created_at, customer_id, merchant_id, payment_method_id, session_id,
-         amount_cents, currency, channel, status, auth_code, failure_reason)
-        VALUES %s
-        ON CONFLICT (idempotency_key) DO NOTHING
-    """, txns)
+    return txns, events, disputes, alerts, cases
+
+def fetch_by_ids(cur, sql, ids):
+    # Primary-key lookups only: cost follows len(ids), not table size
+    cur.execute(sql, ([str(i) for i in ids],))
+    return cur.fetchall()
+
+def sample_entities(cur, k, seed):
+    # Bounded, repeatable sample of pre-existing customers/merchants plus their sessions and payment methods
+    out = []
+    for table, key in (("customers", "customer_id"), ("merchants", "merchant_id")):
+        cur.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", (table,))
+        est = cur.fetchone()[0]
+        pct = 100.0 if est <= 0 else min(100.0, 200.0 * k / est)
+        cur.execute(f"SELECT {key}, risk_tier, country FROM {table} TABLESAMPLE SYSTEM (%s) REPEATABLE (%s) "
+                    f"ORDER BY {key} LIMIT %s", (pct, seed % 2**31, k))
+        out.append(cur.fetchall())
+    customer_rows, merchant_rows = out
+    cust_ids = [r[0] for r in customer_rows]
+    sessions = fetch_by_ids(cur, "SELECT session_id, customer_id FROM sessions WHERE customer_id = ANY(%s::uuid[]) ORDER BY session_id", cust_ids)
+    pms = fetch_by_ids(cur, "SELECT payment_method_id, customer_id FROM payment_methods WHERE is_active AND customer_id = ANY(%s::uuid[]) ORDER BY payment_method_id", cust_ids)
+    return customer_rows, merchant_rows, sessions, pms
+
+def build_entities(customer_rows, merchant_rows, sessions, pms):
+    # (customers, merchants, sessions_by_customer, pms_by_customer) in the shape EntityIndex / gen_txns expect
+    customer_rows = sorted(dict((str(r[0]), r) for r in customer_rows).values(), key=lambda r: str(r[0]))
+    merchant_rows = sorted(dict((str(r[0]), r) for r in merchant_rows).values(), key=lambda r: str(r[0]))
+    sessions_by_customer = {}
+    for sid, cid in sorted(set((str(a), str(b)) for a, b in sessions)):
+        sessions_by_customer.setdefault(cid, []).append(sid)
+    pms_by_customer = {}
+    for pmid, cid in sorted(set((str(a), str(b)) for a, b in pms)):
+        pms_by_customer.setdefault(cid, []).append(pmid)
+    customer_rows = [(str(r[0]),) + tuple(r[1:]) for r in customer_rows]
+    merchant_rows = [(str(r[0]),) + tuple(r[1:]) for r in merchant_rows]
+    # Every transaction draws a customer and a merchant
+    for name, entity_rows in (("customers", customer_rows), ("merchants", merchant_rows)):
+        if not entity_rows:
+            raise SystemExit(f"No {name} to draw transactions from: none were seeded or all already existed; "
+                             "raise --seed-customers/--seed-merchants or pass --sample-existing N.")
+    return customer_rows, merchant_rows, sessions_by_customer, pms_by_customer
+
+def seed_entities(cur, rows, seed_customers, seed_merchants, loader, insert=True):
+    # IDs and created_at are assigned client-side, so the entity index is built from what this run
+    # generated instead of reading whole tables back. A new run with an earlier run's seed draws the
+    # same IDs: the rows already there are skipped, and are the same entities. With insert=False (resume) the same rows are
+    # regenerated from the seed and only checked for presence.
+    # Seed customers and merchants
+    customers, merchants = gen_seed_entities(seed_customers, seed_merchants)
+    if insert:
+        load(cur, "customers", ("customer_id", "created_at", "email", "phone", "country", "risk_tier", "kyc_tier"), customers, conflict="(email)", method=loader)
+        load(cur, "merchants", ("merchant_id", "created_at", "merchant_name", "mcc", "country", "risk_tier"), merchants, conflict="(merchant_id)", method=loader)
 
-    insert_many(cur, """\
-        INSERT INTO events (event_time, customer_id, session_id, event_type, metadata)
-        VALUES %s
-    """, [(e[0], e[1], e[2], e[3], Json(json.loads(e[4]))) for e in events])
+    # Customers skipped by ON CONFLICT (email) keep their existing id; only ours that landed are usable
+    customer_rows = fetch_by_ids(cur, "SELECT customer_id, risk_tier, country FROM customers WHERE customer_id = ANY(%s::uuid[]) ORDER BY customer_id",
+                                 [c[0] for c in customers])
+    merchant_rows = [(m[0], m[5], m[4]) for m in merchants]
 
+    # Seed devices
+    devices = []
+    for _ in range(max(400, seed_customers//2)):
+        devices.append((new_uuid(), utcnow(), fake.sha1(), random.choice(DEVICE_TYPES), fake.numerify("##.##"), fake.user_agent()))
+    if insert:
+        load(cur, "devices", ("device_id", "created_at", "device_fingerprint", "device_type", "os_version", "browser"), devices, conflict="(device_fingerprint)", method=loader)
+    device_ids = [r[0] for r in fetch_by_ids(cur, "SELECT device_id FROM devices WHERE device_id = ANY(%s::uuid[]) ORDER BY device_id",
+                                             [d[0] for d in devices])]
+
+    # Seed sessions. If every seeded customer was skipped (emails already taken, or none seeded),
+    # there is no one to attach them to: customers then come from --sample-existing alone.
+    sessions = []
+    for _ in range(max(1200, rows//2) if customer_rows else 0):
+        cust_id, _, ctry = random.choice(customer_rows)
+        device_id = random.choice(device_ids) if device_ids else None
+        sessions.append((new_uuid(), cust_id, device_id, fake.ipv4_public(), str(random.randint(1000,99999)), ctry, random_time_within(14)))
 
-    insert_many(cur, """        INSERT INTO disputes (dispute_id, created_at, txn_id, dispute_reason, outcome, amount_cents)
-        VALUES %s
-    """, disputes)
+    # Seed payment methods
+    pms = []
+    for _ in range(seed_customers * 2 if customer_rows else 0):
+        cust_id, _, _ = random.choice(customer_rows)
+        pms.append((new_uuid(), cust_id, utcnow(), random.choice(["card","bank","wallet"]), fake.sha1(), True))
+    if insert:
+        load(cur, "sessions", ("session_id", "customer_id", "device_id", "ip", "asn", "country", "started_at"), sessions, conflict="(session_id)", method=loader)
+        load(cur, "payment_methods", ("payment_method_id", "customer_id", "created_at", "method_type", "fingerprint", "is_active"), pms, conflict="(payment_method_id)", method=loader)
+
+    return customer_rows, merchant_rows, [(s[0], s[1]) for s in sessions], [(p[0], p[1]) for p in pms]
+
+def iter_chunks(rows, chunk_size, done):
+    # Work units: (chunk_no, size) for every chunk not yet committed
+    for chunk_no, start in enumerate(range(0, rows, chunk_size)):
+        if chunk_no in done:
+            continue
+        yield chunk_no, min(chunk_size, rows - start)
+
+def flush_chunk(cur, tables, loader, replay=False):
+    # Bulk insert transactions (as text → cast in SQL), then their dependents. A replayed chunk
+    # regenerates the same idempotency keys, which load_transactions skips as already claimed;
+    # with replay (the seed was loaded before) the dependents' existing rows are skipped too.
+    key = DEPENDENT_KEYS.get if replay else lambda t: None
+    return {
+        "txns": load_transactions(cur, TXN_COLUMNS, tables["transactions"], method=loader),
+        "events": load(cur, "events", EVENT_COLUMNS, tables["events"], key("events"), method=loader),
+        "disputes": load(cur, "disputes", DISPUTE_COLUMNS, tables["disputes"], key("disputes"), method=loader),
+        "alerts": load(cur, "alerts", ALERT_COLUMNS, tables["alerts"], key("alerts"), method=loader),
+        "cases": load(cur, "cases", CASE_COLUMNS, tables["cases"], key("cases"), method=loader),
+    }
+
+# -----------------------
+# Chunk workers: each process owns one Postgres connection; every chunk draws from
+# its own RNG stream derived from (seed, chunk_no), so output does not depend on
+# which worker ran it or on how many workers there are.
+# -----------------------
+_worker = {}
+
+def init_worker(entities, seed, as_of, engine, loader, run_id, replay, conn=None):
+    global _clock
+    _clock = as_of
+    if conn is None:
+        conn = pg_conn()
+        conn.autocommit = False
+    _worker.update(conn=conn, entities=entities, seed=seed, engine=engine, loader=loader, run_id=run_id, replay=replay,
+                   idx=EntityIndex(*entities) if engine == "batch" else None,
+                   as_of=np.datetime64(as_of.astimezone(timezone.utc).replace(tzinfo=None), "us"))
+
+def run_chunk(chunk_no, n):
+    # Generate one chunk and load + commit it (streamed, never materialized as a list).
+    # Returns (chunk_no, counts, seconds per phase) for the parent's telemetry; with the
+    # batch engine, row encoding happens lazily inside "load".
+    w = _worker
+    t0 = time.perf_counter()
+    if w["engine"] == "batch":
+        rng = np.random.default_rng(np.random.SeedSequence(w["seed"], spawn_key=(chunk_no,)))
+        batch = gen_txns_batch(rng, n, w["idx"], w["as_of"])
+        tables = {t: iter_rows(batch[t]) for t in TABLES}
+    else:
+        seed_all(f"{w['seed']}:{chunk_no}")
+        tables = dict(zip(TABLES, gen_txns(n, *w["entities"])))
+    t1 = time.perf_counter()
+    cur = w["conn"].cursor()
+    counts = flush_chunk(cur, tables, w["loader"], w["replay"])
+    t2 = time.perf_counter()
+    commit_chunk(cur, w["run_id"], chunk_no, counts["txns"])
+    w["conn"].commit()
+    cur.close()
+    return chunk_no, counts, {"generate": t1 - t0, "load": t2 - t1, "commit": time.perf_counter() - t2}
+
+def main(rows: int, seed_customers: int, seed_merchants: int, engine: str = "batch", loader: str = "copy",
+         chunk_size: int = None, run_id: str = None, workers: int = 1, seed: int = None, as_of: datetime = None,
+         sample_existing: int = 0):
+    telemetry = PipelineRun("generate")
+    try:
+        totals = _generate(telemetry, rows, seed_customers, seed_merchants, engine, loader, chunk_size, run_id, workers,
+                           seed, as_of, sample_existing)
+    except BaseException:
+        telemetry.finish(status="failed")
+        raise
+    telemetry.finish(rows=sum(totals.values()))
+
+def _generate(telemetry, rows, seed_customers, seed_merchants, engine, loader, chunk_size, run_id, workers, seed, as_of,
+              sample_existing):
+    global _clock
+    conn = pg_conn()
+    conn.autocommit = False
+    cur = conn.cursor()
 
-    insert_many(cur, """\
-        INSERT INTO alerts (alert_id, created_at, customer_id, txn_id, rule_name, severity, score, details)
-        VALUES %s
-    """, [(a[0], a[1], a[2], a[3], a[4], a[5], a[6], Json(json.loads(a[7]))) for a in alerts])
+    run_id = run_id or uuid.uuid4().hex
+    chunk_size = chunk_size or max(-(-rows // workers), 1)
+    ensure_run_state(cur)
+    ensure_idempotency(cur)
+    run = get_run(cur, run_id)
+    if run is None:
+        seed = secrets.randbits(63) if seed is None else seed
+        _clock = as_of or datetime.now(timezone.utc)
+        done = set()
+    else:
+        if (rows, chunk_size, sample_existing) != (run[0], run[1], run[4]):
+            raise SystemExit(f"Run {run_id} was started with rows={run[0]}, chunk_size={run[1]}, "
+                             f"sample_existing={run[4]}; pass the same values to resume.")
+        if run[2] is None:
+            raise SystemExit(f"Run {run_id} predates recorded seeds and cannot be resumed reproducibly; start a new run.")
+        seed, _clock = run[2], run[3]
+        done = committed_chunks(cur, run_id)
+        print(f"Resuming run {run_id}: {len(done)} chunk(s) already committed")
+    replay = seed_used(cur, run_id, seed)
+    print(f"run_id={run_id} seed={seed} as_of={_clock.isoformat()} workers={workers}"
+          f"{' (seed loaded before: existing rows are skipped)' if replay else ''}", flush=True)
+
+    # Seeding is committed together with the first chunk (or before the pool starts)
+    seed_all(seed)
+    with telemetry.span("seed_entities"):
+        seeded = seed_entities(cur, rows, seed_customers, seed_merchants, loader, insert=run is None)
+    if run is None:
+        start_run(cur, run_id, rows, chunk_size, seed, _clock, sample_existing)
+    with telemetry.span("sample_entities"):
+        sampled = sample_entities(cur, sample_existing, seed) if sample_existing else ([], [], [], [])
+    entities = build_entities(*(a + b for a, b in zip(seeded, sampled)))
+    pending = list(iter_chunks(rows, chunk_size, done))
+
+    totals = {}
+    def record(chunk_no, counts, timings):
+        for k, v in counts.items():
+            totals[k] = totals.get(k, 0) + v
+        # Per-phase time summed over chunks (overlapping when workers > 1)
+        telemetry.add("generate", timings["generate"], rows=counts["txns"])
+        telemetry.add("load", timings["load"], rows=sum(counts.values()))
+        telemetry.add("commit", timings["commit"])
+        if chunk_size < rows:
+            print(f"Committed chunk {chunk_no} ({counts['txns']} txns)", flush=True)
+
+    if workers > 1:
+        conn.commit()
+        with ProcessPoolExecutor(workers, initializer=init_worker,
+                                 initargs=(entities, seed, _clock, engine, loader, run_id, replay)) as pool:
+            for fut in as_completed([pool.submit(run_chunk, no, n) for no, n in pending]):
+                record(*fut.result())
+    else:
+        # In-process: reuse this connection so seeding commits with the first chunk
+        init_worker(entities, seed, _clock, engine, loader, run_id, replay, conn)
+        for no, n in pending:
+            record(*run_chunk(no, n))
 
+    conn.commit()
+    cur.close()
+    conn.close()
+    print("Inserted: " + ", ".join(f"{k}={v}" for k, v in totals.items()))
+    return totals
 
-    insert_many(cur, """        INSERT INTO cases (case_id, created_at, alert_id, status, investigator, closed_at)
-        VALUES %s
-    """, cases)
+def main_stream(seed_customers: int, seed_merchants: int, tps: float, profile: str, duration: float,
+                writers: int, probe_interval: float, sample_existing: int = 0, seed: int = None,
+                burst_every: float = 60.0, burst_mult: float = 5.0, diurnal_period: float = 86400.0):
+    import asyncio
+    from ingestion import stream
 
+    conn = pg_conn()
+    cur = conn.cursor()
+    seed = secrets.randbits(63) if seed is None else seed
+    seed_all(seed)
+    seeded = seed_entities(cur, 0, seed_customers, seed_merchants, "copy")
+    sampled = sample_entities(cur, sample_existing, seed) if sample_existing else ([], [], [], [])
+    entities = build_entities(*(a + b for a, b in zip(seeded, sampled)))
     conn.commit()
     cur.close()
     conn.close()
-    print(f"Inserted: txns={len(txns)}, events={len(events)}, disputes={len(disputes)}, alerts={len(alerts)}, cases={len(cases)}")
+    print(f"[stream] seed={seed} tps={tps} profile={profile} writers={writers}", flush=True)
+    asyncio.run(stream.run(entities, tps, profile=profile, duration=duration, writers=writers,
+                           probe_interval=probe_interval, seed=seed, burst_every=burst_every,
+                           burst_mult=burst_mult, period=diurnal_period))
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--rows", type=int, default=5000)
     ap.add_argument("--seed-customers", type=int, default=800)
     ap.add_argument("--seed-merchants", type=int, default=120)
+    ap.add_argument("--engine", choices=["batch", "row"], default="batch",
+                    help="batch: NumPy column-wise generation; row: legacy per-row loop")
+    ap.add_argument("--loader", choices=["copy", "values"], default="copy",
+                    help="copy: COPY FROM STDIN (staging-table merge for ON CONFLICT); values: execute_values")
+    ap.add_argument("--chunk-size", type=int, default=None,
+                    help="generate, load and commit this many transactions (plus dependents) at a time")
+    ap.add_argument("--run-id", default=None,
+                    help="resume a previous run; committed chunks are skipped")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="processes generating and loading chunks in parallel, each with its own connection")
+    ap.add_argument("--seed", type=int, default=None,
+                    help="RNG seed; together with --as-of, --rows and --chunk-size the output is reproducible")
+    ap.add_argument("--as-of", type=datetime.fromisoformat, default=None,
+                    help="anchor timestamp (ISO 8601, UTC if no offset) that generated times are relative to")
+    ap.add_argument("--sample-existing", type=int, default=0,
+                    help="also draw transactions from up to N pre-existing customers and merchants (TABLESAMPLE)")
+    ap.add_argument("--stream", action="store_true",
+                    help="run continuously, emitting transactions/events/alerts at --tps (Ctrl-C to stop)")
+    ap.add_argument("--tps", type=float, default=200.0, help="--stream: target transactions per second")
+    ap.add_argument("--profile", choices=["flat", "burst", "diurnal"], default="flat", help="--stream: rate shape")
+    ap.add_argument("--burst-every", type=float, default=60.0, help="--stream burst: seconds between 5s bursts")
+    ap.add_argument("--burst-mult", type=float, default=5.0, help="--stream burst: rate multiplier during a burst")
+    ap.add_argument("--diurnal-period", type=float, default=86400.0, help="--stream diurnal: length of one 'day' in seconds")
+    ap.add_argument("--duration", type=float, default=None, help="--stream: stop after this many seconds")
+    ap.add_argument("--writers", type=int, default=4, help="--stream: concurrent Postgres writers (pool size)")
+    ap.add_argument("--probe-interval", type=float, default=10.0,
+                    help="--stream: seconds between freshness probes (0 disables ClickHouse probing)")
     args = ap.parse_args()
-    main(args.rows, args.seed_customers, args.seed_merchants)
+    if args.stream:
+        main_stream(args.seed_customers, args.seed_merchants, args.tps, args.profile, args.duration, args.writers,
+                    args.probe_interval, args.sample_existing, args.seed, args.burst_every, args.burst_mult,
+                    args.diurnal_period)
+        raise SystemExit(0)
+    if args.as_of and args.as_of.tzinfo is None:
+        args.as_of = args.as_of.replace(tzinfo=timezone.utc)
+    main(args.rows, args.seed_customers, args.seed_merchants, args.engine, args.loader, args.chunk_size, args.run_id,
+         args.workers, args.seed, args.as_of, args.sample_existing)
@@ -0,0 +1,95 @@
+import argparse
+import os
+
+from ingestion.db import ensure_idempotency, pg_conn
+from warehouse.telemetry import PipelineRun
+
+# Partition maintenance for the month-partitioned OLTP tables
+# (infra/init_sql/01_oltp.sql). For each table it drops the month partitions
+# that ended before the retention cutoff, then creates every missing month from
+# the cutoff through --ahead-months past the current one; rows that had landed
+# in the DEFAULT partition move into their new month, and the idempotency keys
+# of dropped transaction months are released. Idempotent: the DAG runs
+# it before every generate, so writers always find their month in place.
+#   python -m ingestion.partitions --retention-months 13 --ahead-months 2
+
+PARTITIONED = ("transactions", "events")
+RETENTION_MONTHS = int(os.environ.get("FRI_PG_RETENTION_MONTHS", "13"))
+AHEAD_MONTHS = int(os.environ.get("FRI_PG_AHEAD_MONTHS", "2"))
+
+# UTC month boundaries, matching the partition bounds
+BOUNDS_SQL = """SELECT
+  (date_trunc('month', now() AT TIME ZONE 'UTC') - make_interval(months => %(retention)s)) AT TIME ZONE 'UTC',
+  (date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => %(ahead)s)) AT TIME ZONE 'UTC'"""
+
+
+def is_partitioned(cur, table):
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def default_rows(cur, table):
+    cur.execute(f"SELECT count(*) FROM {table}_default")
+    return cur.fetchone()[0]
+
+
+def maintain(cur, table, cutoff, until):
+    # (dropped, created) partition names; one transaction per table
+    cur.execute("SELECT drop_month_partitions(%s, %s)", (table, cutoff))
+    dropped = [r[0] for r in cur.fetchall()]
+    if table == "transactions":
+        # Idempotency keys of the dropped months (infra/init_sql/01_oltp.sql)
+        cur.execute("DELETE FROM transaction_idempotency WHERE created_at < %s", (cutoff,))
+    cur.execute("SELECT ensure_month_partitions(%s, %s, %s)", (table, cutoff, until))
+    created = [r[0] for r in cur.fetchall()]
+    return dropped, created
+
+
+def main(retention_months=RETENTION_MONTHS, ahead_months=AHEAD_MONTHS):
+    run = PipelineRun("partitions")
+    try:
+        changed = _maintain(run, retention_months, ahead_months)
+    except BaseException:
+        run.finish(status="failed")
+        raise
+    run.finish(rows=changed)
+
+
+def _maintain(run, retention_months, ahead_months):
+    conn = pg_conn()
+    cur = conn.cursor()
+    cur.execute(BOUNDS_SQL, {"retention": retention_months, "ahead": ahead_months})
+    cutoff, until = cur.fetchone()
+    ensure_idempotency(cur)
+    conn.commit()
+    print(f"Keeping months {cutoff:%Y-%m} .. {until:%Y-%m} (UTC)")
+
+    changed = 0
+    for table in PARTITIONED:
+        if not is_partitioned(cur, table):
+            # Databases initialised before 01_oltp.sql partitioned the table
+            print(f"{table}: not partitioned, skipped (recreate the Postgres volume to partition it)")
+            conn.rollback()
+            continue
+        with run.span(table) as span:
+            dropped, created = maintain(cur, table, cutoff, until)
+            left = default_rows(cur, table)
+            conn.commit()
+            span.add(rows=len(dropped) + len(created))
+        changed += len(dropped) + len(created)
+        print(f"{table}: created {len(created)} ({', '.join(created) or '-'}), "
+              f"dropped {len(dropped)} ({', '.join(dropped) or '-'}), {left:,} row(s) left in {table}_default")
+    cur.close()
+    conn.close()
+    return changed
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--retention-months", type=int, default=RETENTION_MONTHS,
+                    help="keep this many whole months before the current one; older months are dropped")
+    ap.add_argument("--ahead-months", type=int, default=AHEAD_MONTHS,
+                    help="create partitions this many months past the current one")
+    args = ap.parse_args()
+    main(args.retention_months, args.ahead_months)
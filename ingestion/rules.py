@@ -0,0 +1,156 @@
+import operator
+
+import numpy as np
+
+# Declarative fraud rules compiled to vectorized predicates.
+#
+#   rules = RuleSet([Rule("large_amount", 0.30, col("amount_cents") > 150000), ...])
+#   scored = rules.evaluate({"amount_cents": arr, ...})   # or a pyarrow RecordBatch/Table, or a DataFrame
+#   scored.score, scored.severity, scored.mask, scored.fired
+#
+# A batch is scored in one pass: each predicate yields a boolean column, the
+# weights are summed in rule order (so scores equal the per-row loop
+# bit-for-bit) and every hit sets one bit of a uint64 mask.
+
+
+class Expr:
+    def __init__(self, fn, text, refs):
+        self._fn = fn
+        self.text = text
+        self.refs = frozenset(refs)
+
+    def __call__(self, cols):
+        return self._fn(cols)
+
+    def __repr__(self):
+        return self.text
+
+    def _cmp(self, op, sym, other):
+        if isinstance(other, Expr):
+            return Expr(lambda c: op(self(c), other(c)), f"({self} {sym} {other})", self.refs | other.refs)
+        return Expr(lambda c: op(self(c), other), f"({self} {sym} {other!r})", self.refs)
+
+    def __eq__(self, other): return self._cmp(operator.eq, "==", other)
+    def __ne__(self, other): return self._cmp(operator.ne, "!=", other)
+    def __gt__(self, other): return self._cmp(operator.gt, ">", other)
+    def __ge__(self, other): return self._cmp(operator.ge, ">=", other)
+    def __lt__(self, other): return self._cmp(operator.lt, "<", other)
+    def __le__(self, other): return self._cmp(operator.le, "<=", other)
+    def __and__(self, other): return self._cmp(np.logical_and, "&", other)
+    def __or__(self, other): return self._cmp(np.logical_or, "|", other)
+    def __invert__(self): return Expr(lambda c: np.logical_not(self(c)), f"~{self}", self.refs)
+
+    __hash__ = object.__hash__
+
+    def isin(self, values):
+        values = list(values)
+        arr, lookup = np.asarray(values), frozenset(values)
+
+        def fn(c):
+            v = self(c)
+            return np.isin(v, arr) if isinstance(v, np.ndarray) else v in lookup
+        return Expr(fn, f"{self}.isin({values!r})", self.refs)
+
+
+def col(name):
+    return Expr(lambda c: c[name], name, {name})
+
+
+class Rule:
+    def __init__(self, name, weight, when):
+        self.name = name
+        self.weight = float(weight)
+        self.when = when
+
+    def __repr__(self):
+        return f"Rule({self.name!r}, {self.weight}, {self.when})"
+
+
+class Scored:
+    def __init__(self, score, severity, mask, rules):
+        self.score = score          # float64, summed rule weights
+        self.severity = severity    # int8 index into RuleSet.severities, -1 = below alert threshold
+        self.mask = mask            # uint64, bit i set when rules[i] hit
+        self._rules = rules
+
+    @property
+    def fired(self):
+        return self.severity >= 0
+
+    def rule_names(self, mask=None):
+        # " | "-joined hit names, the alerts.rule_name format
+        return self._rules.labels()[self.mask if mask is None else mask]
+
+
+class RuleSet:
+    def __init__(self, rules, thresholds=((0.45, "low"), (0.55, "medium"), (0.75, "high"))):
+        if len(rules) > 64:
+            raise ValueError("at most 64 rules fit in the hit bitmask")
+        self.rules = list(rules)
+        self.thresholds = np.array([t for t, _ in thresholds], dtype=np.float64)
+        self.severities = np.array([s for _, s in thresholds])
+        self._labels = None
+
+    def with_thresholds(self, thresholds):
+        return RuleSet(self.rules, thresholds)
+
+    def columns(self):
+        return set().union(*(r.when.refs for r in self.rules))
+
+    def evaluate(self, batch):
+        cols = _columns(batch, self.columns())
+        n = len(next(iter(cols.values()))) if cols else 0
+        score = np.zeros(n, dtype=np.float64)
+        mask = np.zeros(n, dtype=np.uint64)
+        for bit, rule in enumerate(self.rules):
+            hit = np.asarray(rule.when(cols), dtype=bool)
+            score = score + rule.weight * hit
+            mask |= hit.astype(np.uint64) << np.uint64(bit)
+        severity = (np.searchsorted(self.thresholds, score, side="right") - 1).astype(np.int8)
+        return Scored(score, severity, mask, self)
+
+    def evaluate_row(self, row):
+        # Scalar path for per-row callers: (score, severity or None, hit rule names)
+        score = 0.0
+        hits = []
+        for rule in self.rules:
+            if rule.when(row):
+                score += rule.weight
+                hits.append(rule.name)
+        sev = int(np.searchsorted(self.thresholds, score, side="right")) - 1
+        return score, (str(self.severities[sev]) if sev >= 0 else None), hits
+
+    def labels(self):
+        # Lookup table mask -> label; only built for rule sets small enough to enumerate
+        if self._labels is None:
+            if len(self.rules) > 16:
+                raise ValueError("rule_names() lookup needs <= 16 rules; decode mask bits instead")
+            self._labels = np.array([" | ".join(r.name for i, r in enumerate(self.rules) if m & (1 << i))
+                                     for m in range(1 << len(self.rules))], dtype=object)
+        return self._labels
+
+
+def _columns(batch, names):
+    # Accept dict-of-arrays, pandas DataFrame, pyarrow RecordBatch/Table
+    if hasattr(batch, "schema") and hasattr(batch, "column"):
+        out = {}
+        for name in names:
+            arr = batch.column(name)
+            if hasattr(arr, "combine_chunks"):
+                arr = arr.combine_chunks()
+            if hasattr(arr, "dictionary"):
+                # Low-cardinality strings: decode the small dictionary once, then gather by index
+                out[name] = np.array(arr.dictionary.to_pylist())[arr.indices.to_numpy(zero_copy_only=False)]
+                continue
+            out[name] = arr.to_numpy(zero_copy_only=False)
+        return out
+    return {name: np.asarray(batch[name]) for name in names}
+
+
+# The generator's rules (previously inline in ingestion.generate.main)
+DEFAULT_RULES = RuleSet([
+    Rule("high_risk_customer", 0.35, col("cust_risk") == "high"),
+    Rule("high_risk_merchant", 0.25, col("merch_risk") == "high"),
+    Rule("large_amount", 0.30, col("amount_cents") > 150000),
+    Rule("bad_outcome", 0.20, col("status").isin(["failed", "chargeback"])),
+])
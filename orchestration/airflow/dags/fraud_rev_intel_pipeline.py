@@ -1,41 +1,151 @@
-from datetime import datetime, timedelta
+import json
+from datetime import datetime, time, timedelta, timezone
+
 from airflow import DAG
+from airflow.decorators import task
 from airflow.operators.bash import BashOperator
 
+# Every task's telemetry (warehouse/telemetry.py) is recorded under the DAG run id;
+# set the fri_prom_textfile_dir Variable to also write Prometheus textfiles.
+TELEMETRY_ENV = {
+    "FRI_PIPELINE_RUN_ID": "{{ run_id }}",
+    "FRI_PROM_TEXTFILE_DIR": "{{ var.value.get('fri_prom_textfile_dir', '') }}",
+}
+
 DEFAULT_ARGS = {
     "owner": "fri",
     "retries": 2,
     "retry_delay": timedelta(minutes=2),
 }
 
+# Caps concurrent per-day backfill syncs across all runs (created by docker-compose.yml)
+BACKFILL_POOL = "fri_backfill"
+
+# Scheduled runs generate new data, then build dbt and sync dimensions and facts
+# in parallel (the sync reads Postgres, not the dbt models). Backfills skip
+# generation and re-process an interval of existing data:
+#   airflow dags trigger fraud_rev_intel_pipeline --conf '{"start": "2025-09-01", "end": "2025-10-01"}'
+# (or `airflow dags backfill`, which uses each run's data interval). dbt merges
+# only the interval's transactions into the gold models, and the facts are
+# re-synced by one mapped task per UTC day under BACKFILL_POOL.
+
+
+def _utc(value):
+    dt = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def is_backfill(dag_run):
+    return bool((dag_run.conf or {}).get("start")) or dag_run.run_type == "backfill"
+
+
+def run_interval(dag_run, data_interval_start, data_interval_end):
+    # conf {"start", "end"} (ISO dates or timestamps, UTC if no offset) or the run's data interval
+    conf = dag_run.conf or {}
+    if conf.get("start"):
+        return _utc(conf["start"]), _utc(conf.get("end") or data_interval_end)
+    return _utc(data_interval_start), _utc(data_interval_end)
+
+
+def dbt_args(dag_run, data_interval_start, data_interval_end):
+    # Backfills build only the gold models (and their tests) over the interval; the views
+    # upstream hold no data and are kept current by the scheduled runs
+    if (dag_run.conf or {}).get("full_refresh"):
+        return "--full-refresh"
+    if not is_backfill(dag_run):
+        return ""
+    start, end = run_interval(dag_run, data_interval_start, data_interval_end)
+    return f"--select fct_transactions+ --vars '{json.dumps({'start': start.isoformat(), 'end': end.isoformat()})}'"
+
+
 with DAG(
     dag_id="fraud_rev_intel_pipeline",
     default_args=DEFAULT_ARGS,
     start_date=datetime(2025, 1, 1),
     schedule_interval="0 */6 * * *",  # every 6 hours
     catchup=False,
+    # A watermark sync stages whole months and publishes them at the end, outside
+    # the month lock the per-day syncs take: runs must not overlap
+    max_active_runs=1,
+    user_defined_macros={"dbt_args": dbt_args},
     tags=["sql","dbt","clickhouse","resume"],
 ) as dag:
 
+    # Month partitions for transactions/events ahead of the writers, and retention
+    partitions = BashOperator(
+        task_id="maintain_partitions",
+        bash_command="python -m ingestion.partitions",
+        env={"PYTHONPATH": "/opt/project", **TELEMETRY_ENV},
+        append_env=True,
+        cwd="/opt/project",
+    )
+
+    @task.branch(task_id="choose_path")
+    def choose_path(dag_run=None):
+        return "backfill_days" if is_backfill(dag_run) else "generate_data"
+
     ingest = BashOperator(
         task_id="generate_data",
-        bash_command="python -m ingestion.generate --rows 3000",
-        env={"PYTHONPATH": "/opt/project", **{}},
+        bash_command="python -m ingestion.generate --rows 3000 --sample-existing 2000",
+        env={"PYTHONPATH": "/opt/project", **TELEMETRY_ENV},
+        append_env=True,
         cwd="/opt/project",
     )
 
+    # The tasks below run on both paths: none_failed lets them start when generate_data was skipped
     dbt_build = BashOperator(
         task_id="dbt_build",
-        bash_command="dbt deps && dbt build",
+        # Gold models are incremental; trigger with {"full_refresh": true} to rebuild them
+        bash_command="dbt deps && python -m warehouse.telemetry --pipeline dbt -- dbt build "
+                     "{{ dbt_args(dag_run, data_interval_start, data_interval_end) }}",
         cwd="/opt/project/warehouse/dbt",
-        env={"DBT_PROFILES_DIR": "/opt/project/warehouse/dbt"},
+        env={"DBT_PROFILES_DIR": "/opt/project/warehouse/dbt", "PYTHONPATH": "/opt/project", **TELEMETRY_ENV},
+        append_env=True,
+        trigger_rule="none_failed",
     )
 
-    ch_sync = BashOperator(
-        task_id="sync_to_clickhouse",
-        bash_command="python -m warehouse.sync_to_clickhouse",
-        env={"PYTHONPATH": "/opt/project", **{}},
+    sync_dims = BashOperator(
+        task_id="sync_dims",
+        bash_command="python -m warehouse.sync_to_clickhouse --only dims",
+        env={"PYTHONPATH": "/opt/project", **TELEMETRY_ENV},
+        append_env=True,
         cwd="/opt/project",
+        trigger_rule="none_failed",
     )
 
-    ingest >> dbt_build >> ch_sync
+    # Changed fact months since the watermark; the rollups are maintained by
+    # materialized views as each month is published, so they need no task of their own
+    sync_facts = BashOperator(
+        task_id="sync_facts",
+        bash_command="python -m warehouse.sync_to_clickhouse --only facts",
+        env={"PYTHONPATH": "/opt/project", **TELEMETRY_ENV},
+        append_env=True,
+        cwd="/opt/project",
+    )
+
+    @task
+    def backfill_days(dag_run=None, data_interval_start=None, data_interval_end=None):
+        # One range sync command per UTC day of the interval (partial days at the ends)
+        start, end = run_interval(dag_run, data_interval_start, data_interval_end)
+        commands = []
+        lo = start
+        while lo < end:
+            hi = min(datetime.combine(lo.date() + timedelta(days=1), time(), timezone.utc), end)
+            commands.append(f"python -m warehouse.sync_to_clickhouse --only facts "
+                            f"--start {lo.isoformat()} --end {hi.isoformat()}")
+            lo = hi
+        return commands
+
+    days = backfill_days()
+    sync_facts_day = BashOperator.partial(
+        task_id="sync_facts_day",
+        pool=BACKFILL_POOL,
+        env={"PYTHONPATH": "/opt/project", **TELEMETRY_ENV},
+        append_env=True,
+        cwd="/opt/project",
+    ).expand(bash_command=days)
+
+    path = choose_path()
+    partitions >> path >> [ingest, days]
+    ingest >> [dbt_build, sync_dims, sync_facts]
+    days >> sync_facts_day
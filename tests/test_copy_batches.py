@@ -0,0 +1,59 @@
+import pyarrow as pa
+import pytest
+
+from warehouse.sync_to_clickhouse import copy_batches
+
+COLUMNS = ["txn_id", "amount_cents"]
+TYPES = {"txn_id": pa.string(), "amount_cents": pa.int64()}
+
+
+class Cursor:
+    # psycopg2 cursor stand-in: copy_expert writes `data` to the file, then raises `error`
+    def __init__(self, data=b"", error=None):
+        self.data = data
+        self.error = error
+
+    def mogrify(self, sql, params):
+        return sql.encode()
+
+    def copy_expert(self, sql, file, size=8192):
+        if self.data:
+            file.write(self.data)
+        if self.error:
+            raise self.error
+
+    def close(self):
+        pass
+
+
+class Conn:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+
+def batches(cursor, batch_rows=2):
+    return list(copy_batches(Conn(cursor), "SELECT 1", {}, COLUMNS, TYPES, batch_rows=batch_rows))
+
+
+def test_rows_are_parsed():
+    out = pa.concat_tables(batches(Cursor(b"a,1\nb,2\nc,3\n")))
+    assert out.column("txn_id").to_pylist() == ["a", "b", "c"]
+    assert out.column("amount_cents").to_pylist() == [1, 2, 3]
+
+
+def test_empty_result_yields_nothing():
+    assert batches(Cursor()) == []
+
+
+def test_copy_failing_before_any_row_raises():
+    # An empty pipe must not pass for "0 rows": callers drop partitions on empty results
+    with pytest.raises(RuntimeError, match="connection lost"):
+        batches(Cursor(error=RuntimeError("connection lost")))
+
+
+def test_copy_failing_mid_stream_raises():
+    with pytest.raises(RuntimeError, match="connection lost"):
+        batches(Cursor(b"a,1\nb,2\nc,3\n", error=RuntimeError("connection lost")))
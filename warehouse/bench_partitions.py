@@ -0,0 +1,221 @@
+import argparse
+import statistics
+import time
+from datetime import timedelta
+
+from warehouse.sync_to_clickhouse import (EPOCH, FCT_COLUMNS, FCT_CSV_TYPES, LOOKBACK_MINUTES, MONTHS_SQL, SYNC_SQL,
+                                          WINDOW_DAYS, copy_batches, month_range, pg_connect)
+
+# OLTP layout benchmark for the sync's Postgres extraction: the same generated
+# transactions in two scratch schemas,
+#   heap         one table with B-tree indexes only (01_oltp.sql before partitioning)
+#   partitioned  UTC-month range partitions plus BRIN on created_at (01_oltp.sql)
+# each read the way warehouse/sync_to_clickhouse.py reads it, with search_path
+# pointing transactions at the scratch copy (customers stay in public):
+#   full         every month of the window, one SYNC_SQL COPY per month
+#   incremental  MONTHS_SQL, then SYNC_SQL for the changed months
+#   last_7d      a time-only range aggregate, like the dbt bronze reads
+# Rows are inserted in created_at order over --days of history, as the live
+# tables receive them; --updated of them get a recent updated_at (status
+# changes since the last sync). Seconds are the median of --repeat runs;
+# pages are the shared buffers the plan touched (EXPLAIN ANALYZE, BUFFERS).
+# Needs a seeded database (customers) created from the current 01_oltp.sql,
+# which provides ensure_month_partitions.
+#   python -m warehouse.bench_partitions --rows 5000000 --days 365
+
+COLUMNS = """
+  txn_id UUID NOT NULL,
+  idempotency_key TEXT NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL,
+  customer_id UUID NOT NULL,
+  merchant_id UUID NOT NULL,
+  payment_method_id UUID,
+  session_id UUID,
+  amount_cents BIGINT NOT NULL,
+  currency TEXT NOT NULL,
+  channel TEXT NOT NULL,
+  status TEXT NOT NULL,
+  auth_code TEXT,
+  failure_reason TEXT,
+  updated_at TIMESTAMPTZ NOT NULL"""
+
+# Mirror infra/init_sql/01_oltp.sql (foreign keys left out: they do not change the reads)
+VARIANTS = {
+    "heap": f"""
+CREATE TABLE {{s}}.transactions ({COLUMNS},
+  PRIMARY KEY (txn_id),
+  UNIQUE (idempotency_key));
+CREATE INDEX ON {{s}}.transactions (customer_id, created_at DESC);
+CREATE INDEX ON {{s}}.transactions (merchant_id, created_at DESC);
+CREATE INDEX ON {{s}}.transactions (updated_at);""",
+    "partitioned": f"""
+CREATE TABLE {{s}}.transactions ({COLUMNS},
+  PRIMARY KEY (txn_id, created_at),
+  UNIQUE (idempotency_key, created_at)) PARTITION BY RANGE (created_at);
+CREATE TABLE {{s}}.transactions_default PARTITION OF {{s}}.transactions DEFAULT;
+CREATE INDEX ON {{s}}.transactions (customer_id, created_at DESC);
+CREATE INDEX ON {{s}}.transactions (merchant_id, created_at DESC);
+CREATE INDEX ON {{s}}.transactions (updated_at);
+CREATE INDEX ON {{s}}.transactions USING brin (created_at) WITH (pages_per_range = 32);
+SELECT ensure_month_partitions('{{s}}.transactions', %(first)s, %(last)s);""",
+}
+
+# Deterministic rows, oldest first, over customers and merchants from public
+LOAD_SQL = """INSERT INTO {s}.transactions
+WITH c AS (SELECT array_agg(customer_id ORDER BY customer_id) AS ids FROM (SELECT customer_id FROM customers ORDER BY customer_id LIMIT 50000) x),
+     m AS (SELECT array_agg(merchant_id ORDER BY merchant_id) AS ids FROM merchants)
+SELECT
+  md5('txn' || i)::uuid,
+  'bench_' || i,
+  %(end)s - (%(rows)s - i) * %(step)s,
+  c.ids[1 + (hashint4(i) & 2147483647) %% cardinality(c.ids)],
+  m.ids[1 + (hashint4(i + 1) & 2147483647) %% cardinality(m.ids)],
+  NULL, NULL,
+  100 + (hashint4(i + 2) & 2147483647) %% 50000,
+  'USD',
+  (ARRAY['web', 'mobile'])[1 + i %% 2],
+  (ARRAY['captured', 'captured', 'captured', 'authorized', 'failed'])[1 + (hashint4(i + 3) & 2147483647) %% 5],
+  NULL, NULL,
+  CASE WHEN (hashint4(i + 4) & 2147483647) %% 1000000 < %(updated)s * 1000000
+       THEN %(end)s - ((hashint4(i + 5) & 2147483647) %% 3600) * interval '1 second'
+       ELSE %(end)s - (%(rows)s - i) * %(step)s END
+FROM generate_series(1, %(rows)s) i, c, m
+ORDER BY i"""
+
+LAST_7D_SQL = """SELECT count(*), sum(amount_cents) FROM transactions
+WHERE created_at >= %(end)s - interval '7 days'"""
+
+
+def load(pg, schema, ddl, args, end):
+    cur = pg.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute(ddl.format(s=schema), {"first": end - timedelta(days=args.days), "last": end})
+    t0 = time.perf_counter()
+    cur.execute(LOAD_SQL.format(s=schema), {"rows": args.rows, "end": end, "updated": args.updated,
+                                            "step": timedelta(days=args.days) / args.rows})
+    pg.commit()
+    seconds = time.perf_counter() - t0
+    pg.autocommit = True
+    cur.execute(f"VACUUM ANALYZE {schema}.transactions")
+    pg.autocommit = False
+    cur.execute("SELECT sum(pg_total_relation_size(c.oid)) FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+                "WHERE n.nspname = %s AND c.relkind = 'r'", (schema,))
+    size = cur.fetchone()[0]
+    cur.close()
+    pg.commit()
+    return seconds, size
+
+
+def pages(pg, sql, params):
+    # Shared buffers (hit + read) the plan touched, children included
+    cur = pg.cursor()
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+    plan = cur.fetchone()[0][0]["Plan"]
+    cur.close()
+    pg.rollback()
+    return plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0)
+
+
+def extract(pg, months, since, window_start):
+    # What sync_partition() reads, minus the ClickHouse side; returns (rows, bytes, queries run)
+    rows = nbytes = 0
+    queries = []
+    for month in months:
+        hi = (month + timedelta(days=32)).replace(day=1)
+        params = {"since": since, "window_start": window_start, "lo": month, "hi": hi}
+        stats = {}
+        for batch in copy_batches(pg, SYNC_SQL, params, FCT_COLUMNS, FCT_CSV_TYPES, stats=stats):
+            rows += batch.num_rows
+        pg.commit()
+        nbytes += stats.get("bytes", 0)
+        queries.append((SYNC_SQL, params))
+    return rows, nbytes, queries
+
+
+def query(pg, sql, params):
+    cur = pg.cursor()
+    cur.execute(sql, params)
+    out = cur.fetchall()
+    cur.close()
+    pg.commit()
+    return out
+
+
+def scenarios(end, last_sync_minutes):
+    window_start = end - timedelta(days=WINDOW_DAYS)
+    since = end - timedelta(minutes=last_sync_minutes + LOOKBACK_MINUTES)
+    months_params = {"since": since, "window_start": window_start}
+    last_7d_params = {"end": end}
+
+    def full(pg):
+        return extract(pg, month_range(window_start.replace(day=1, hour=0, minute=0, second=0, microsecond=0), end),
+                       EPOCH, window_start)
+
+    def incremental(pg):
+        months = sorted(r[0] for r in query(pg, MONTHS_SQL, months_params))
+        rows, nbytes, queries = extract(pg, months, since, window_start)
+        return rows, nbytes, [(MONTHS_SQL, months_params)] + queries
+
+    def last_7d(pg):
+        return query(pg, LAST_7D_SQL, last_7d_params)[0][0], 0, [(LAST_7D_SQL, last_7d_params)]
+
+    return {"full": full, "incremental": incremental, "last_7d": last_7d}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=2_000_000)
+    ap.add_argument("--days", type=int, default=365, help="days of history the rows spread over")
+    ap.add_argument("--updated", type=float, default=0.01, help="fraction of rows changed within the last hour")
+    ap.add_argument("--last-sync-minutes", type=int, default=60,
+                    help="incremental: minutes since the previous sync (its watermark), before the sync's lookback")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--keep", action="store_true", help="keep the scratch schemas")
+    args = ap.parse_args()
+
+    pg = pg_connect()
+    cur = pg.cursor()
+    cur.execute("SELECT date_trunc('second', now())")
+    end = cur.fetchone()[0]
+    cur.close()
+    pg.commit()
+
+    totals = {}
+    for variant, ddl in VARIANTS.items():
+        schema = f"_bench_{variant}"
+        load_s, size = load(pg, schema, ddl, args, end)
+        print(f"\n== {variant}: {args.rows:,} rows loaded in {load_s:.1f}s, {size / 2**20:,.1f} MiB with indexes")
+        print(f"{'scenario':<12} {'seconds':>9} {'rows':>11} {'MiB out':>9} {'pages':>10}")
+        cur = pg.cursor()
+        cur.execute(f"SET search_path TO {schema}, public")
+        cur.close()
+        pg.commit()
+        try:
+            for name, run in scenarios(end, args.last_sync_minutes).items():
+                times = []
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    rows, nbytes, queries = run(pg)
+                    times.append(time.perf_counter() - t0)
+                touched = sum(pages(pg, sql, params) for sql, params in queries)
+                r = totals.setdefault(name, {})[variant] = {"s": statistics.median(times), "pages": touched}
+                print(f"{name:<12} {r['s']:>9.3f} {rows:>11,} {nbytes / 2**20:>9.1f} {touched:>10,}")
+        finally:
+            cur = pg.cursor()
+            cur.execute("RESET search_path")
+            if not args.keep:
+                cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+            cur.close()
+            pg.commit()
+
+    print(f"\n{'scenario':<12} {'heap s':>9} {'part s':>9} {'speedup':>8} {'heap pages':>11} {'part pages':>11}")
+    for name, r in totals.items():
+        heap, part = r["heap"], r["partitioned"]
+        print(f"{name:<12} {heap['s']:>9.3f} {part['s']:>9.3f} {heap['s'] / max(part['s'], 1e-9):>7.1f}x "
+              f"{heap['pages']:>11,} {part['pages']:>11,}")
+    pg.close()
+
+
+if __name__ == "__main__":
+    main()
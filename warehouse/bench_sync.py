@@ -0,0 +1,157 @@
+import argparse
+import sys
+import time
+import uuid
+
+from warehouse.sync_to_clickhouse import FCT_COLUMNS, FCT_CSV_TYPES, ch_client, copy_batches, pg_connect, to_insert_table
+
+# Row vs columnar sync benchmark against a populated Postgres and ClickHouse.
+# Extracts --rows transactions three ways and loads each into a scratch table:
+#   tuples      psycopg2 named cursor -> Python tuples -> ch.insert, String IDs (the old path)
+#   arrow       COPY csv -> Arrow -> insert_arrow, String IDs
+#   arrow+uuid  COPY csv -> Arrow -> insert_arrow, native UUID IDs (compact_ids variant)
+# Extract and load run back to back (not overlapped) so each is timed on its own.
+# Reports seconds and MB per million rows: bytes out of Postgres, client-side
+# batch memory, bytes ClickHouse received (query_log) and compressed bytes on disk.
+#   python -m warehouse.bench_sync --rows 1000000
+
+BENCH_DDL = """CREATE TABLE {name} (
+  event_time DateTime64(3, 'UTC'),
+  txn_id {id}, customer_id {id}, merchant_id {id}, payment_method_id {id},
+  amount_cents Int64,
+  currency LowCardinality(String), channel LowCardinality(String), status LowCardinality(String),
+  country LowCardinality(String), risk_tier LowCardinality(String),
+  _version UInt64
+) ENGINE = MergeTree ORDER BY (merchant_id, event_time, txn_id)"""
+
+# SYNC_SQL as it was before the columnar path: text casts, timestamps as datetimes
+TUPLE_SQL = """SELECT
+  t.created_at, t.txn_id::text, t.customer_id::text, t.merchant_id::text,
+  COALESCE(t.payment_method_id::text, ''), t.amount_cents, t.currency, t.channel, t.status,
+  c.country, c.risk_tier, (extract(epoch from t.updated_at) * 1000000)::bigint
+FROM transactions t
+JOIN customers c ON c.customer_id = t.customer_id
+LIMIT %(limit)s
+"""
+
+ARROW_SQL = """SELECT
+  (extract(epoch from t.created_at) * 1000000)::bigint, t.txn_id, t.customer_id, t.merchant_id,
+  COALESCE(t.payment_method_id::text, ''), t.amount_cents, t.currency, t.channel, t.status,
+  c.country, c.risk_tier, (extract(epoch from t.updated_at) * 1000000)::bigint
+FROM transactions t
+JOIN customers c ON c.customer_id = t.customer_id
+LIMIT %(limit)s
+"""
+
+
+def tuple_bytes(rows, sample=2000):
+    # Deep size of the tuples, extrapolated from a sample
+    if not rows:
+        return 0
+    sub = rows[:sample]
+    size = sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r) for r in sub)
+    return size * len(rows) / len(sub) + sys.getsizeof(rows)
+
+
+def extract_tuples(pg, limit, batch_rows):
+    cur = pg.cursor(name="bench_tuples")
+    cur.itersize = batch_rows
+    cur.execute(TUPLE_SQL, {"limit": limit})
+    batches = []
+    while True:
+        rows = cur.fetchmany(batch_rows)
+        if not rows:
+            break
+        batches.append(rows)
+    cur.close()
+    pg.commit()
+    return batches, None, sum(tuple_bytes(b) for b in batches)
+
+
+def extract_arrow(pg, limit, batch_rows, uuid_cols):
+    stats = {}
+    batches = [to_insert_table(b, uuid_cols)
+               for b in copy_batches(pg, ARROW_SQL, {"limit": limit}, FCT_COLUMNS, FCT_CSV_TYPES, batch_rows, stats)]
+    pg.commit()
+    return batches, stats["bytes"], sum(b.nbytes for b in batches)
+
+
+def received_bytes(ch, tag):
+    # Bytes ClickHouse read from the inserts, if query_log is enabled
+    try:
+        ch.command("SYSTEM FLUSH LOGS")
+        res = ch.query("SELECT sum(written_bytes) FROM system.query_log WHERE type = 'QueryFinish' AND log_comment = {tag:String}",
+                       parameters={"tag": tag})
+        return res.result_rows[0][0] or None
+    except Exception:
+        return None
+
+
+def disk_bytes(ch, table):
+    db, name = table.split(".")
+    res = ch.query("SELECT sum(data_compressed_bytes) FROM system.parts WHERE database = {db:String} AND table = {t:String} AND active",
+                   parameters={"db": db, "t": name})
+    return res.result_rows[0][0] or 0
+
+
+def run(pg, ch, path, limit, batch_rows):
+    table = f"analytics._bench_sync_{path.replace('+', '_')}"
+    tag = f"bench_sync:{path}:{uuid.uuid4().hex}"
+    ch.command(f"DROP TABLE IF EXISTS {table}")
+    ch.command(BENCH_DDL.format(name=table, id="UUID" if path == "arrow+uuid" else "String"))
+    try:
+        t0 = time.perf_counter()
+        if path == "tuples":
+            batches, pg_bytes, mem = extract_tuples(pg, limit, batch_rows)
+        else:
+            uuid_cols = set(FCT_COLUMNS[1:5]) if path == "arrow+uuid" else set()
+            batches, pg_bytes, mem = extract_arrow(pg, limit, batch_rows, uuid_cols)
+        extract = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for b in batches:
+            if path == "tuples":
+                ch.insert(table, b, column_names=FCT_COLUMNS, settings={"log_comment": tag})
+            else:
+                ch.insert_arrow(table, b, settings={"log_comment": tag})
+        load = time.perf_counter() - t0
+        n = sum(len(b) if path == "tuples" else b.num_rows for b in batches)
+        return {"rows": n, "extract": extract, "load": load, "pg": pg_bytes, "mem": mem,
+                "ch": received_bytes(ch, tag), "disk": disk_bytes(ch, table)}
+    finally:
+        ch.command(f"DROP TABLE IF EXISTS {table}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000, help="rows to extract (fewer if transactions is smaller)")
+    ap.add_argument("--batch-rows", type=int, default=50_000)
+    ap.add_argument("--repeat", type=int, default=1)
+    args = ap.parse_args()
+
+    pg = pg_connect()
+    ch = ch_client()
+    best = {}
+    for _ in range(args.repeat):
+        for path in ("tuples", "arrow", "arrow+uuid"):
+            r = run(pg, ch, path, args.rows, args.batch_rows)
+            if path not in best or r["extract"] + r["load"] < best[path]["extract"] + best[path]["load"]:
+                best[path] = r
+    pg.close()
+
+    def per_m(v, n, scale=1.0):
+        return "-" if v is None else f"{v * scale * 1e6 / max(n, 1):,.2f}"
+
+    print(f"{'path':<11} {'rows':>10}  {'extract':>8} {'load':>8} {'total':>8}  s/M rows  "
+          f"{'pg':>7} {'client':>7} {'ch_in':>7} {'disk':>7}  MB/M rows")
+    base = best["tuples"]["extract"] + best["tuples"]["load"]
+    for path, r in best.items():
+        n = r["rows"]
+        total = r["extract"] + r["load"]
+        print(f"{path:<11} {n:>10,}  {per_m(r['extract'], n):>8} {per_m(r['load'], n):>8} {per_m(total, n):>8}            "
+              f"{per_m(r['pg'], n, 1e-6):>7} {per_m(r['mem'], n, 1e-6):>7} {per_m(r['ch'], n, 1e-6):>7} "
+              f"{per_m(r['disk'], n, 1e-6):>7}  speedup={base / total:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+{#
+  Row logic shared by the incremental gold models and the tests that compare
+  them with a full rebuild (tests/assert_*_matches_full_rebuild.sql).
+#}
+
+{% macro gold_lookback_hours() %}{{ var('gold_lookback_hours', 72) }}{% endmacro %}
+
+{#
+  Backfills pass --vars '{"start": ..., "end": ...}' (ISO timestamps): incremental
+  runs then re-merge the transactions created in [start, end) instead of the
+  lookback. Empty when the vars are not set.
+#}
+{% macro gold_interval() -%}
+{%- if var('start', none) and var('end', none) -%}
+created_at >= '{{ var("start") }}'::timestamptz and created_at < '{{ var("end") }}'::timestamptz
+{%- endif -%}
+{%- endmacro %}
+
+{# One row per transaction; where narrows the silver rows read #}
+{% macro fct_transactions_rows(where='true') %}
+select
+  created_at::date as day,
+  created_at,
+  updated_at,
+  txn_id,
+  customer_id,
+  merchant_id,
+  payment_method_id,
+  amount_cents,
+  currency,
+  channel,
+  status,
+  customer_country,
+  customer_risk_tier,
+  merchant_risk_tier,
+  mcc,
+  is_large_amount,
+  is_bad_outcome
+from {{ ref('silver_transactions_enriched') }}
+where {{ where }}
+{% endmacro %}
+
+{# Daily merchant KPIs over fct_transactions; where narrows the fact rows read #}
+{% macro daily_merchant_kpis(where='true') %}
+with base as (
+  select
+    day,
+    merchant_id,
+    sum(case when status in ('authorized','captured') then amount_cents else 0 end) as gmv_cents,
+    sum(case when status = 'refunded' then amount_cents else 0 end) as refund_cents,
+    sum(case when status = 'chargeback' then amount_cents else 0 end) as chargeback_cents,
+    count(*) as txn_count,
+    sum(case when status = 'failed' then 1 else 0 end) as failed_count,
+    sum(case when customer_risk_tier = 'high' then 1 else 0 end) as high_risk_txn_count,
+    max(_loaded_at) as _loaded_at
+  from {{ ref('fct_transactions') }}
+  where {{ where }}
+  group by 1,2
+)
+select
+  day,
+  merchant_id,
+  gmv_cents,
+  (gmv_cents - refund_cents - chargeback_cents) as net_revenue_cents,
+  refund_cents,
+  chargeback_cents,
+  txn_count,
+  failed_count,
+  high_risk_txn_count,
+  _loaded_at
+from base
+{% endmacro %}
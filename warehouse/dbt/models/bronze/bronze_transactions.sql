@@ -4,6 +4,7 @@ select
   txn_id::text as txn_id,
   idempotency_key,
   created_at,
+  updated_at,
   customer_id::text as customer_id,
   merchant_id::text as merchant_id,
   payment_method_id::text as payment_method_id,
@@ -1,26 +1,19 @@
-{{ config(materialized='table') }}
+{{ config(
+    materialized='incremental',
+    incremental_strategy='delete+insert',
+    unique_key='day',
+    on_schema_change='append_new_columns'
+) }}
 
-with base as (
-  select
-    day,
-    merchant_id,
-    sum(case when status in ('authorized','captured') then amount_cents else 0 end) as gmv_cents,
-    sum(case when status = 'refunded' then amount_cents else 0 end) as refund_cents,
-    sum(case when status = 'chargeback' then amount_cents else 0 end) as chargeback_cents,
-    count(*) as txn_count,
-    sum(case when status = 'failed' then 1 else 0 end) as failed_count,
-    sum(case when customer_risk_tier = 'high' then 1 else 0 end) as high_risk_txn_count
-  from {{ ref('fct_transactions') }}
-  group by 1,2
-)
-select
-  day,
-  merchant_id,
-  gmv_cents,
-  (gmv_cents - refund_cents - chargeback_cents) as net_revenue_cents,
-  refund_cents,
-  chargeback_cents,
-  txn_count,
-  failed_count,
-  high_risk_txn_count
-from base
+{#
+  Incremental runs recompute whole days: every day holding a fact row that
+  fct_transactions merged since this table's last load is deleted and
+  re-aggregated for all of its merchants.
+#}
+
+{% if is_incremental() %}
+{{ daily_merchant_kpis(
+    "day in (select distinct day from " ~ ref('fct_transactions') ~ " where _loaded_at > (select coalesce(max(_loaded_at), '-infinity') from " ~ this ~ "))") }}
+{% else %}
+{{ daily_merchant_kpis() }}
+{% endif %}
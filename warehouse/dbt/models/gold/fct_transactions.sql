@@ -1,20 +1,31 @@
-{{ config(materialized='table') }}
+{{ config(
+    materialized='incremental',
+    incremental_strategy='merge',
+    unique_key='txn_id',
+    on_schema_change='append_new_columns'
+) }}
+
+{#
+  Incremental runs merge every transaction updated (or created) within
+  gold_lookback_hours of what this table already holds: new rows, status
+  changes, and late changes from writers that skip the updated_at trigger.
+  With the start/end vars (gold_interval) they merge the transactions created
+  in that interval instead, for backfills.
+  _loaded_at marks the rows this run merged, for agg_daily_merchant_kpis.
+  `dbt build --full-refresh` (make dbt-full-refresh) rebuilds from scratch.
+#}
 
 select
-  created_at::date as day,
-  created_at,
-  txn_id,
-  customer_id,
-  merchant_id,
-  payment_method_id,
-  amount_cents,
-  currency,
-  channel,
-  status,
-  customer_country,
-  customer_risk_tier,
-  merchant_risk_tier,
-  mcc,
-  is_large_amount,
-  is_bad_outcome
-from {{ ref('silver_transactions_enriched') }}
+  r.*,
+  now() as _loaded_at
+from (
+{% if is_incremental() and gold_interval() %}
+  {{ fct_transactions_rows(gold_interval()) }}
+{% elif is_incremental() %}
+  {{ fct_transactions_rows(
+      "updated_at > (select coalesce(max(updated_at), '-infinity') from " ~ this ~ ") - interval '" ~ gold_lookback_hours() ~ " hours'"
+      ~ " or created_at > (select coalesce(max(created_at), '-infinity') from " ~ this ~ ") - interval '" ~ gold_lookback_hours() ~ " hours'") }}
+{% else %}
+  {{ fct_transactions_rows() }}
+{% endif %}
+) r
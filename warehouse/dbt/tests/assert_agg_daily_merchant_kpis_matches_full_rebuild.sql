@@ -0,0 +1,17 @@
+-- Incremental agg_daily_merchant_kpis must equal re-aggregating all of
+-- fct_transactions: returns the (day, merchant) rows where they differ.
+
+with full_rebuild as (
+  select day, merchant_id, gmv_cents, net_revenue_cents, refund_cents, chargeback_cents,
+         txn_count, failed_count, high_risk_txn_count
+  from ({{ daily_merchant_kpis() }}) k
+),
+incremental as (
+  select day, merchant_id, gmv_cents, net_revenue_cents, refund_cents, chargeback_cents,
+         txn_count, failed_count, high_risk_txn_count
+  from {{ ref('agg_daily_merchant_kpis') }}
+)
+
+(select 'missing_or_stale' as problem, * from full_rebuild except select 'missing_or_stale', * from incremental)
+union all
+(select 'unexpected' as problem, * from incremental except select 'unexpected', * from full_rebuild)
@@ -0,0 +1,18 @@
+-- Incremental fct_transactions must hold exactly what a full rebuild would:
+-- returns the rows where they differ, one side or the other. Source rows
+-- updated after the last merge are left out (the next run picks them up), as
+-- are fact rows whose transaction is no longer in the source.
+
+with full_rebuild as (
+  {{ fct_transactions_rows("updated_at <= (select max(updated_at) from " ~ ref('fct_transactions') ~ ")") }}
+),
+incremental as (
+  select day, created_at, updated_at, txn_id, customer_id, merchant_id, payment_method_id, amount_cents, currency,
+         channel, status, customer_country, customer_risk_tier, merchant_risk_tier, mcc, is_large_amount, is_bad_outcome
+  from {{ ref('fct_transactions') }}
+  where txn_id in (select txn_id from full_rebuild)
+)
+
+(select 'missing_or_stale' as problem, * from full_rebuild except select 'missing_or_stale', * from incremental)
+union all
+(select 'unexpected' as problem, * from incremental except select 'unexpected', * from full_rebuild)
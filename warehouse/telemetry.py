@@ -0,0 +1,205 @@
+import argparse
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Pipeline run telemetry shared by ingestion.generate, warehouse.sync_to_clickhouse
+# and the Airflow DAG:
+#
+#   run = PipelineRun("sync")
+#   with run.span("pg_extract") as s:
+#       ...; s.add(rows=n, bytes=b)
+#   run.add("ch_insert", seconds, rows=n)      # merge timings measured elsewhere (worker processes)
+#   run.finish(freshness_lag=lag_seconds)
+#
+# Spans with the same name accumulate (a per-chunk loop yields one span). On
+# finish() the run is written to analytics.pipeline_runs (one row per span plus
+# a "total" row) and, when FRI_PROM_TEXTFILE_DIR is set, to a Prometheus
+# textfile-collector file. Sink failures are reported and never fail the run.
+# FRI_PIPELINE_RUN_ID groups the entry points of one DAG run under a single id.
+#
+# Steps that are not Python entry points (dbt) are recorded by wrapping them:
+#   python -m warehouse.telemetry --pipeline dbt -- dbt build
+
+# Mirrors infra/init_clickhouse/01_olap.sql
+RUNS_DDL = """CREATE TABLE IF NOT EXISTS analytics.pipeline_runs (
+  run_id String,
+  pipeline LowCardinality(String),
+  span LowCardinality(String),
+  started_at DateTime64(3, 'UTC'),
+  duration_s Float64,
+  calls UInt32,
+  rows UInt64,
+  bytes UInt64,
+  peak_rss_bytes UInt64,
+  status LowCardinality(String),
+  freshness_lag_s Nullable(Float64),
+  host LowCardinality(String)
+)
+ENGINE = MergeTree
+PARTITION BY toYYYYMM(started_at)
+ORDER BY (pipeline, started_at, run_id, span)
+"""
+
+RUN_COLUMNS = ["run_id", "pipeline", "span", "started_at", "duration_s", "calls", "rows", "bytes",
+               "peak_rss_bytes", "status", "freshness_lag_s", "host"]
+
+
+def peak_rss_bytes():
+    # This process plus reaped children (generate/sync worker pools); ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale
+
+
+class Span:
+    def __init__(self, name, started_at):
+        self.name = name
+        self.started_at = started_at
+        self.seconds = 0.0
+        self.calls = 0
+        self.rows = 0
+        self.bytes = 0
+
+    def add(self, rows=0, bytes=0):
+        self.rows += int(rows or 0)
+        self.bytes += int(bytes or 0)
+
+
+class PipelineRun:
+    def __init__(self, pipeline, run_id=None):
+        self.pipeline = pipeline
+        self.run_id = run_id or os.environ.get("FRI_PIPELINE_RUN_ID") or uuid.uuid4().hex
+        self.started_at = datetime.now(timezone.utc)
+        self._t0 = time.perf_counter()
+        self.spans = {}
+
+    def _span(self, name):
+        if name not in self.spans:
+            self.spans[name] = Span(name, datetime.now(timezone.utc))
+        return self.spans[name]
+
+    @contextmanager
+    def span(self, name):
+        s = self._span(name)
+        t0 = time.perf_counter()
+        try:
+            yield s
+        finally:
+            s.seconds += time.perf_counter() - t0
+            s.calls += 1
+
+    def add(self, name, seconds, rows=0, bytes=0, calls=1):
+        s = self._span(name)
+        s.seconds += seconds
+        s.calls += calls
+        s.add(rows, bytes)
+
+    def summary(self):
+        return " ".join(f"{s.name}={s.seconds:.2f}s" + (f"/{s.rows:,}rows" if s.rows else "") for s in self.spans.values())
+
+    def finish(self, status="ok", freshness_lag=None, rows=None, bytes=None):
+        total = time.perf_counter() - self._t0
+        rss = peak_rss_bytes()
+        host = socket.gethostname()
+        records = [(self.run_id, self.pipeline, s.name, s.started_at, s.seconds, s.calls, s.rows, s.bytes,
+                    rss, status, None, host) for s in self.spans.values()]
+        records.append((self.run_id, self.pipeline, "total", self.started_at, total, 1,
+                        rows if rows is not None else 0, bytes if bytes is not None else 0,
+                        rss, status, freshness_lag, host))
+        print(f"[telemetry] {self.pipeline} run={self.run_id} status={status} total={total:.2f}s "
+              f"peak_rss={rss / 2**20:,.0f}MiB {self.summary()}"
+              + (f" freshness_lag={freshness_lag:.1f}s" if freshness_lag is not None else ""), flush=True)
+        write_clickhouse(records)
+        write_textfile(self.pipeline, records)
+        return records
+
+
+def write_clickhouse(records, ch=None):
+    try:
+        if ch is None:
+            from warehouse.sync_to_clickhouse import ch_client
+            ch = ch_client()
+        ch.command(RUNS_DDL)
+        ch.insert("analytics.pipeline_runs", records, column_names=RUN_COLUMNS)
+    except Exception as e:
+        print(f"[telemetry] could not write analytics.pipeline_runs: {e}", flush=True)
+
+
+def _labels(**kw):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in kw.items()) + "}"
+
+
+def write_textfile(pipeline, records, directory=None):
+    # node_exporter textfile collector format; written to a temp file and renamed so scrapes never see half a file
+    directory = directory or os.environ.get("FRI_PROM_TEXTFILE_DIR")
+    if not directory:
+        return
+    total = next(r for r in records if r[2] == "total")
+    lines = [
+        "# HELP fri_pipeline_last_run_timestamp_seconds Finish time of the last run.",
+        "# TYPE fri_pipeline_last_run_timestamp_seconds gauge",
+        f"fri_pipeline_last_run_timestamp_seconds{_labels(pipeline=pipeline)} {time.time():.3f}",
+        "# HELP fri_pipeline_last_run_success 1 if the last run finished ok.",
+        "# TYPE fri_pipeline_last_run_success gauge",
+        f"fri_pipeline_last_run_success{_labels(pipeline=pipeline)} {int(total[9] == 'ok')}",
+        "# HELP fri_pipeline_peak_rss_bytes Peak resident set size of the last run.",
+        "# TYPE fri_pipeline_peak_rss_bytes gauge",
+        f"fri_pipeline_peak_rss_bytes{_labels(pipeline=pipeline)} {total[8]}",
+        "# HELP fri_pipeline_span_seconds Time spent per phase in the last run.",
+        "# TYPE fri_pipeline_span_seconds gauge",
+        *(f"fri_pipeline_span_seconds{_labels(pipeline=pipeline, span=r[2])} {r[4]:.6f}" for r in records),
+        "# HELP fri_pipeline_span_rows Rows handled per phase in the last run.",
+        "# TYPE fri_pipeline_span_rows gauge",
+        *(f"fri_pipeline_span_rows{_labels(pipeline=pipeline, span=r[2])} {r[6]}" for r in records),
+        "# HELP fri_pipeline_span_bytes Bytes moved per phase in the last run.",
+        "# TYPE fri_pipeline_span_bytes gauge",
+        *(f"fri_pipeline_span_bytes{_labels(pipeline=pipeline, span=r[2])} {r[7]}" for r in records),
+    ]
+    if total[10] is not None:
+        lines += [
+            "# HELP fri_pipeline_freshness_lag_seconds now() minus max(event_time) in ClickHouse after the run.",
+            "# TYPE fri_pipeline_freshness_lag_seconds gauge",
+            f"fri_pipeline_freshness_lag_seconds{_labels(pipeline=pipeline)} {total[10]:.3f}",
+        ]
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"fri_{pipeline}.prom")
+        with open(path + ".tmp", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        print(f"[telemetry] could not write Prometheus textfile: {e}", flush=True)
+
+
+def freshness_lag(ch):
+    # Seconds between now and the newest transaction visible in ClickHouse; None when empty
+    res = ch.query("SELECT count(), dateDiff('millisecond', max(event_time), now64(3)) / 1000.0 FROM analytics.fct_transactions")
+    n, lag = res.result_rows[0]
+    return float(lag) if n else None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run a command and record it as a pipeline run")
+    ap.add_argument("--pipeline", required=True)
+    ap.add_argument("command", nargs=argparse.REMAINDER)
+    args = ap.parse_args()
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        ap.error("no command given")
+    run = PipelineRun(args.pipeline)
+    with run.span(os.path.basename(command[0])):
+        code = subprocess.call(command)
+    run.finish(status="ok" if code == 0 else "failed")
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()